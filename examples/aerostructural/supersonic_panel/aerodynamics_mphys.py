@@ -1,7 +1,6 @@
 import numpy as np
 import openmdao.api as om
 from mphys import Builder
-from mpi4py import MPI
 
 from piston_theory import PistonTheory
 
@@ -26,12 +25,8 @@ class AeroSolver(om.ImplicitComponent):
         self.add_input('qdyn', 0., tags=['mphys_input'])
         self.add_input('mach', 0., tags=['mphys_input'])
 
-        # pressure output will only exist on rank 0
-        n = self.comm.allreduce(self.solver.n_nodes, op=MPI.SUM)
-        if self.comm.Get_rank() == 0:
-            self.add_output('pressure', np.zeros(n-1), distributed=True, tags=['mphys_coupling'])
-        else:
-            self.add_output('pressure', np.zeros(0), distributed=True, tags=['mphys_coupling'])
+        # pressures of the panels computed on this rank, all of them on rank 0 in gather mode
+        self.add_output('pressure', np.zeros(self.solver.partition.n_elements), distributed=True, tags=['mphys_coupling'])
 
     def solve_nonlinear(self,inputs,outputs):
 
@@ -179,7 +174,8 @@ class AeroBuilder(Builder):
             panel_chord=self.options['panel_chord'],
             panel_width=self.options['panel_width'],
             N_el=self.options['N_el'],
-            comm=comm
+            comm=comm,
+            distributed=self.options.get('distributed', True)
         )
 
     def get_mesh_coordinate_subsystem(self, scenario_name=None):
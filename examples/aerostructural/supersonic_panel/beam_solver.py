@@ -1,8 +1,12 @@
 import numpy as np
 from mpi4py import MPI
+from scipy import sparse
+from scipy.linalg import cho_solve_banded, cholesky_banded
+
+from line_partition import LinePartition
 
 class Beam:
-    def __init__(self, panel_chord, panel_width, N_el, comm=MPI.COMM_WORLD):
+    def __init__(self, panel_chord, panel_width, N_el, comm=MPI.COMM_WORLD, distributed=True):
         self.panel_chord = panel_chord
         self.panel_width = panel_width
         self.N_el = N_el
@@ -15,25 +19,12 @@ class Beam:
         x = np.linspace(0, self.panel_chord, num=self.N_el+1)
         y = np.zeros_like(x)
         z = np.zeros_like(x)
-        
-        # partitioning
-        if self.rank == 0:
-            self.owned = np.arange(self.N_el+1)
-            ave, res = divmod(self.N_el+1, self.nprocs)
-            counts = [ave + 1 if p < res else ave for p in range(self.nprocs)]
-
-            starts = [sum(counts[:p]) for p in range(self.nprocs)]
-            ends = [sum(counts[:p+1]) for p in range(self.nprocs)]
-
-            self.owned = [self.owned[starts[p]:ends[p]] for p in range(self.nprocs)]
-
-        else:
-            self.owned = None
 
-        # distribute mesh
-        self.owned = comm.scatter(self.owned, root=0)
-        if np.size(self.owned) == 0:
-            self.owned = None
+        # partitioning: in distributed mode each rank assembles the elements of its nodes,
+        # otherwise everything is gathered to rank 0
+        self.partition = LinePartition(self.N_el+1, comm=comm, distributed=distributed)
+        self.owned = self.partition.owned
+        if self.owned is None:
             self.n_nodes = 0
             self.x = np.zeros(0)
             self.y = np.zeros(0)
@@ -46,193 +37,221 @@ class Beam:
 
         self.n_dof = 6
 
-        # free degrees of freedom for the FEA: simply-supported ends
-        n = self.comm.allreduce(self.n_nodes, op=MPI.SUM)
-        self.fdof = np.arange(n*2)
-        self.fdof = np.delete(self.fdof, [0,-2])
+        self._setup_substructure()
+
+        # values of dv_struct, modulus and x that the cached factorizations were computed with
+        self._stiffness_state = None
+
+    def _setup_substructure(self):
+        # The stiffness system is solved by substructuring: the dof of the local mesh part are
+        # split into the interface dof, shared with the neighbor ranks, and the interior dof.
+        # The interior dof are condensed locally, leaving a small banded system of the interface
+        # dof that every rank solves, followed by a local back substitution.
+        p = self.partition
+        nodes = np.arange(p.mesh_start, p.mesh_end)
+
+        # simply-supported ends: w of the first and last nodes
+        self._constrained = np.zeros(2*p.n_mesh_nodes, dtype=bool)
+        self._constrained[0::2] = np.isin(nodes, [0, self.N_el])
+        self._owned_constrained = np.zeros(2*self.n_nodes, dtype=bool)
+        self._owned_constrained[0::2] = np.isin(np.arange(p.start, p.end), [0, self.N_el])
+
+        # local and global numbers of the interface dof
+        interface = np.zeros(2*p.n_mesh_nodes, dtype=bool)
+        self._interface_dofs = []
+        if p.left_interface is not None:
+            interface[:2] = True
+            self._interface_dofs += [2*p.left_interface, 2*p.left_interface+1]
+        if p.right_interface is not None:
+            interface[-2:] = True
+            self._interface_dofs += [2*p.right_interface, 2*p.right_interface+1]
+        self._interface_dofs = np.array(self._interface_dofs, dtype=int)
+        self._interface = np.flatnonzero(interface)
+        self._interior = np.flatnonzero(~interface & ~self._constrained)
+
+        self._interface_constrained = np.zeros(2*p.n_interfaces, dtype=bool)
+        self._interface_constrained[0::2] = np.isin(p.interface_nodes, [0, self.N_el])
+
+    # element stiffness matrix EI*coefficients/L**powers
+    element_coefficients = np.array([
+        [12,   6,  -12,  6],
+        [6,    4,  -6,   2],
+        [-12, -6,   12, -6],
+        [6,    2,  -6,   4],
+    ])
+    element_powers = np.array([
+        [3, 2, 3, 2],
+        [2, 1, 2, 1],
+        [3, 2, 3, 2],
+        [2, 1, 2, 1],
+    ])
+
+    def compute_element_stiffness_matrices(self, L, EI):
+        # stacked 4x4 element matrices, shape (N_el, 4, 4)
+        L = L[:,np.newaxis,np.newaxis]
+        return EI[:,np.newaxis,np.newaxis]*self.element_coefficients/L**self.element_powers
 
     def compute_stiffness_matrix(self, x, EI):
-        K = np.zeros([len(x)*2,len(x)*2])
-        for i in range(len(x)-1):
-            L = x[i+1] - x[i]
-            K[i*2:i*2+4,i*2:i*2+4] += EI[i]*np.array([
-                [12/L**3,  6/L**2, -12/L**3, 6/L**2],
-                [6/L**2,   4/L,     -6/L**2, 2/L],
-                [-12/L**3, -6/L**2, 12/L**3, -6/L**2],
-                [6/L**2,   2/L,     -6/L**2, 4/L],
-            ])
-        return K
+        # sparse assembly: the element matrices are scattered in one call and overlapping entries are summed
+        k = self.compute_element_stiffness_matrices(np.diff(x), EI)
+        dofs = 2*np.arange(len(x)-1)[:,np.newaxis] + np.arange(4)
+        rows = np.repeat(dofs, 4, axis=1)
+        cols = np.tile(dofs, (1,4))
+        return sparse.csr_matrix((k.ravel(), (rows.ravel(), cols.ravel())), shape=(len(x)*2,len(x)*2))
+
+    def _update_stiffness(self, x):
+        # assemble the stiffness matrix of the local elements and the factorizations of the
+        # substructured system, only when dv_struct, modulus or the coordinates changed
+        # since the last call on any rank
+        state = np.concatenate([np.ravel(self.dv_struct), np.ravel(self.modulus), np.ravel(x)])
+        changed = self._stiffness_state is None or not np.array_equal(state, self._stiffness_state)
+        if not self.comm.allreduce(changed, op=MPI.LOR):
+            return
+
+        EI = (1/12)*self.modulus*self.panel_width*self.dv_struct[self.partition.elements]**3
+        self.K = self.compute_stiffness_matrix(x, EI)
+
+        # condense the interior dof: Z = K_II^-1 K_IB and S = K_BB - K_IB^T Z
+        I, B = self._interior, self._interface
+        K_IB = self.K[I,:][:,B].toarray()
+        if len(I) > 0:
+            self.K_factor = self._factorize_banded(self.K[I,:][:,I])
+            self.Z = cho_solve_banded((self.K_factor, False), K_IB)
+        else:
+            self.Z = np.zeros_like(K_IB)
+        S = self.K[B,:][:,B].toarray() - K_IB.T@self.Z
+
+        # interface system: sum of the condensed matrices of all ranks
+        if self.partition.n_interfaces > 0:
+            n = 2*self.partition.n_interfaces
+            S_interface = np.zeros([n, n])
+            for dofs, S_local in self.comm.allgather((self._interface_dofs, S)):
+                S_interface[np.ix_(dofs, dofs)] += S_local
+
+            c = self._interface_constrained
+            S_interface[c,:] = 0.
+            S_interface[:,c] = 0.
+            S_interface[c,c] = 1.
+            self.S_factor = self._factorize_banded(S_interface)
+
+        self._stiffness_state = state
+
+    def _factorize_banded(self, K):
+        # upper banded storage: each element couples the 2 dof of 2 nodes, so 3 off-diagonals
+        bandwidth = 3
+        banded = np.zeros([bandwidth+1, K.shape[0]])
+        for d in range(min(bandwidth+1, K.shape[0])):
+            banded[bandwidth-d,d:] = K.diagonal(d)
+        return cholesky_banded(banded)
+
+    def _solve_substructures(self, F):
+        # forces F of the dof of the local mesh part, each interface force on one rank only
+        I, B = self._interior, self._interface
+        y = cho_solve_banded((self.K_factor, False), F[I]) if len(I) > 0 else F[I]
+
+        U = np.zeros_like(F)
+        if self.partition.n_interfaces > 0:
+            g = np.zeros(2*self.partition.n_interfaces)
+            g[self._interface_dofs] = F[B] - self.Z.T@F[I]
+            self.comm.Allreduce(MPI.IN_PLACE, g, op=MPI.SUM)
+            g[self._interface_constrained] = 0.
+
+            U[B] = cho_solve_banded((self.S_factor, False), g)[self._interface_dofs]
+        U[I] = y - self.Z@U[B]
+        return U
 
     def solve_system(self, f):
-        x = self.comm.gather(self.xyz[0::3], root=0)
-        f = self.comm.gather(f, root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            f = np.concatenate(f, axis=0)
-
-            # compute stiffness matrix
-            EI = (1/12)*self.modulus*self.panel_width*self.dv_struct**3
-            K = self.compute_stiffness_matrix(x, EI)
-            K = K[self.fdof,:][:,self.fdof]
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
 
-            # extract the forces needed: dof 2 and 4
-            F = self._extract_2dof(size=len(x)*2, mask=self.fdof, x=f)
+        # stiffness matrix and its factorization
+        self._update_stiffness(x)
 
-            # solve
-            U = np.zeros(len(x)*2)
-            U[self.fdof] = np.linalg.solve(K, F)
+        # extract the forces needed: dof 2 and 4. The forces of the halo node are added by its owner
+        F = self._collect_2dof(f, halo=False)
 
-        else:
-            U = None
+        # solve with the cached factorizations
+        U = self._solve_substructures(F)
 
         # distribute output
-        U = self._distribute_output_2dof(U)
+        U = p.scatter(U.reshape(-1,2)).flatten()
 
         # pad outputs into dof 2 and 4
-        U = self._pad_output_2dof(size=self.n_dof*self.n_nodes, x=U)
+        U = self._pad_output_2dof(x=U)
 
         return U
 
     def compute_residual(self, u, f):
-        x = self.comm.gather(self.xyz[0::3], root=0)
-        u = self.comm.gather(u, root=0)
-        f = self.comm.gather(f, root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            u = np.concatenate(u, axis=0)
-            f = np.concatenate(f, axis=0)
-
-            # compute stiffness matrix
-            EI = (1/12)*self.modulus*self.panel_width*self.dv_struct**3
-            K = self.compute_stiffness_matrix(x, EI)
-            K = K[self.fdof,:][:,self.fdof]
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
 
-            # extract the forces needed: dof 2 and 4
-            F = self._extract_2dof(size=len(x)*2, mask=self.fdof, x=f) 
+        # stiffness matrix
+        self._update_stiffness(x)
 
-            # extract the displacements needed: dof 2 and 4
-            U = self._extract_2dof(size=len(x)*2, mask=self.fdof, x=u)
+        # extract the displacements needed: dof 2 and 4
+        U = self._collect_2dof(u)
+        U[self._constrained] = 0.
 
-            # residual
-            R = np.zeros(len(x)*2)
-            R[self.fdof] = K@U - F
-
-        else:
-            R = None
-
-        # distribute output
-        R = self._distribute_output_2dof(R)
+        # residual of the owned dof
+        R = p.scatter_add((self.K@U).reshape(-1,2)).flatten() - self._extract_2dof(f)
+        R[self._owned_constrained] = 0.
 
         # pad outputs into dof 2 and 4
-        R = self._pad_output_2dof(size=self.n_dof*self.n_nodes, x=R)
+        R = self._pad_output_2dof(x=R)
 
         return R
 
     def bc_correction(self, u):
-        x = self.comm.gather(self.x, root=0)
-        u = self.comm.gather(u, root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            u = np.concatenate(u, axis=0)
-
-            U = self._extract_2dof(size=len(x)*2, mask=None, x=u)
-            U[self.fdof] = 0.
-
-        else:
-            U = None
-
-        # distribute output
-        U = self._distribute_output_2dof(U)
+        U = self._extract_2dof(u)
+        U[~self._owned_constrained] = 0.
 
         # pad outputs into dof 2 and 4
-        U = self._pad_output_2dof(size=self.n_dof*self.n_nodes, x=U)
+        U = self._pad_output_2dof(x=U)
 
         return U
 
     def set_adjoint(self, adjoint):
-        adjoint = self.comm.gather(adjoint, root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            adjoint = np.concatenate(adjoint, axis=0)
-
-            Adjoint = self._extract_2dof(size=len(adjoint)*2//self.n_dof, mask=None, x=adjoint)
-            Adjoint[np.setdiff1d(np.arange(len(Adjoint)), self.fdof)] = 0.
-
-        else:
-            Adjoint = None
-
-        # distribute output
-        Adjoint = self._distribute_output_2dof(Adjoint)
+        Adjoint = self._extract_2dof(adjoint)
+        Adjoint[self._owned_constrained] = 0.
 
         # pad outputs into dof 2 and 4
-        Adjoint = self._pad_output_2dof(size=self.n_dof*self.n_nodes, x=Adjoint)
+        Adjoint = self._pad_output_2dof(x=Adjoint)
 
         return Adjoint
 
     def compute_stiffness_derivatives(self, u, adjoint):
-        x = self.comm.gather(self.xyz[0::3], root=0)
-        u = self.comm.gather(u, root=0)
-        adjoint = self.comm.gather(adjoint, root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            u = np.concatenate(u, axis=0)
-            adjoint = np.concatenate(adjoint, axis=0)
-
-            # extract the terms needed: dof 2 and 4
-            U = self._extract_2dof(size=len(x)*2, mask=None, x=u)
-            Adjoint = self._extract_2dof(size=len(x)*2, mask=None, x=adjoint)
-
-            # allocate output 
-            d_dv_struct = np.zeros_like(self.dv_struct)
-            d_x = np.zeros_like(x)
-
-            EI = (1/12)*self.modulus*self.panel_width*self.dv_struct**3
-            for i in range(len(x)-1):
-                L = x[i+1] - x[i]
-
-                # dv_struct derivatives
-                EI_wrt_dv_struct = (1/12)*self.modulus*self.panel_width*3*self.dv_struct**2
-                K_wrt_dv_struct = EI_wrt_dv_struct[i]*np.array([
-                    [12/L**3,  6/L**2, -12/L**3, 6/L**2],
-                    [6/L**2,   4/L,     -6/L**2, 2/L],
-                    [-12/L**3, -6/L**2, 12/L**3, -6/L**2],
-                    [6/L**2,   2/L,     -6/L**2, 4/L],
-                ])
-                d_dv_struct[i] += Adjoint[i*2:i*2+4]@K_wrt_dv_struct@U[i*2:i*2+4]
-
-                # x derivatives
-                K_wrt_L = EI[i]*np.array([
-                    [-36/L**4, -12/L**3, 36/L**4,  -12/L**3],
-                    [-12/L**3, -4/L**2,  12/L**3,  -2/L**2],
-                    [36/L**4,  12/L**3,  -36/L**4, 12/L**3],
-                    [-12/L**3, -2/L**2,  12/L**3,  -4/L**2],
-                ])
-                d_x[i+1] += Adjoint[i*2:i*2+4]@K_wrt_L@U[i*2:i*2+4]
-                d_x[i]   -= Adjoint[i*2:i*2+4]@K_wrt_L@U[i*2:i*2+4]
-
-            # modulus derivatives
-            K = self.compute_stiffness_matrix(x, EI)
-            K = K[self.fdof,:][:,self.fdof]
-            d_modulus = Adjoint[self.fdof]@K@U[self.fdof]/self.modulus
-
-        else:
-            d_dv_struct = None
-            d_x = None
-            d_modulus = None
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
+
+        # extract the terms needed: dof 2 and 4 of the two nodes of each local element
+        U = self._collect_2dof(u)
+        Adjoint = self._collect_2dof(adjoint)
+        U_el = self._get_element_dofs(U)
+        Adjoint_el = self._get_element_dofs(Adjoint)
+
+        dv_struct = self.dv_struct[p.elements]
+        L = np.diff(x)
+
+        # dv_struct derivatives
+        EI_wrt_dv_struct = (1/12)*self.modulus*self.panel_width*3*dv_struct**2
+        K_wrt_dv_struct = self.compute_element_stiffness_matrices(L, EI_wrt_dv_struct)
+        d_dv_struct = np.einsum('ei,eij,ej->e', Adjoint_el, K_wrt_dv_struct, U_el)
+
+        # x derivatives: d(EI*c/L**n)/dL = -n*EI*c/L**(n+1)
+        EI = (1/12)*self.modulus*self.panel_width*dv_struct**3
+        K_wrt_L = -self.compute_element_stiffness_matrices(L, EI)*self.element_powers/L[:,np.newaxis,np.newaxis]
+        d_L = np.einsum('ei,eij,ej->e', Adjoint_el, K_wrt_L, U_el)
+        d_x = p.element_to_nodes(-d_L, d_L)
+
+        # modulus derivatives: the element energies of the free dof
+        self._update_stiffness(x)
+        free = ~self._constrained
+        d_modulus = (Adjoint*free)@self.K@(U*free)/self.modulus
 
         # distribute output
-        d_dv_struct = self.comm.bcast(d_dv_struct, root=0)
-        d_x = self._distribute_output(d_x)
-        d_modulus = self.comm.bcast(d_modulus, root=0)
+        d_dv_struct = p.sum_elements(d_dv_struct)
+        d_x = p.scatter_add(d_x)
+        d_modulus = p.sum(d_modulus)
 
         # pad outputs into correct dof
         d_xs = self._pad_output(size=3*self.n_nodes, n1=0, n2=3, x=d_x)
@@ -240,23 +259,14 @@ class Beam:
         return d_dv_struct, d_xs, d_modulus
 
     def compute_stress(self, u, aggregation_parameter):
-        x = self.comm.gather(self.xyz[0::3], root=0)
-        rotations = self.comm.gather(u[4::6], root=0)
-
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            rotations = np.concatenate(rotations, axis=0)
-
-            # compute stresses
-            stress = np.zeros(len(x)-1)
-            for i in range(len(x)-1):
-                stress[i] = self.modulus*self.dv_struct[i]*(rotations[i+1]-rotations[i])/(x[i+1] - x[i])/2
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
+        rotations = p.collect(u[4::6])
 
-        else:
-            stress = None
+        # compute stresses of the local elements
+        stress = self.modulus*self.dv_struct[p.elements]*np.diff(rotations)/np.diff(x)/2
 
-        stress = self.comm.bcast(stress, root=0)
+        stress = p.collect_elements(stress)
 
         f = np.r_[stress,-stress]/self.yield_stress
         KS = np.log(np.sum(np.exp(f*aggregation_parameter)))/aggregation_parameter
@@ -264,8 +274,9 @@ class Beam:
         return stress, KS
 
     def compute_stress_derivatives(self, u, stress, aggregation_parameter, adjoint):
-        x = self.comm.gather(self.xyz[0::3], root=0)
-        rotations = self.comm.gather(u[4::6], root=0)
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
+        rotations = p.collect(u[4::6])
 
         f = np.r_[stress,-stress]/self.yield_stress
 
@@ -274,50 +285,33 @@ class Beam:
             np.exp(-(aggregation_parameter*stress)/self.yield_stress)
             )/self.yield_stress/np.sum(np.exp(f*aggregation_parameter))
 
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-            rotations = np.concatenate(rotations, axis=0)
-
-            # allocate output 
-            d_dv_struct = np.zeros_like(self.dv_struct)
-            d_x = np.zeros_like(x)
-            d_rotation = np.zeros_like(rotations)
-            d_modulus = 0.
-
-            for i in range(len(x)-1):
-                # dv_struct derivatives
-                d_dv_struct[i] += adjoint*func_struct_wrt_stress[i]*self.modulus*(rotations[i+1]-rotations[i])/(x[i+1] - x[i])/2
-
-                # x derivatives
-                stress_wrt_L = -stress[i]/(x[i+1] - x[i])
-                d_x[i+1] += adjoint*func_struct_wrt_stress[i]*stress_wrt_L
-                d_x[i]   -= adjoint*func_struct_wrt_stress[i]*stress_wrt_L
-
-                # rotation derivatives
-                stress_wrt_rotation = stress[i]/(rotations[i+1]-rotations[i])
-                d_rotation[i+1] += adjoint*func_struct_wrt_stress[i]*stress_wrt_rotation
-                d_rotation[i]   -= adjoint*func_struct_wrt_stress[i]*stress_wrt_rotation 
-
-                # modulus derivatives
-                stress_wrt_modulus = stress[i]/self.modulus
-                d_modulus += adjoint*func_struct_wrt_stress[i]*stress_wrt_modulus     
-
-            d_yield_stress = adjoint*np.dot(np.exp(f*aggregation_parameter)/np.sum(np.exp(f*aggregation_parameter)), -f/self.yield_stress)
-     
-        else:
-            d_dv_struct = None
-            d_x = None
-            d_rotation = None
-            d_modulus = None
-            d_yield_stress = None
+        d_yield_stress = adjoint*np.dot(np.exp(f*aggregation_parameter)/np.sum(np.exp(f*aggregation_parameter)), -f/self.yield_stress)
+
+        # stress adjoints of the local elements
+        dv_struct = self.dv_struct[p.elements]
+        d_stress = adjoint*func_struct_wrt_stress[p.elements]
+        stress = stress[p.elements]
+        L = np.diff(x)
+
+        # dv_struct derivatives
+        d_dv_struct = d_stress*self.modulus*np.diff(rotations)/L/2
+
+        # x derivatives
+        d_L = -d_stress*stress/L
+        d_x = p.element_to_nodes(-d_L, d_L)
+
+        # rotation derivatives
+        d_drotation = d_stress*self.modulus*dv_struct/L/2
+        d_rotation = p.element_to_nodes(-d_drotation, d_drotation)
+
+        # modulus derivatives
+        d_modulus = np.sum(d_stress*stress)/self.modulus
 
         # distribute output
-        d_dv_struct = self.comm.bcast(d_dv_struct, root=0)
-        d_x = self._distribute_output(d_x)
-        d_rotation = self._distribute_output(d_rotation)
-        d_modulus = self.comm.bcast(d_modulus, root=0)
-        d_yield_stress = self.comm.bcast(d_yield_stress, root=0)
+        d_dv_struct = p.sum_elements(d_dv_struct)
+        d_x = p.scatter_add(d_x)
+        d_rotation = p.scatter_add(d_rotation)
+        d_modulus = p.sum(d_modulus)
 
         # pad outputs into correct dof
         d_xs = self._pad_output(size=3*self.n_nodes, n1=0, n2=3, x=d_x)
@@ -326,69 +320,51 @@ class Beam:
         return d_dv_struct, d_xs, d_us, d_modulus, d_yield_stress
 
     def compute_mass(self):
-        x = self.comm.gather(self.xyz[0::3], root=0)
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
 
-        # only run on rank 0
-        mass = 0.
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-
-            for i in range(len(x)-1):
-                mass += (x[i+1]-x[i])*self.panel_width*self.dv_struct[i]*self.density
+        # mass of the local elements
+        mass = np.sum(np.diff(x)*self.dv_struct[p.elements])*self.panel_width*self.density
 
-        mass = self.comm.bcast(mass)
+        mass = p.sum(mass)
         return mass
 
     def compute_mass_derivatives(self, adjoint):
-        x = self.comm.gather(self.xyz[0::3], root=0)
+        p = self.partition
+        x = p.collect(self.xyz[0::3])
 
-        # only run on rank 0
-        if self.rank == 0:
-            x = np.concatenate(x, axis=0)
-
-            # allocate output 
-            d_dv_struct = np.zeros_like(self.dv_struct)
-            d_x = np.zeros_like(x)
-            d_density = 0.
+        dv_struct = self.dv_struct[p.elements]
+        L = np.diff(x)
 
-            for i in range(len(x)-1):
-                # dv_struct derivatives
-                d_dv_struct[i] += adjoint*(x[i+1]-x[i])*self.panel_width*self.density
+        # dv_struct derivatives
+        d_dv_struct = adjoint*L*self.panel_width*self.density
 
-                # x derivatives
-                d_x[i+1] += adjoint*self.panel_width*self.dv_struct[i]*self.density
-                d_x[i]   -= adjoint*self.panel_width*self.dv_struct[i]*self.density
+        # x derivatives
+        d_L = adjoint*self.panel_width*dv_struct*self.density
+        d_x = p.element_to_nodes(-d_L, d_L)
 
-                # density derivatives
-                d_density += adjoint*(x[i+1]-x[i])*self.panel_width*self.dv_struct[i]
-
-        else:
-            d_dv_struct = None
-            d_x = None
-            d_density = None
+        # density derivatives
+        d_density = adjoint*np.sum(L*dv_struct)*self.panel_width
 
         # distribute output
-        d_dv_struct = self.comm.bcast(d_dv_struct, root=0)
-        d_x = self._distribute_output(d_x)
-        d_density = self.comm.bcast(d_density, root=0)
+        d_dv_struct = p.sum_elements(d_dv_struct)
+        d_x = p.scatter_add(d_x)
+        d_density = p.sum(d_density)
 
         # pad outputs into correct dof
         d_xs = self._pad_output(size=3*self.n_nodes, n1=0, n2=3, x=d_x)
 
         return d_dv_struct, d_xs, d_density
 
-    def _distribute_output(self, x):
-        x = self.comm.bcast(x, root=0)
-        if self.owned is not None:
-            x = x[self.owned]
-        return x
+    def _get_element_dofs(self, X):
+        # dof 2 and 4 of the two nodes of each local element, shape (n_elements, 4)
+        dofs = 2*np.arange(self.partition.n_elements)[:,np.newaxis] + np.arange(4)
+        return X[dofs]
 
-    def _distribute_output_2dof(self, x):
-        x = self.comm.bcast(x, root=0)
-        if self.owned is not None:
-            owned = np.c_[self.owned*2,self.owned*2+1].flatten()
-            x = x[owned]
-        return x
+    def _collect_2dof(self, x, halo=True):
+        # dof 2 and 4 of the nodes of the local mesh part
+        X = self._extract_2dof(x).reshape(-1,2)
+        return self.partition.collect(X, halo=halo).flatten()
 
     def _pad_output(self, size, n1, n2, x):
         if self.owned is not None:
@@ -398,21 +374,16 @@ class Beam:
             X = np.zeros(0)
         return X
 
-    def _pad_output_2dof(self, size, x):
-        if self.owned is not None:
-            X = np.zeros(size)
-            X[2::6] = x[0::2]
-            X[4::6] = x[1::2]
-        else:
-            X = np.zeros(0)
+    def _pad_output_2dof(self, x):
+        X = np.zeros(len(x)//2*self.n_dof)
+        X[2::6] = x[0::2]
+        X[4::6] = x[1::2]
         return X
 
-    def _extract_2dof(self, size, mask, x):
-        X = np.zeros(size)
+    def _extract_2dof(self, x):
+        X = np.zeros(len(x)//self.n_dof*2)
         X[0::2] = x[2::6]
         X[1::2] = x[4::6]
-        if mask is not None:
-            X = X[mask]
         return X
 
     def write_output(self, u, stress):
@@ -0,0 +1,234 @@
+import argparse
+import time
+
+import numpy as np
+from mpi4py import MPI
+
+from beam_solver import Beam
+from piston_theory import PistonTheory
+
+# Micro-benchmark of the vectorized element-derivative kernels of Beam and PistonTheory
+# against the element loops they replaced, on one rank:
+#
+#   python benchmark_derivatives.py --elements 100 1000 10000
+
+
+# element loops, serial versions of the previous implementations
+def loop_stiffness_derivatives(beam, u, adjoint):
+    x = beam.xyz[0::3]
+    U = beam._extract_2dof(u)
+    Adjoint = beam._extract_2dof(adjoint)
+
+    d_dv_struct = np.zeros_like(beam.dv_struct)
+    d_x = np.zeros_like(x)
+
+    EI = (1/12)*beam.modulus*beam.panel_width*beam.dv_struct**3
+    for i in range(len(x)-1):
+        L = x[i+1] - x[i]
+
+        EI_wrt_dv_struct = (1/12)*beam.modulus*beam.panel_width*3*beam.dv_struct**2
+        K_wrt_dv_struct = EI_wrt_dv_struct[i]*np.array([
+            [12/L**3,  6/L**2, -12/L**3, 6/L**2],
+            [6/L**2,   4/L,     -6/L**2, 2/L],
+            [-12/L**3, -6/L**2, 12/L**3, -6/L**2],
+            [6/L**2,   2/L,     -6/L**2, 4/L],
+        ])
+        d_dv_struct[i] += Adjoint[i*2:i*2+4]@K_wrt_dv_struct@U[i*2:i*2+4]
+
+        K_wrt_L = EI[i]*np.array([
+            [-36/L**4, -12/L**3, 36/L**4,  -12/L**3],
+            [-12/L**3, -4/L**2,  12/L**3,  -2/L**2],
+            [36/L**4,  12/L**3,  -36/L**4, 12/L**3],
+            [-12/L**3, -2/L**2,  12/L**3,  -4/L**2],
+        ])
+        d_x[i+1] += Adjoint[i*2:i*2+4]@K_wrt_L@U[i*2:i*2+4]
+        d_x[i]   -= Adjoint[i*2:i*2+4]@K_wrt_L@U[i*2:i*2+4]
+
+    return d_dv_struct, d_x
+
+def loop_stress_derivatives(beam, u, stress, aggregation_parameter, adjoint):
+    x = beam.xyz[0::3]
+    rotations = u[4::6]
+
+    f = np.r_[stress,-stress]/beam.yield_stress
+    func_struct_wrt_stress = (
+        np.exp((aggregation_parameter*stress)/beam.yield_stress) -
+        np.exp(-(aggregation_parameter*stress)/beam.yield_stress)
+        )/beam.yield_stress/np.sum(np.exp(f*aggregation_parameter))
+
+    d_dv_struct = np.zeros_like(beam.dv_struct)
+    d_x = np.zeros_like(x)
+    d_rotation = np.zeros_like(rotations)
+    d_modulus = 0.
+
+    for i in range(len(x)-1):
+        d_dv_struct[i] += adjoint*func_struct_wrt_stress[i]*beam.modulus*(rotations[i+1]-rotations[i])/(x[i+1] - x[i])/2
+
+        stress_wrt_L = -stress[i]/(x[i+1] - x[i])
+        d_x[i+1] += adjoint*func_struct_wrt_stress[i]*stress_wrt_L
+        d_x[i]   -= adjoint*func_struct_wrt_stress[i]*stress_wrt_L
+
+        stress_wrt_rotation = stress[i]/(rotations[i+1]-rotations[i])
+        d_rotation[i+1] += adjoint*func_struct_wrt_stress[i]*stress_wrt_rotation
+        d_rotation[i]   -= adjoint*func_struct_wrt_stress[i]*stress_wrt_rotation
+
+        stress_wrt_modulus = stress[i]/beam.modulus
+        d_modulus += adjoint*func_struct_wrt_stress[i]*stress_wrt_modulus
+
+    return d_dv_struct, d_x, d_rotation, d_modulus
+
+def loop_mass_derivatives(beam, adjoint):
+    x = beam.xyz[0::3]
+
+    d_dv_struct = np.zeros_like(beam.dv_struct)
+    d_x = np.zeros_like(x)
+    d_density = 0.
+
+    for i in range(len(x)-1):
+        d_dv_struct[i] += adjoint*(x[i+1]-x[i])*beam.panel_width*beam.density
+
+        d_x[i+1] += adjoint*beam.panel_width*beam.dv_struct[i]*beam.density
+        d_x[i]   -= adjoint*beam.panel_width*beam.dv_struct[i]*beam.density
+
+        d_density += adjoint*(x[i+1]-x[i])*beam.panel_width*beam.dv_struct[i]
+
+    return d_dv_struct, d_x, d_density
+
+def loop_pressure_derivatives(aero, adjoint):
+    x = aero.xyz[0::3]
+    z = aero.xyz[2::3]
+
+    d_x = np.zeros_like(x)
+    d_z = np.zeros_like(z)
+    d_aoa = 0.
+    d_qdyn = 0.
+    d_mach = 0.
+
+    for i in range(len(x)-1):
+        dzdx = (z[i+1]-z[i])/(x[i+1]-x[i])
+
+        d_x[i]   += adjoint[i]*4*aero.qdyn/np.sqrt(aero.mach**2 - 1)*dzdx/(x[i+1]-x[i])
+        d_x[i+1] -= adjoint[i]*4*aero.qdyn/np.sqrt(aero.mach**2 - 1)*dzdx/(x[i+1]-x[i])
+
+        d_z[i]   -= adjoint[i]*4*aero.qdyn/np.sqrt(aero.mach**2 - 1)/(x[i+1]-x[i])
+        d_z[i+1] += adjoint[i]*4*aero.qdyn/np.sqrt(aero.mach**2 - 1)/(x[i+1]-x[i])
+
+        d_aoa += adjoint[i]*-4*aero.qdyn/np.sqrt(aero.mach**2 - 1)*np.pi/180
+
+        d_qdyn += adjoint[i]*-4/np.sqrt(aero.mach**2 - 1)*(aero.aoa*np.pi/180 - dzdx)
+
+        d_mach += adjoint[i]*4*aero.qdyn*aero.mach*(aero.aoa*np.pi/180 - dzdx)/(aero.mach**2 - 1)**(3/2)
+
+    return d_x, d_z, d_aoa, d_qdyn, d_mach
+
+def loop_force_derivatives(aero, adjoint):
+    x = aero.xyz[0::3]
+    adjoint = adjoint[2::3]
+
+    d_x = np.zeros_like(x)
+    d_p = np.zeros_like(aero.pressure)
+
+    for i in range(len(x)-1):
+        d_x[i]   -= aero.pressure[i]*aero.panel_width/2*adjoint[i]
+        d_x[i]   -= aero.pressure[i]*aero.panel_width/2*adjoint[i+1]
+        d_x[i+1] += aero.pressure[i]*aero.panel_width/2*adjoint[i]
+        d_x[i+1] += aero.pressure[i]*aero.panel_width/2*adjoint[i+1]
+
+        d_p[i] += aero.panel_width*(x[i+1]-x[i])/2*adjoint[i]
+        d_p[i] += aero.panel_width*(x[i+1]-x[i])/2*adjoint[i+1]
+
+    return d_x, d_p
+
+
+# the same terms from the vectorized kernels, unpadded
+def vectorized_stiffness_derivatives(beam, u, adjoint):
+    d_dv_struct, d_xs, _ = beam.compute_stiffness_derivatives(u, adjoint)
+    return d_dv_struct, d_xs[0::3]
+
+def vectorized_stress_derivatives(beam, u, stress, aggregation_parameter, adjoint):
+    d_dv_struct, d_xs, d_us, d_modulus, _ = beam.compute_stress_derivatives(u, stress, aggregation_parameter, adjoint)
+    return d_dv_struct, d_xs[0::3], d_us[4::6], d_modulus
+
+def vectorized_mass_derivatives(beam, adjoint):
+    d_dv_struct, d_xs, d_density = beam.compute_mass_derivatives(adjoint)
+    return d_dv_struct, d_xs[0::3], d_density
+
+def vectorized_pressure_derivatives(aero, adjoint):
+    d_xa, d_aoa, d_qdyn, d_mach = aero.compute_pressure_derivatives(adjoint)
+    return d_xa[0::3], d_xa[2::3], d_aoa, d_qdyn, d_mach
+
+def vectorized_force_derivatives(aero, adjoint):
+    d_xa, d_p = aero.compute_force_derivatives(adjoint)
+    return d_xa[0::3], d_p
+
+
+def setup_solvers(N_el, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 0.3, N_el+1)
+    z = 1e-3*rng.standard_normal(N_el+1)
+    xyz = np.c_[x,np.zeros_like(x),z].flatten()
+
+    beam = Beam(panel_chord=0.3, panel_width=0.01, N_el=N_el, comm=MPI.COMM_SELF)
+    beam.xyz = xyz
+    beam.dv_struct = 0.001 + 1e-4*rng.random(N_el)
+    beam.modulus = 70e9
+    beam.yield_stress = 270e6
+    beam.density = 2800.
+
+    aero = PistonTheory(panel_chord=0.3, panel_width=0.01, N_el=N_el, comm=MPI.COMM_SELF)
+    aero.xyz = xyz
+    aero.aoa = 3.
+    aero.qdyn = 3e4
+    aero.mach = 3.
+    aero.pressure = aero.compute_pressure()
+
+    u = 1e-3*rng.standard_normal(6*(N_el+1))
+    adjoint_struct = rng.standard_normal(6*(N_el+1))
+    adjoint_aero = rng.standard_normal(3*(N_el+1))
+    adjoint_pressure = rng.standard_normal(N_el)
+    stress, _ = beam.compute_stress(u, 20.)
+
+    cases = {
+        'stiffness': (loop_stiffness_derivatives, vectorized_stiffness_derivatives, (beam, u, adjoint_struct)),
+        'stress':    (loop_stress_derivatives, vectorized_stress_derivatives, (beam, u, stress, 20., 1.)),
+        'mass':      (loop_mass_derivatives, vectorized_mass_derivatives, (beam, 1.)),
+        'pressure':  (loop_pressure_derivatives, vectorized_pressure_derivatives, (aero, adjoint_pressure)),
+        'force':     (loop_force_derivatives, vectorized_force_derivatives, (aero, adjoint_aero)),
+    }
+    return cases
+
+def time_call(function, args, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def max_relative_difference(a, b):
+    difference = 0.
+    for x, y in zip(a, b):
+        x = np.atleast_1d(x)
+        y = np.atleast_1d(y)
+        difference = max(difference, np.max(np.abs(x-y))/max(np.max(np.abs(y)), 1e-300))
+    return difference
+
+def main():
+    parser = argparse.ArgumentParser(description='Element loops vs vectorized derivative kernels')
+    parser.add_argument('--elements', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='Numbers of elements to benchmark')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Number of timed calls, the fastest is reported')
+    args = parser.parse_args()
+
+    print(f'{"kernel":<10} {"N_el":>7} {"loop [s]":>10} {"vectorized [s]":>15} {"speedup":>8} {"max rel diff":>13}')
+    for N_el in args.elements:
+        for name, (loop, vectorized, inputs) in setup_solvers(N_el).items():
+            difference = max_relative_difference(vectorized(*inputs), loop(*inputs))
+            loop_time = time_call(loop, inputs, args.repeats)
+            vectorized_time = time_call(vectorized, inputs, args.repeats)
+            print(f'{name:<10} {N_el:>7d} {loop_time:>10.2e} {vectorized_time:>15.2e} '
+                  f'{loop_time/vectorized_time:>8.1f} {difference:>13.1e}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import numpy as np
+from mpi4py import MPI
+
+class LinePartition:
+    """
+    Contiguous partition of the nodes of a line mesh over the ranks of a communicator.
+    Element i connects nodes i and i+1.
+
+    In distributed mode, each rank computes the elements whose left node it owns. The right node
+    of its last element is a halo node owned by the next rank, so the local mesh part is the
+    owned nodes plus the halo node, and neighboring ranks share one interface node.
+    In gather mode, the whole mesh is gathered to rank 0, which computes all the elements.
+    """
+    def __init__(self, n_nodes, comm=MPI.COMM_WORLD, distributed=True):
+        self.comm = comm
+        self.rank = comm.Get_rank()
+        self.nprocs = comm.Get_size()
+        self.distributed = distributed
+        self.n_global_nodes = n_nodes
+        self.n_global_elements = n_nodes - 1
+
+        ave, res = divmod(n_nodes, self.nprocs)
+        counts = [ave + 1 if p < res else ave for p in range(self.nprocs)]
+        starts = np.r_[0, np.cumsum(counts)]
+        self.start = starts[self.rank]
+        self.end = starts[self.rank+1]
+
+        self.n_nodes = self.end - self.start
+        self.owned = np.arange(self.start, self.end) if self.n_nodes > 0 else None
+
+        # ranks with nodes come first, so the neighbors of a rank with nodes are the adjacent ranks
+        self.has_left = self.n_nodes > 0 and self.start > 0
+        self.has_right = self.n_nodes > 0 and self.end < n_nodes
+
+        # global node range of the local mesh part
+        if distributed:
+            self.mesh_start = self.start
+            self.mesh_end = self.end + 1 if self.has_right else self.end
+        else:
+            self.mesh_start = 0
+            self.mesh_end = n_nodes if self.rank == 0 else 0
+        self.n_mesh_nodes = self.mesh_end - self.mesh_start
+        self.n_elements = max(self.n_mesh_nodes - 1, 0)
+        self.elements = slice(self.mesh_start, self.mesh_start + self.n_elements)
+
+        # interface nodes between the mesh parts: the first node of each rank but the first
+        self.n_interfaces = np.count_nonzero(counts) - 1 if distributed else 0
+        self.interface_nodes = starts[1:self.n_interfaces+1]
+        self.left_interface = self.rank - 1 if distributed and self.has_left else None
+        self.right_interface = self.rank if distributed and self.has_right else None
+
+    def collect(self, values, halo=True):
+        # values of the owned nodes -> values of the nodes of the local mesh part.
+        # Without halo, the halo node gets zeros, for contributions that its owner already has
+        empty = np.array(values[:0])
+        if not self.distributed:
+            values = self.comm.gather(values, root=0)
+            return np.concatenate(values, axis=0) if self.rank == 0 else empty
+
+        left = self.rank - 1 if self.has_left else MPI.PROC_NULL
+        right = self.rank + 1 if self.has_right else MPI.PROC_NULL
+        first = values[:1] if self.n_nodes > 0 else None
+        halo_values = self.comm.sendrecv(first, dest=left, source=right)
+        if self.n_mesh_nodes == 0:
+            return empty
+        if self.has_right:
+            if not halo:
+                halo_values = np.zeros_like(halo_values)
+            values = np.concatenate([values, halo_values], axis=0)
+        return np.array(values)
+
+    def scatter(self, values):
+        # values of the nodes of the local mesh part -> values of the owned nodes
+        if not self.distributed:
+            values = self.comm.bcast(values, root=0)
+            return values[self.owned] if self.owned is not None else values[:0]
+        return np.array(values[:self.n_nodes])
+
+    def scatter_add(self, values):
+        # contributions to the nodes of the local mesh part -> sums of the contributions
+        # to the owned nodes, adding the contributions to the halo node to its owner
+        if not self.distributed:
+            return self.scatter(values)
+
+        left = self.rank - 1 if self.has_left else MPI.PROC_NULL
+        right = self.rank + 1 if self.has_right else MPI.PROC_NULL
+        halo_values = values[self.n_nodes:] if self.has_right else None
+        received = self.comm.sendrecv(halo_values, dest=right, source=left)
+        values = np.array(values[:self.n_nodes])
+        if received is not None:
+            values[:1] += received
+        return values
+
+    def element_to_nodes(self, left, right):
+        # contributions of the local elements to their left and right nodes -> sums of the
+        # contributions to the nodes of the local mesh part
+        values = np.zeros(self.n_mesh_nodes)
+        values[:self.n_elements] += left
+        values[1:self.n_elements+1] += right
+        return values
+
+    def sum(self, value):
+        # sum of the contributions of the local mesh parts
+        if not self.distributed:
+            return self.comm.bcast(value, root=0)
+        return self.comm.allreduce(value, op=MPI.SUM)
+
+    def sum_elements(self, values):
+        # values of the local elements -> array of all the elements, summed over the ranks
+        if not self.distributed:
+            return self.comm.bcast(values, root=0)
+        total = np.zeros(self.n_global_elements)
+        total[self.elements] = values
+        self.comm.Allreduce(MPI.IN_PLACE, total, op=MPI.SUM)
+        return total
+
+    def collect_elements(self, values):
+        # values of the local elements -> values of all the elements on every rank
+        if not self.distributed:
+            return self.comm.bcast(values, root=0)
+        return np.concatenate(self.comm.allgather(values))
@@ -233,7 +233,8 @@ class StructBuilder(Builder):
             panel_chord=self.options['panel_chord'], 
             panel_width=self.options['panel_width'], 
             N_el=self.options['N_el'],
-            comm=comm
+            comm=comm,
+            distributed=self.options.get('distributed', True)
         )
 
     def get_mesh_coordinate_subsystem(self, scenario_name=None):
@@ -1,5 +1,6 @@
 import numpy as np
 from mpi4py import MPI
+from scipy import sparse
 
 class Xfer:
     def __init__(self, aero, struct, comm=MPI.COMM_WORLD):
@@ -10,18 +11,45 @@ class Xfer:
         self.rank = self.comm.Get_rank()
         self.nprocs = self.comm.Get_size()
 
+        # coordinates that the cached interpolation operator was computed with
+        self._interpolation_state = None
+
     def _linear_interpolate(self, x, grid):
-        if x < np.min(grid):
-            left = np.argmin(x)
-        else:
-            left = np.argwhere(grid<=x)[-1][0]
-        if left >= len(grid)-1:
-            left -= 1
+        # grid intervals that contain the points, the end intervals for the points outside the grid
+        left = np.searchsorted(grid, x, side='right') - 1
+        left = np.clip(left, 0, len(grid)-2)
         right = left + 1
         eta = (x - grid[left])/(grid[right] - grid[left])
 
         return right, left, eta
 
+    def _update_interpolation(self, xs, xa):
+        # sparse interpolation operator from the structural to the aero nodes, ua = H@us,
+        # only computed when the coordinates changed since the last call
+        state = np.concatenate([xs, xa])
+        if self._interpolation_state is not None and np.array_equal(state, self._interpolation_state):
+            return
+
+        self.right, self.left, self.eta = self._linear_interpolate(xa, xs)
+
+        rows = np.repeat(np.arange(len(xa)), 2)
+        cols = np.c_[self.left, self.right].flatten()
+        weights = np.c_[1-self.eta, self.eta].flatten()
+        self.H = sparse.csr_matrix((weights, (rows, cols)), shape=(len(xa), len(xs)))
+
+        self._interpolation_state = state
+
+    def _compute_eta_derivatives(self, xs, d_eta):
+        # derivatives of eta = (xa - xs[left])/(xs[right] - xs[left]) times d_eta
+        h = xs[self.right] - xs[self.left]
+
+        d_xs = np.zeros_like(xs)
+        np.add.at(d_xs, self.left, d_eta*(self.eta - 1)/h)
+        np.add.at(d_xs, self.right, -d_eta*self.eta/h)
+        d_xa = d_eta/h
+
+        return d_xs, d_xa
+
     def transfer_displacements(self):
         xs = self.comm.gather(self.xs[0::3], root=0)
         xa = self.comm.gather(self.xa[0::3], root=0)
@@ -35,12 +63,8 @@ class Xfer:
             xa = np.concatenate(xa, axis=0)
             us = np.concatenate(us, axis=0)
 
-            # allocate output 
-            ua = np.zeros_like(xa)
-
-            for i in range(len(xa)):
-                right,left,eta = self._linear_interpolate(xa[i],xs)
-                ua[i] = (1-eta)*us[left] + eta*us[right]
+            self._update_interpolation(xs, xa)
+            ua = self.H@us
 
         else:
             ua = None
@@ -70,29 +94,13 @@ class Xfer:
             us = np.concatenate(us, axis=0)
             adjoint = np.concatenate(adjoint, axis=0)
 
-            # allocate output 
-            d_xs = np.zeros_like(xs)
-            d_xa = np.zeros_like(xa)
-            d_us = np.zeros_like(us)
+            self._update_interpolation(xs, xa)
 
-            for i in range(len(xa)):
-                right,left,eta = self._linear_interpolate(xa[i],xs)
+            # xs and xa derivatives
+            d_xs, d_xa = self._compute_eta_derivatives(xs, adjoint*(us[self.right] - us[self.left]))
 
-                # xs derivatives
-                eta_wrt_xs_left = 1/(xs[left] - xs[right]) + (xa[i] - xs[left])/(xs[left] - xs[right])**2
-                eta_wrt_xs_right = -(xa[i] - xs[left])/(xs[right] - xs[left])**2
-
-                d_xs[left]  += adjoint[i]*(-eta_wrt_xs_left*us[left] + eta_wrt_xs_left*us[right])
-                d_xs[right] += adjoint[i]*(-eta_wrt_xs_right*us[left] + eta_wrt_xs_right*us[right])
-
-                # xa derivatives
-                eta_wrt_xa = 1/(xs[right] - xs[left])
-
-                d_xa[i] += adjoint[i]*(-eta_wrt_xa*us[left] + eta_wrt_xa*us[right])
-
-                # us derivatives
-                d_us[left]  += adjoint[i]*(1-eta)
-                d_us[right] += adjoint[i]*eta
+            # us derivatives
+            d_us = self.H.T@adjoint
  
         else:
             d_xs = None
@@ -124,13 +132,10 @@ class Xfer:
             xa = np.concatenate(xa, axis=0)
             fa = np.concatenate(fa, axis=0)
 
-            # allocate output
-            fs = np.zeros_like(xs)
-
-            for i in range(len(xa)):
-                right,left,eta = self._linear_interpolate(xa[i],xs)
-                fs[left] = (1-eta)*fa[i]
-                fs[right] = eta*fa[i]
+            # the transpose of the displacement transfer conserves the work of the loads,
+            # and sums the loads of the aero nodes that share a structural node
+            self._update_interpolation(xs, xa)
+            fs = self.H.T@fa
 
         else:
             fs = None
@@ -160,33 +165,13 @@ class Xfer:
             fa = np.concatenate(fa, axis=0)
             adjoint = np.concatenate(adjoint, axis=0)
 
-            # allocate output 
-            d_xs = np.zeros_like(xs)
-            d_xa = np.zeros_like(xa)
-            d_fa = np.zeros_like(fa)
+            self._update_interpolation(xs, xa)
 
-            for i in range(len(xa)):
-                right,left,eta = self._linear_interpolate(xa[i],xs)
-
-                # xs derivatives
-                eta_wrt_xs_left = 1/(xs[left] - xs[right]) + (xa[i] - xs[left])/(xs[left] - xs[right])**2
-                eta_wrt_xs_right = -(xa[i] - xs[left])/(xs[right] - xs[left])**2
-
-                d_xs[left]  += adjoint[left]*-eta_wrt_xs_left*fa[i]
-                d_xs[right] += adjoint[left]*-eta_wrt_xs_right*fa[i]
-
-                d_xs[left]  += adjoint[right]*eta_wrt_xs_left*fa[i]
-                d_xs[right] += adjoint[right]*eta_wrt_xs_right*fa[i]
-
-                # xa derivatives
-                eta_wrt_xa = 1/(xs[right] - xs[left])
- 
-                d_xa[i] += adjoint[left]*-eta_wrt_xa*fa[i]
-                d_xa[i] += adjoint[right]*eta_wrt_xa*fa[i]
+            # xs and xa derivatives
+            d_xs, d_xa = self._compute_eta_derivatives(xs, fa*(adjoint[self.right] - adjoint[self.left]))
 
-                # fa derivatives
-                d_fa[i] += adjoint[left]*(1-eta)
-                d_fa[i] += adjoint[right]*eta
+            # fa derivatives
+            d_fa = self.H@adjoint
 
         else:
             d_xs = None
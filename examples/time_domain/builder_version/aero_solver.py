@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 import numpy as np
 import openmdao.api as om
+from mphys import hash_content
+from mphys.modal_transfer import get_mode_shape_filenames, read_tecplot_mode_shapes
 from mphys.time_domain.time_domain_builder import TimeDomainBuilder
 from mphys.time_domain.time_domain_variables import TimeDomainInput
 
@@ -87,18 +89,20 @@ class HarmonicForcer(om.ExplicitComponent):
 
 class FakeAeroBuilder(TimeDomainBuilder):
     def __init__(self, root_name, nmodes, dt):
+        self.root_name = root_name
         self.nmodes = nmodes
         self.dt = dt
-        self._read_number_of_nodes(root_name)
-
-    def _read_number_of_nodes(self, root_name):
-        filename = f"{root_name}_mode1.dat"
-        fh = open(filename)
-        while True:
-            line = fh.readline()
-            if "zone" in line.lower():
-                self.nnodes = int(line.split("=")[2].split(",")[0])
-                return
+
+    def initialize(self, comm):
+        # the mode shape files are read once and shared with the transfer builder
+        filenames = get_mode_shape_filenames(self.root_name, self.nmodes)
+        mode_shapes = self.get_cached_artifact(
+            "mode_shapes",
+            hash_content(*filenames),
+            lambda: read_tecplot_mode_shapes(filenames),
+            comm,
+        )
+        self.nnodes = mode_shapes["coordinates"].shape[0]
 
     def get_number_of_nodes(self):
         return self.nnodes
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 import numpy as np
 import openmdao.api as om
+from mphys.time_domain.bdf import get_bdf_coefficients
 from mphys.time_domain.time_domain_builder import TimeDomainBuilder
 from mphys.time_domain.time_domain_variables import (
     TimeDerivativeVariable,
@@ -17,27 +18,24 @@ class ModalStep(om.ImplicitComponent):
     This a simpler model to work on time integration in mphys
     It could be an explicit component but it written as an implicit
     since the FEM solvers will be implicit
+
+    The BDF2 coefficients are computed from the times of the step and its
+    backplanes, so the step size can change between steps
     """
 
     def initialize(self):
         self.options.declare("nmodes", default=1)
-        self.options.declare("dt", default=0.0)
 
     def setup(self):
-        # BDF coefficients - 1st and 2nd derivatives
-        dt = self.options["dt"]
-        self.alpha = np.zeros(3)
-        self.alpha[0] = 3.0 / 2.0 / dt
-        self.alpha[1] = -2.0 / dt
-        self.alpha[2] = 1.0 / 2.0 / dt
-
-        self.beta = np.zeros(5)
-        for i in range(3):
-            for j in range(3):
-                self.beta[i + j] += self.alpha[i] * self.alpha[j]
-
         # OM setup
         nmodes = self.options["nmodes"]
+        self.add_input("time", tags=["mphys_input"], desc="time of step n")
+        for backplane in range(1, 5):
+            self.add_input(
+                f"time|t-{backplane}",
+                tags=["mphys_input"],
+                desc=f"time of step n-{backplane}",
+            )
         self.add_input(
             "m",
             shape=nmodes,
@@ -97,6 +95,22 @@ class ModalStep(om.ImplicitComponent):
             desc="current displacement (step n)",
         )
 
+    def _set_bdf_coefficients(self, inputs):
+        """
+        Variable step BDF coefficients - 1st and 2nd derivatives.
+        The acceleration is the BDF2 derivative of the BDF2 velocities of steps n, n-1 and n-2
+        """
+        times = np.concatenate(
+            [inputs["time"]] + [inputs[f"time|t-{backplane}"] for backplane in range(1, 5)]
+        )
+        self.alpha = get_bdf_coefficients(times[0:3])
+
+        self.beta = np.zeros(5)
+        for i in range(3):
+            alpha_prior = get_bdf_coefficients(times[i : i + 3])
+            for j in range(3):
+                self.beta[i + j] += self.alpha[i] * alpha_prior[j]
+
     def _get_accel_and_vel(self, inputs, outputs):
         accel = (
             self.beta[0] * outputs["u_struct"]
@@ -114,6 +128,7 @@ class ModalStep(om.ImplicitComponent):
         return accel, vel
 
     def apply_nonlinear(self, inputs, outputs, residuals):
+        self._set_bdf_coefficients(inputs)
         accel, vel = self._get_accel_and_vel(inputs, outputs)
 
         residuals["u_struct"] = (
@@ -124,6 +139,7 @@ class ModalStep(om.ImplicitComponent):
         )
 
     def solve_nonlinear(self, inputs, outputs):
+        self._set_bdf_coefficients(inputs)
         m = inputs["m"]
         c = inputs["c"]
         k = inputs["k"]
@@ -139,6 +155,7 @@ class ModalStep(om.ImplicitComponent):
         ) / (self.beta[0] * m + self.alpha[0] * c + k)
 
     def linearize(self, inputs, outputs, jacobian):
+        self._set_bdf_coefficients(inputs)
         self.m = inputs["m"]
         self.c = inputs["c"]
         self.k = inputs["k"]
@@ -159,6 +176,7 @@ class ModalStep(om.ImplicitComponent):
             )
 
     def apply_linear(self, inputs, outputs, d_inputs, d_outputs, d_residuals, mode):
+        self._set_bdf_coefficients(inputs)
         accel, vel = self._get_accel_and_vel(inputs, outputs)
         m = inputs["m"]
         c = inputs["c"]
@@ -176,8 +194,8 @@ class ModalStep(om.ImplicitComponent):
                     d_residuals["u_struct"] += vel * d_inputs["c"]
                 if "k" in d_inputs:
                     d_residuals["u_struct"] += outputs["u_struct"] * d_inputs["k"]
-                if "f" in d_inputs:
-                    d_residuals["u_struct"] -= d_inputs["f"]
+                if "f_struct" in d_inputs:
+                    d_residuals["u_struct"] -= d_inputs["f_struct"]
                 if "u_struct|t-4" in d_inputs:
                     d_residuals["u_struct"] += (
                         self.beta[4] * m * d_inputs["u_struct|t-4"]
@@ -208,8 +226,8 @@ class ModalStep(om.ImplicitComponent):
                     d_inputs["c"] += vel * d_residuals["u_struct"]
                 if "k" in d_inputs:
                     d_inputs["k"] += outputs["u_struct"] * d_residuals["u_struct"]
-                if "f" in d_inputs:
-                    d_inputs["f"] -= d_residuals["u_struct"]
+                if "f_struct" in d_inputs:
+                    d_inputs["f_struct"] -= d_residuals["u_struct"]
                 if "u_struct|t-4" in d_inputs:
                     d_inputs["u_struct|t-4"] += (
                         self.beta[4] * m * d_residuals["u_struct"]
@@ -242,7 +260,7 @@ class ModalStructBuilder(TimeDomainBuilder):
         return 1
 
     def get_coupling_group_subsystem(self, scenario_name=None):
-        return ModalStep(nmodes=self.nmodes, dt=self.dt)
+        return ModalStep(nmodes=self.nmodes)
 
     def get_time_derivative_variables(
         self, scenario_name=None
@@ -2,6 +2,7 @@
 from __future__ import print_function
 import numpy as np
 import openmdao.api as om
+from mphys.modal_transfer import load_mode_shapes
 
 class ModalStep(om.ImplicitComponent):
     """
@@ -147,24 +148,12 @@ class ModalInterface(om.ExplicitComponent):
         self.options.declare('nmodes',default=1)
         self.options.declare('root_name')
     def _read_mode_shapes(self):
+        # the files are parsed once and the arrays are shared by all the components
         nmodes = self.options['nmodes']
-        for imode in range(nmodes):
-            filename = self.options['root_name']+'_mode'+str(imode+1)+'.dat'
-            fh = open(filename)
-            while True:
-                line = fh.readline()
-                if 'zone' in line.lower():
-                    self.nnodes = int(line.split('=')[2].split(',')[0])
-                    if imode == 0:
-                        self.mdisp = np.zeros((nmodes,self.nnodes,3))
-                    for inode in range(self.nnodes):
-                        line = fh.readline()
-                        self.mdisp[imode,inode,0] = float(line.split()[4])
-                        self.mdisp[imode,inode,1] = float(line.split()[5])
-                        self.mdisp[imode,inode,2] = float(line.split()[6])
-                if not line:
-                    break
-            fh.close()
+        self.mdisp = load_mode_shapes(self.options['root_name'],nmodes,comm=self.comm)['mode_shapes']
+        self.nnodes = self.mdisp.shape[1]
+        # contiguous (nmodes, 3*nnodes) matrix for the projections
+        self.mode_matrix = np.ascontiguousarray(self.mdisp.reshape(nmodes,-1))
 
 class ModalForces(ModalInterface):
     def setup(self):
@@ -176,26 +165,16 @@ class ModalForces(ModalInterface):
         self.add_output('mf',shape=nmodes, desc = 'modal force')
 
     def compute(self,inputs,outputs):
-        outputs['mf'] = 0.0
-        for imode in range(self.options['nmodes']):
-            for inode in range(self.nnodes):
-                for k in range(3):
-                    outputs['mf'][imode] += self.mdisp[imode,inode,k] * inputs['f'][3*inode+k]
+        outputs['mf'] = self.mode_matrix @ inputs['f']
     def compute_jacvec_product(self,inputs,d_inputs,d_outputs,mode):
         if mode=='fwd':
             if 'mf' in d_outputs:
                 if 'f' in d_inputs:
-                    for imode in range(self.options['nmodes']):
-                        for inode in range(self.nnodes):
-                            for k in range(3):
-                                d_outputs['mf'][imode] += self.mdisp[imode,inode,k] * d_inputs['f'][3*inode+k]
+                    d_outputs['mf'] += self.mode_matrix @ d_inputs['f']
         if mode=='rev':
             if 'mf' in d_outputs:
                 if 'f' in d_inputs:
-                    for imode in range(self.options['nmodes']):
-                        for inode in range(self.nnodes):
-                            for k in range(3):
-                                d_inputs['f'][3*inode+k] += self.mdisp[imode,inode,k] * d_outputs['mf'][imode]
+                    d_inputs['f'] += self.mode_matrix.T @ d_outputs['mf']
 
 class ModalDisplacements(ModalInterface):
     def setup(self):
@@ -207,26 +186,16 @@ class ModalDisplacements(ModalInterface):
         self.add_output('dx',shape=nnodes*3,desc = 'nodal displacement')
 
     def compute(self,inputs,outputs):
-        outputs['dx'] = 0.0
-        for imode in range(self.options['nmodes']):
-            for inode in range(self.nnodes):
-                for k in range(3):
-                    outputs['dx'][3*inode+k] += self.mdisp[imode,inode,k] * inputs['md'][imode]
+        outputs['dx'] = self.mode_matrix.T @ inputs['md']
     def compute_jacvec_product(self,inputs,d_inputs,d_outputs,mode):
         if mode=='fwd':
             if 'dx' in d_outputs:
                 if 'md' in d_inputs:
-                    for imode in range(self.options['nmodes']):
-                        for inode in range(self.nnodes):
-                            for k in range(3):
-                                d_outputs['dx'][3*inode+k] += self.mdisp[imode,inode,k] * d_inputs['md'][imode]
+                    d_outputs['dx'] += self.mode_matrix.T @ d_inputs['md']
         if mode=='rev':
             if 'dx' in d_outputs:
                 if 'md' in d_inputs:
-                    for imode in range(self.options['nmodes']):
-                        for inode in range(self.nnodes):
-                            for k in range(3):
-                                d_inputs['md'][imode] += self.mdisp[imode,inode,k] * d_outputs['dx'][3*inode+k]
+                    d_inputs['md'] += self.mode_matrix @ d_outputs['dx']
 
 class HarmonicForcer(om.ExplicitComponent):
     def initialize(self):
@@ -234,13 +203,7 @@ class HarmonicForcer(om.ExplicitComponent):
         self.c1 = 1e-3
 
     def _read_mode_shapes(self):
-        filename = self.options['root_name']+'_mode1.dat'
-        fh = open(filename)
-        while True:
-            line = fh.readline()
-            if 'zone' in line.lower():
-                self.nnodes = int(line.split('=')[2].split(',')[0])
-                return
+        self.nnodes = load_mode_shapes(self.options['root_name'],1,comm=self.comm)['coordinates'].shape[0]
 
     def setup(self):
         self._read_mode_shapes()
@@ -1,6 +1,8 @@
 import numpy as np
 import openmdao.api as om
 
+from mphys.time_domain.step_history import StepHistory
+from mphys.time_domain.time_domain_variables import TimeDerivativeVariable
 from modal_comps import ModalDisplacements, ModalForces, ModalStep, HarmonicForcer
 
 class ModalIntegrator(om.ExplicitComponent):
@@ -9,6 +11,8 @@ class ModalIntegrator(om.ExplicitComponent):
         self.options.declare('nsteps',default=10)
         self.options.declare('dt',default=1.0)
         self.options.declare('root_name',default='')
+        self.options.declare('history_directory',default=None,
+                             desc='directory of the memory mapped modal displacement history. If None, kept in memory')
 
     def setup(self):
         nmodes = self.options['nmodes']
@@ -22,8 +26,9 @@ class ModalIntegrator(om.ExplicitComponent):
 
         self._setup_step_problem()
 
-        # temporary storage of in memory long term option is async file io
-        self.z = np.zeros((self.options['nsteps']+1,nmodes))
+        # modal displacements of each step, written to disk in the background if a directory is given
+        self.history = StepHistory([TimeDerivativeVariable('z',4,nmodes)],self.options['nsteps'],
+                                   directory=self.options['history_directory'],rank=self.comm.rank)
 
     def _setup_step_problem(self):
         """
@@ -95,7 +100,8 @@ class ModalIntegrator(om.ExplicitComponent):
             self._store_step_output(step)
 
         # compute integrator function of interest
-        outputs['z_end'] = self.z[-1,0]
+        self.history.flush()
+        outputs['z_end'] = self.history.read(self.options['nsteps'],'z')[0]
 
     def _set_indeps(self,inputs):
         self.problem['indeps.m'] = inputs['m']
@@ -108,12 +114,12 @@ class ModalIntegrator(om.ExplicitComponent):
         for backplane in range(1,5):
             prior_step = step - backplane
             if prior_step > 0:
-                self.problem[f'indeps.znm{backplane}'] = self.z[prior_step,:]
+                self.problem[f'indeps.znm{backplane}'] = self.history.read(prior_step,'z')
             else:
                 self.problem[f'indeps.znm{backplane}'] = inputs['z0']
 
     def _store_step_output(self,step):
-        self.z[step,:] = self.problem['modal_solver.zn']
+        self.history.write(step,'z',self.problem['modal_solver.zn'])
 
     def compute_jacvec_product(self,inputs,d_inputs,d_outputs,mode):
         if mode=='fwd':
@@ -244,7 +250,7 @@ class ModalIntegrator(om.ExplicitComponent):
 
     def _set_state(self,step,inputs):
         self._setup_step_backplanes(step,inputs)
-        self.problem['modal_solver.zn'] = self.z[step,:]
+        self.problem['modal_solver.zn'] = self.history.read(step,'z')
         self.problem['indeps.time'] = step*self.options['dt']
 
 def check_integrator_partials():
@@ -3,3 +3,5 @@ from .builder import Builder
 from .multipoint import Multipoint, MultipointParallel
 from .distributed_converter import DistributedConverter, DistributedVariableDescription
 from .mask_converter import MaskedConverter, UnmaskedConverter, MaskedVariableDescription
+from .artifact_cache import ArtifactCache, hash_content
+from .profiler import MphysProfiler
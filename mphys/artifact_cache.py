@@ -0,0 +1,171 @@
+import hashlib
+import os
+
+import numpy as np
+from openmdao.utils.mpi import MPI
+
+
+def hash_content(*items):
+    """
+    Build a content hash from a set of items that define an expensive
+    initialization product. Strings that are paths to existing files are hashed
+    by their file contents, arrays by their bytes, and anything else by its repr.
+
+    Parameters
+    ----------
+    items
+        The files, arrays, and parameters that the cached artifact depends on
+
+    Returns
+    -------
+    key : str
+        Hex digest identifying the content
+    """
+    sha = hashlib.sha1()
+    for item in items:
+        if isinstance(item, (str, os.PathLike)) and os.path.isfile(item):
+            with open(item, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+        elif isinstance(item, np.ndarray):
+            sha.update(str(item.dtype).encode())
+            sha.update(str(item.shape).encode())
+            sha.update(np.ascontiguousarray(item).tobytes())
+        else:
+            sha.update(repr(item).encode())
+        sha.update(b'|')
+    return sha.hexdigest()
+
+
+class ArtifactCache:
+    """
+    A cache of expensive builder initialization products such as mesh coordinates,
+    connectivity, partition maps, or transfer weights.
+
+    Builders are shared by every scenario of a multipoint group, and in a
+    MultipointParallel group each scenario calls the builder's `initialize` on its own
+    sub-communicator, so the same mesh files are read and processed once per scenario.
+    Artifacts fetched through this cache are computed once per process when no
+    directory is given. When a directory is given, they are computed once per compute node:
+    the lowest rank on each node computes and writes them as `.npy` files,
+    and every rank on that node maps the files read-only. A node-local file
+    system such as `/dev/shm` keeps a single copy of each artifact in shared memory.
+
+    Artifacts are keyed by name and a content hash, see :func:`hash_content`.
+    The arrays returned from the cache are shared between scenarios and are read-only.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Parameters
+        ----------
+        directory : str or None
+            Directory for the memory-mapped artifact files. If None, artifacts
+            are only shared within the process.
+        """
+        self.directory = directory
+        self._artifacts = {}
+
+    def fetch(self, name, key, compute, comm=None):
+        """
+        Return the arrays of a cached artifact, computing them if they have not been computed yet.
+
+        Parameters
+        ----------
+        name : str
+            Name of the artifact, e.g. `'aero_mesh'`
+        key : str
+            Content hash of everything the artifact depends on, see :func:`hash_content`.
+            Rank dependent artifacts like partition maps should include the comm size and rank in the key.
+        compute : callable
+            Function with no arguments that returns a dict of numpy arrays. It must not
+            perform collective operations because only one rank per node calls it.
+        comm : :class:`~mpi4py.MPI.Comm` or None
+            The communicator of the ranks fetching the artifact. All ranks of the communicator
+            must call fetch. If None, the artifact is computed by the calling process.
+
+        Returns
+        -------
+        artifact : dict
+            The arrays of the artifact
+        """
+        cache_key = (name, key)
+        if cache_key in self._artifacts:
+            return self._artifacts[cache_key]
+
+        if self.directory is None:
+            artifact = {array_name: self._read_only(array) for array_name, array in compute().items()}
+        else:
+            node_comm = self._get_node_comm(comm)
+            path = os.path.join(self.directory, f'{name}-{key}')
+            try:
+                if node_comm is None:
+                    if not os.path.isdir(path):
+                        self._write_artifact(path, compute())
+                else:
+                    self._write_artifact_on_node(node_comm, name, path, compute)
+            finally:
+                if node_comm is not None:
+                    node_comm.Free()
+            artifact = self._read_artifact(path)
+
+        self._artifacts[cache_key] = artifact
+        return artifact
+
+    def clear(self):
+        """
+        Release the artifacts held by this process. Files on disk are not removed.
+        """
+        self._artifacts.clear()
+
+    def _get_node_comm(self, comm):
+        if comm is None or MPI is None or comm.size == 1:
+            return None
+        return comm.Split_type(MPI.COMM_TYPE_SHARED)
+
+    def _write_artifact_on_node(self, node_comm, name, path, compute):
+        # the first rank of the node writes the artifact and tells the others whether it
+        # succeeded, so that they raise as well instead of waiting for it
+        error = None
+        if node_comm.rank == 0:
+            try:
+                if not os.path.isdir(path):
+                    self._write_artifact(path, compute())
+            except Exception as exception:
+                error = exception
+        failed = node_comm.bcast(error is not None, root=0)
+        if error is not None:
+            raise error
+        if failed:
+            raise RuntimeError(f'The artifact {name} could not be computed on the first rank of the node')
+
+    def _read_only(self, array):
+        # a read-only view, so that the arrays the compute function returned stay writable
+        array = np.asarray(array).view()
+        array.setflags(write=False)
+        return array
+
+    def _write_artifact(self, path, artifact):
+        # write into a scratch directory and rename so that other processes
+        # never see a partially written artifact
+        scratch = f'{path}.{os.getpid()}.tmp'
+        os.makedirs(scratch, exist_ok=True)
+        for array_name, array in artifact.items():
+            np.save(os.path.join(scratch, f'{array_name}.npy'), np.asarray(array))
+        try:
+            os.rename(scratch, path)
+        except OSError:
+            # another node sharing the file system wrote it first
+            for file in os.listdir(scratch):
+                os.remove(os.path.join(scratch, file))
+            os.rmdir(scratch)
+
+    def _read_artifact(self, path):
+        artifact = {}
+        for file in sorted(os.listdir(path)):
+            if file.endswith('.npy'):
+                artifact[file[:-4]] = np.load(os.path.join(path, file), mmap_mode='r')
+        return artifact
+
+
+default_artifact_cache = ArtifactCache()
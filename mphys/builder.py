@@ -1,3 +1,6 @@
+from .artifact_cache import default_artifact_cache
+
+
 class Builder:
     """
     MPHYS builder base class. Template for developers to create their builders.
@@ -25,6 +28,38 @@ class Builder:
         """
         pass
 
+    def get_cached_artifact(self, name, key, compute, comm=None):
+        """
+        Fetch an expensive initialization product from the builder's artifact cache.
+        Builders are shared by all the scenarios of a multipoint group, so
+        mesh coordinates, connectivity, transfer weights, etc. fetched with this method in
+        `initialize` are only computed once rather than once per scenario.
+        The cache can be replaced by setting the builder's `artifact_cache` attribute
+        to an :class:`~mphys.artifact_cache.ArtifactCache`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the artifact
+        key : str
+            Content hash of everything the artifact depends on, see :func:`~mphys.artifact_cache.hash_content`
+        compute : callable
+            Function with no arguments that returns a dict of numpy arrays
+        comm : :class:`~mpi4py.MPI.Comm` or None
+            The communicator passed to `initialize`. If provided and the cache has a
+            directory, the artifact is computed once per compute node and shared between its
+            ranks. Without a directory, each process computes the artifact once.
+
+        Returns
+        -------
+        artifact : dict
+            The read-only arrays of the artifact
+        """
+        cache = getattr(self, 'artifact_cache', None)
+        if cache is None:
+            cache = default_artifact_cache
+        return cache.fetch(name, key, compute, comm)
+
     def get_mesh_coordinate_subsystem(self, scenario_name=None):
         """
         The subsystem that contains the subsystem that will return the mesh
@@ -13,6 +13,9 @@ class CouplingAeroStructural(CouplingGroup):
         self.options.declare('struct_builder', recordable=False)
         self.options.declare('ldxfer_builder', recordable=False)
         self.options.declare("scenario_name", recordable=True, default=None)
+        self.options.declare('fuse_geo_disp', default=False,
+                             desc='If True, the displacement transfer outputs the deformed aerodynamic '
+                                  'surface x_aero directly and no GeoDisp is added')
 
     def setup(self):
         aero_builder = self.options['aero_builder']
@@ -24,10 +27,10 @@ class CouplingAeroStructural(CouplingGroup):
         aero = aero_builder.get_coupling_group_subsystem(scenario_name)
         struct = struct_builder.get_coupling_group_subsystem(scenario_name)
 
-        geo_disp = GeoDisp(number_of_nodes=aero_builder.get_number_of_nodes())
-
         self.mphys_add_subsystem('disp_xfer', disp_xfer)
-        self.mphys_add_subsystem('geo_disp', geo_disp)
+        if not self.options['fuse_geo_disp']:
+            geo_disp = GeoDisp(number_of_nodes=aero_builder.get_number_of_nodes())
+            self.mphys_add_subsystem('geo_disp', geo_disp)
         self.mphys_add_subsystem('aero', aero)
         self.mphys_add_subsystem('load_xfer', load_xfer)
         self.mphys_add_subsystem('struct', struct)
@@ -38,3 +41,24 @@ class CouplingAeroStructural(CouplingGroup):
         self.linear_solver = om.LinearBlockGS(maxiter=25, iprint=2,
                                               atol=1e-8, rtol=1e-8,
                                               use_aitken=True)
+
+    def configure(self):
+        self._check_disp_xfer_outputs()
+        super().configure()
+
+    def _check_disp_xfer_outputs(self):
+        """
+        Check that the displacement transfer of the ldxfer builder outputs the deformed surface
+        x_aero if and only if GeoDisp is fused into it
+        """
+        fuse_geo_disp = self.options['fuse_geo_disp']
+        outputs = self.disp_xfer.get_io_metadata(iotypes='output', tags='mphys_coupling')
+        outputs_x_aero = 'x_aero' in [meta['prom_name'] for meta in outputs.values()]
+        if outputs_x_aero != fuse_geo_disp:
+            if fuse_geo_disp:
+                problem = 'does not output the deformed surface x_aero'
+            else:
+                problem = 'outputs the deformed surface x_aero, which is also the output of GeoDisp'
+            raise ValueError(f'{self.msginfo}: fuse_geo_disp is {fuse_geo_disp}, but the displacement '
+                             f'transfer of the ldxfer builder {problem}. The ldxfer builder must be '
+                             f'configured consistently with fuse_geo_disp')
@@ -1,7 +1,6 @@
 import numpy as np
 
-import openmdao.api as om
-from openmdao.utils.mpi import MPI
+from .linear_glue import LinearGlueComponent, _flat_view
 
 
 class DistributedVariableDescription:
@@ -10,24 +9,74 @@ class DistributedVariableDescription:
     or distributed to serial
     """
 
-    def __init__(self, name: str, shape: tuple, tags=[]):
+    def __init__(self, name: str, shape: tuple, tags=[], sizes=None):
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the distributed variable
+        shape : tuple
+            Shape of the serial variable
+        tags : list
+            Tags of the distributed variable
+        sizes : list or None
+            Number of entries of the distributed output on each rank.
+            If None, the partition option of the DistributedConverter is used.
+            Only used for distributed outputs
+        """
         self.name = name
         self.shape = shape
         self.tags = tags
+        self.sizes = sizes
 
 
-class DistributedConverter(om.ExplicitComponent):
+def get_balanced_sizes(size, nranks, block_size=1):
+    """
+    Number of entries on each rank of a balanced partition of a vector
+
+    Parameters
+    ----------
+    size : int
+        Number of entries in the vector
+    nranks : int
+        Number of ranks to split the vector over
+    block_size : int
+        Number of consecutive entries that are kept on the same rank, e.g. 3 for nodal vectors
+
+    Returns
+    -------
+    sizes : numpy.ndarray
+        Number of entries on each rank
+    """
+    if size % block_size != 0:
+        raise ValueError(f'Size {size} is not a multiple of the block size {block_size}')
+    nblocks = size // block_size
+    blocks = np.full(nranks, nblocks // nranks, dtype=int)
+    blocks[:nblocks % nranks] += 1
+    return blocks * block_size
+
+
+class DistributedConverter(LinearGlueComponent):
     """
     An ExplicitComponent to convert from distributed to serial and serial to distributed variables.
     MPhys requires the coupling inputs and outputs to be distributed variables, so this
     class is provided to help with those conversions.
-    For each mphys variable, a {variable}_serial version is created for the nonparallel solver to connect to and the
-    distributed version will have the full vector on the root processor and zero length on the other processors.
+    For each mphys variable, a {variable}_serial version is created for the nonparallel solver to connect to.
     Given a list of distributed inputs in the options, the component will add variables to the inputs as distributed and
     produce {variable}_serial as outputs.
     Given a list of distributed outputs in the options, the component will add variables to the outputs as distributed and
     add {variable}_serial as inputs.
 
+    By default the distributed outputs have the full vector on the root processor and zero length on the
+    other processors. With the 'balanced' partition, or user-defined sizes in the variable descriptions,
+    the distributed outputs are split over the processors instead.
+    The distributed inputs can have any partition. The local parts of all of them are packed into
+    one buffer, so a single Iallgatherv gathers every serial output, and it overlaps with the local
+    copies to the distributed outputs. The reverse products gather the seeds of all the
+    distributed outputs in the same way.
+    On a single processor, the converter is a selection map and its partials are declared by
+    LinearGlueComponent. On more processors the products are used, so the same gathers also
+    sum the reverse seeds of the serial inputs over the processors.
     """
 
     def initialize(self):
@@ -37,50 +86,202 @@ class DistributedConverter(om.ExplicitComponent):
         self.options.declare(
             'distributed_outputs', default=[],
             desc='List of DistributedVariableDescription objects that will be converted from serial to distributed')
+        self.options.declare(
+            'partition', default='root', values=['root', 'balanced'],
+            desc='Partition of the distributed outputs without user-defined sizes. '
+                 '"root" puts the full vector on the root processor, '
+                 '"balanced" splits it evenly over the processors')
+        self.options.declare(
+            'block_size', default=1,
+            desc='Number of consecutive entries kept on the same processor in the balanced partition, '
+                 'e.g. 3 to keep the components of each node together')
 
     def setup(self):
+        super().setup()
+        rank = self.comm.Get_rank()
+        self._buffers = {}
+        # the serial outputs depend on the distributed inputs of the other processors, and the
+        # reverse seeds of the serial inputs are the sums of the seeds of all processors
+        self.matrix_free = self.comm.size > 1
+
         for input in self.options['distributed_inputs']:
             self.add_input(input.name, shape_by_conn=True, tags=input.tags, distributed=True)
             self.add_output(f'{input.name}_serial', shape=input.shape, distributed=False)
+            self.add_linear_map(f'{input.name}_serial', input.name)
 
+        # offsets of the local part of each distributed output in the serial vector
+        self._output_offsets = {}
+        self._output_sizes = {}
         for output in self.options['distributed_outputs']:
-            shape = output.shape if self.comm.Get_rank() == 0 else 0
+            sizes = self._get_output_sizes(output)
+            self._output_sizes[output.name] = sizes
+            self._output_offsets[output.name] = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+            if output.sizes is None and self.options['partition'] == 'root':
+                shape = output.shape if rank == 0 else 0
+            else:
+                shape = sizes[rank]
             self.add_input(f'{output.name}_serial', shape_by_conn=True, distributed=False)
             self.add_output(output.name, shape=shape, tags=output.tags, distributed=True)
+            local = self._get_local_slice(sizes, self._output_offsets[output.name])
+            self.add_linear_map(output.name, f'{output.name}_serial',
+                                rows=np.arange(sizes[rank]), cols=np.arange(local.start, local.stop))
 
-    def compute(self, inputs, outputs):
+    def setup_partials(self):
+        # the sizes of the distributed inputs are known once they are connected
+        self._input_sizes = {}
+        self._input_offsets = {}
         for input in self.options['distributed_inputs']:
-            if self.comm.Get_rank() == 0:
-                outputs[f'{input.name}_serial'] = inputs[input.name]
-            outputs[f'{input.name}_serial'] = self.comm.bcast(outputs[f'{input.name}_serial'])
+            local_size = self._get_var_meta(input.name, 'size')
+            sizes = np.array(self.comm.allgather(local_size), dtype=int)
+            self._input_sizes[input.name] = sizes
+            self._input_offsets[input.name] = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        self._exchanges = {
+            'inputs': (self._input_sizes,) + self._get_exchange_layout(self._input_sizes),
+            'outputs': (self._output_sizes,) + self._get_exchange_layout(self._output_sizes),
+        }
+        super().setup_partials()
+
+    def _get_output_sizes(self, output):
+        size = int(np.prod(output.shape))
+        nranks = self.comm.size
+        if output.sizes is not None:
+            sizes = np.asarray(output.sizes, dtype=int)
+            if sizes.size != nranks or np.sum(sizes) != size:
+                raise ValueError(f'Sizes of {output.name} must have one entry per processor '
+                                 f'that add up to {size}')
+            return sizes
+        if self.options['partition'] == 'balanced':
+            return get_balanced_sizes(size, nranks, self.options['block_size'])
+        sizes = np.zeros(nranks, dtype=int)
+        sizes[0] = size
+        return sizes
+
+    def _get_local_slice(self, sizes, offsets):
+        rank = self.comm.Get_rank()
+        return slice(offsets[rank], offsets[rank] + sizes[rank])
+
+    def _get_exchange_layout(self, sizes):
+        """
+        Layout of the fused gather of a set of distributed variables. Each processor sends the
+        local parts of all the variables in one buffer, so the receive buffer holds the parts of
+        processor 0, then those of processor 1, and so on.
 
+        Returns
+        -------
+        counts : numpy.ndarray
+            Number of entries sent by each processor
+        displacements : numpy.ndarray
+            Offset of the entries of each processor in the receive buffer
+        positions : dict
+            Index in the receive buffer of each entry of the serial vector of each variable
+        """
+        counts = np.zeros(self.comm.size, dtype=int)
+        for variable_sizes in sizes.values():
+            counts += variable_sizes
+        displacements = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        pieces = {name: [] for name in sizes}
+        for rank in range(self.comm.size):
+            offset = displacements[rank]
+            for name, variable_sizes in sizes.items():
+                pieces[name].append(np.arange(offset, offset + variable_sizes[rank]))
+                offset += variable_sizes[rank]
+        positions = {name: np.concatenate(variable_pieces) for name, variable_pieces in pieces.items()}
+        return counts, displacements, positions
+
+    def _start_exchange(self, key, local_values, dtype):
+        """
+        Pack the local parts of the variables of an exchange and start gathering them on every
+        processor. Variables without a value send zeros. Returns the receive buffer and the
+        request of the nonblocking collective, or None if there is nothing to wait for
+        """
+        sizes, counts, displacements, _ = self._exchanges[key]
+        rank = self.comm.Get_rank()
+        send = self._get_buffer(f'{key}_send', counts[rank], dtype)
+        offset = 0
+        for name, value in local_values.items():
+            size = sizes[name][rank]
+            if value is None:
+                send[offset:offset + size] = 0.0
+            else:
+                send[offset:offset + size] = _flat_view(value)
+            offset += size
+
+        receive = self._get_buffer(f'{key}_receive', np.sum(counts), dtype)
+        if self.comm.size > 1:
+            return receive, self.comm.Iallgatherv(send, [receive, (counts, displacements)])
+        receive[:] = send
+        return receive, None
+
+    def _get_buffer(self, name, size, dtype):
+        """
+        Buffer that is reused by the exchanges
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(size, dtype=dtype)
+        return buffer
+
+    def compute(self, inputs, outputs):
+        names = [input.name for input in self.options['distributed_inputs']]
+        if names:
+            values = {name: inputs[name] for name in names}
+            receive, request = self._start_exchange('inputs', values, inputs[names[0]].dtype)
+
+        # the serial inputs are available on every processor, so the scatter is a local copy
+        # that overlaps with the gather
         for output in self.options['distributed_outputs']:
-            if self.comm.Get_rank() == 0:
-                outputs[output.name] = inputs[f'{output.name}_serial']
+            local = self._get_local_slice(self._output_sizes[output.name], self._output_offsets[output.name])
+            _flat_view(outputs[output.name])[:] = _flat_view(inputs[f'{output.name}_serial'])[local]
+
+        if names:
+            if request is not None:
+                request.Wait()
+            positions = self._exchanges['inputs'][3]
+            for name in names:
+                _flat_view(outputs[f'{name}_serial'])[:] = receive[positions[name]]
 
     def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
         if mode == 'fwd':
-            for input in self.options['distributed_inputs']:
-                if input.name in d_inputs and f'{input.name}_serial' in d_outputs:
-                    if self.comm.Get_rank() == 0:
-                        d_outputs[f'{input.name}_serial'] += d_inputs[input.name]
-                    d_outputs[f'{input.name}_serial'] = self.comm.bcast(
-                        d_outputs[f'{input.name}_serial'])
+            key = 'inputs'
+            gathered = {input.name: (d_inputs, d_outputs) for input in self.options['distributed_inputs']}
+        if mode == 'rev':
+            key = 'outputs'
+            gathered = {output.name: (d_outputs, d_inputs) for output in self.options['distributed_outputs']}
 
-            for output in self.options['distributed_outputs']:
-                if output.name in d_outputs and f'{output.name}_serial' in d_inputs:
-                    if self.comm.Get_rank() == 0:
-                        d_outputs[output.name] += d_inputs[f'{output.name}_serial']
+        values = {}
+        dtype = float
+        for name, (d_distributed, d_serial) in gathered.items():
+            if name in d_distributed and f'{name}_serial' in d_serial:
+                values[name] = d_distributed[name]
+                dtype = values[name].dtype
+            else:
+                values[name] = None
+        if values:
+            receive, request = self._start_exchange(key, values, dtype)
 
+        # the seeds of the serial vectors are available on every processor, so their local
+        # slices are copied while the gather is in flight
+        if mode == 'fwd':
+            for output in self.options['distributed_outputs']:
+                name = output.name
+                if name in d_outputs and f'{name}_serial' in d_inputs:
+                    local = self._get_local_slice(self._output_sizes[name], self._output_offsets[name])
+                    _flat_view(d_outputs[name])[:] += _flat_view(d_inputs[f'{name}_serial'])[local]
         if mode == 'rev':
             for input in self.options['distributed_inputs']:
-                if input.name in d_inputs and f'{input.name}_serial' in d_outputs:
-                    if self.comm.Get_rank() == 0:
-                        d_inputs[input.name] += d_outputs[f'{input.name}_serial']
+                name = input.name
+                if name in d_inputs and f'{name}_serial' in d_outputs:
+                    local = self._get_local_slice(self._input_sizes[name], self._input_offsets[name])
+                    _flat_view(d_inputs[name])[:] += _flat_view(d_outputs[f'{name}_serial'])[local]
 
-            for output in self.options['distributed_outputs']:
-                if output.name in d_outputs and f'{output.name}_serial' in d_inputs:
-                    if self.comm.Get_rank() == 0:
-                        d_inputs[f'{output.name}_serial'] += d_outputs[output.name]
-                    d_inputs[f'{output.name}_serial'] = self.comm.bcast(
-                        d_inputs[f'{output.name}_serial'])
+        if values:
+            if request is not None:
+                request.Wait()
+            positions = self._exchanges[key][3]
+            for name, value in values.items():
+                if value is not None:
+                    d_serial = gathered[name][1][f'{name}_serial']
+                    _flat_view(d_serial)[:] += receive[positions[name]]
@@ -1,6 +1,6 @@
-import openmdao.api as om
+from .linear_glue import LinearGlueComponent
 
-class GeoDisp(om.ExplicitComponent):
+class GeoDisp(LinearGlueComponent):
     """
     This component adds the aerodynamic
     displacements to the geometry-changed aerodynamic surface
@@ -9,6 +9,7 @@ class GeoDisp(om.ExplicitComponent):
         self.options.declare('number_of_nodes')
 
     def setup(self):
+        super().setup()
         nnodes = self.options['number_of_nodes']
         local_size = nnodes * 3
 
@@ -26,19 +27,8 @@ class GeoDisp(om.ExplicitComponent):
                                   desc='deformed aerodynamic surface',
                                   tags=['mphys_coupling'])
 
+        self.add_linear_map('x_aero', 'x_aero0')
+        self.add_linear_map('x_aero', 'u_aero')
+
     def compute(self,inputs,outputs):
         outputs['x_aero'] = inputs['x_aero0'] + inputs['u_aero']
-
-    def compute_jacvec_product(self,inputs,d_inputs,d_outputs,mode):
-        if mode == 'fwd':
-            if 'x_aero' in d_outputs:
-                if 'x_aero0' in d_inputs:
-                    d_outputs['x_aero'] += d_inputs['x_aero0']
-                if 'u_aero' in d_inputs:
-                    d_outputs['x_aero'] += d_inputs['u_aero']
-        if mode == 'rev':
-            if 'x_aero' in d_outputs:
-                if 'x_aero0' in d_inputs:
-                    d_inputs['x_aero0'] += d_outputs['x_aero']
-                if 'u_aero' in d_inputs:
-                    d_inputs['u_aero']  += d_outputs['x_aero']
@@ -1,8 +1,20 @@
 import numpy as np
 import openmdao.api as om
+from openmdao.utils.mpi import MPI
 
 class IntegratedSurfaceForces(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('matrix_free', default=True,
+                             desc='If True, the derivatives are provided as Jacobian-vector products. '
+                                  'If False, the sparse partial derivatives are assembled so '
+                                  'OpenMDAO can store and color the Jacobian. The assembled '
+                                  'partials are only used when the component is on a single rank')
+
     def setup(self):
+        # the assembled partials of the totals wrt the distributed nodes are not
+        # summed over the ranks, so the products are used in parallel
+        self.matrix_free = self.options['matrix_free'] or self.comm.size > 1
+
         self.add_input('aoa',desc = 'angle of attack', units='rad',tags=['mphys_input'])
         self.add_input('yaw',desc = 'yaw angle',units='rad',tags=['mphys_input'])
         self.add_input('ref_area', val = 1.0,tags=['mphys_input'])
@@ -37,15 +49,45 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
         self.add_output('M_Y', desc = 'Total Y Moment', tags=['mphys_result'])
         self.add_output('M_Z', desc = 'Total Z Moment', tags=['mphys_result'])
 
-    def compute(self,inputs,outputs):
-        aoa = inputs['aoa']
-        yaw  = inputs['yaw']
-        area = inputs['ref_area']
-        q_inf = inputs['q_inf']
+    def setup_partials(self):
+        if self.matrix_free:
+            return
+
+        nnodes = self._get_var_meta('x_aero', 'size') // 3
+        node_cols = 3 * np.arange(nnodes)
+        scalars = ['ref_area', 'q_inf']
+
+        for k, axis in enumerate('XYZ'):
+            self.declare_partials(f'F_{axis}', 'f_aero', rows=np.zeros(nnodes, dtype=int), cols=node_cols + k)
+            self.declare_partials(f'C_{axis}', 'f_aero', rows=np.zeros(nnodes, dtype=int), cols=node_cols + k)
+            self.declare_partials(f'C_{axis}', scalars)
+
+            # each moment component depends on the other two components of the nodes and center
+            other_cols = np.concatenate((node_cols + (k + 1) % 3, node_cols + (k + 2) % 3))
+            other_center = [(k + 1) % 3, (k + 2) % 3]
+            for name in [f'M_{axis}', f'CM_{axis}']:
+                self.declare_partials(name, ['x_aero', 'f_aero'], rows=np.zeros(2 * nnodes, dtype=int),
+                                      cols=other_cols)
+                self.declare_partials(name, 'moment_center', rows=[0, 0], cols=other_center)
+            self.declare_partials(f'CM_{axis}', scalars + ['ref_length'])
+
+        lift_cols = np.concatenate((node_cols, node_cols + 2))
+        for name in ['Lift', 'C_L']:
+            self.declare_partials(name, 'f_aero', rows=np.zeros(2 * nnodes, dtype=int), cols=lift_cols)
+            self.declare_partials(name, 'aoa')
+        for name in ['Drag', 'C_D']:
+            self.declare_partials(name, 'f_aero', rows=np.zeros(3 * nnodes, dtype=int), cols=np.arange(3 * nnodes))
+            self.declare_partials(name, ['aoa', 'yaw'])
+        self.declare_partials(['C_L', 'C_D'], scalars)
+
+    def _get_local_totals(self, inputs):
+        """
+        Force and moment sums of the nodes on this rank:
+        [F_X, F_Y, F_Z, M_X, M_Y, M_Z]
+        """
         xc = inputs['moment_center'][0]
         yc = inputs['moment_center'][1]
         zc = inputs['moment_center'][2]
-        c = inputs['ref_length']
 
         x  = inputs['x_aero'][0::3]
         y  = inputs['x_aero'][1::3]
@@ -55,9 +97,68 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
         fy = inputs['f_aero'][1::3]
         fz = inputs['f_aero'][2::3]
 
-        fx_total = self.comm.allreduce(np.sum(fx))
-        fy_total = self.comm.allreduce(np.sum(fy))
-        fz_total = self.comm.allreduce(np.sum(fz))
+        return np.array([np.sum(fx), np.sum(fy), np.sum(fz),
+                          np.dot(fz,(y-yc)) - np.dot(fy,(z-zc)),
+                         -np.dot(fz,(x-xc)) + np.dot(fx,(z-zc)),
+                          np.dot(fy,(x-xc)) - np.dot(fx,(y-yc))])
+
+    def _get_local_seed_products(self, inputs, d_inputs):
+        """
+        Forward mode sums of the distributed seeds on this rank:
+        [dM_X, dM_Y, dM_Z] from x_aero, then [dF_X, dF_Y, dF_Z, dM_X, dM_Y, dM_Z] from f_aero
+        """
+        products = np.zeros(9, dtype=inputs['f_aero'].dtype)
+
+        fx = inputs['f_aero'][0::3]
+        fy = inputs['f_aero'][1::3]
+        fz = inputs['f_aero'][2::3]
+
+        if 'x_aero' in d_inputs:
+            dx = d_inputs['x_aero'][0::3]
+            dy = d_inputs['x_aero'][1::3]
+            dz = d_inputs['x_aero'][2::3]
+            products[0] =  np.dot(fz,dy) - np.dot(fy,dz)
+            products[1] = -np.dot(fz,dx) + np.dot(fx,dz)
+            products[2] =  np.dot(fy,dx) - np.dot(fx,dy)
+
+        if 'f_aero' in d_inputs:
+            xc = inputs['moment_center'][0]
+            yc = inputs['moment_center'][1]
+            zc = inputs['moment_center'][2]
+
+            x  = inputs['x_aero'][0::3]
+            y  = inputs['x_aero'][1::3]
+            z  = inputs['x_aero'][2::3]
+
+            dfx = d_inputs['f_aero'][0::3]
+            dfy = d_inputs['f_aero'][1::3]
+            dfz = d_inputs['f_aero'][2::3]
+            products[3] = np.sum(dfx)
+            products[4] = np.sum(dfy)
+            products[5] = np.sum(dfz)
+            products[6] =  np.dot(dfz,(y-yc)) - np.dot(dfy,(z-zc))
+            products[7] = -np.dot(dfz,(x-xc)) + np.dot(dfx,(z-zc))
+            products[8] =  np.dot(dfy,(x-xc)) - np.dot(dfx,(y-yc))
+        return products
+
+    def _allreduce(self, values):
+        """
+        Sum a packed array of values over the ranks with a single collective
+        """
+        if self.comm.size > 1:
+            self.comm.Allreduce(MPI.IN_PLACE, values, op=MPI.SUM)
+        return values
+
+    def compute(self,inputs,outputs):
+        aoa = inputs['aoa']
+        yaw  = inputs['yaw']
+        area = inputs['ref_area']
+        q_inf = inputs['q_inf']
+        c = inputs['ref_length']
+
+        # cache the totals for the linear products at this point
+        self._totals = self._allreduce(self._get_local_totals(inputs))
+        fx_total, fy_total, fz_total, m_x, m_y, m_z = self._totals
 
         outputs['F_X'] = fx_total
         outputs['F_Y'] = fy_total
@@ -75,10 +176,6 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
         outputs['C_L'] = outputs['Lift'] / (q_inf * area)
         outputs['C_D'] = outputs['Drag'] / (q_inf * area)
 
-        m_x = self.comm.allreduce( np.dot(fz,(y-yc)) - np.dot(fy,(z-zc)))
-        m_y = self.comm.allreduce(-np.dot(fz,(x-xc)) + np.dot(fx,(z-zc)))
-        m_z = self.comm.allreduce( np.dot(fy,(x-xc)) - np.dot(fx,(y-yc)))
-
         outputs['M_X'] =  m_x
         outputs['M_Y'] =  m_y
         outputs['M_Z'] =  m_z
@@ -87,6 +184,69 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
         outputs['CM_Y'] = m_y / (q_inf * area * c)
         outputs['CM_Z'] = m_z / (q_inf * area * c)
 
+    def compute_partials(self, inputs, partials):
+        aoa = inputs['aoa'][0]
+        yaw = inputs['yaw'][0]
+        area = inputs['ref_area'][0]
+        q_inf = inputs['q_inf'][0]
+        c = inputs['ref_length'][0]
+        qa = q_inf * area
+
+        # the partials are evaluated at the point of the last compute
+        totals = self._totals if np.iscomplexobj(inputs['f_aero']) else self._totals.real
+        force = totals[:3]
+        moment = totals[3:]
+        lift = -force[0] * np.sin(aoa) + force[2] * np.cos(aoa)
+        drag = force[0] * np.cos(aoa) * np.cos(yaw) - force[1] * np.sin(yaw) + force[2] * np.sin(aoa) * np.cos(yaw)
+
+        r = inputs['x_aero'].reshape(-1, 3) - inputs['moment_center']
+        f = inputs['f_aero'].reshape(-1, 3)
+        nnodes = f.shape[0]
+
+        for k, axis in enumerate('XYZ'):
+            k1 = (k + 1) % 3
+            k2 = (k + 2) % 3
+            partials[f'F_{axis}', 'f_aero'] = np.ones(nnodes)
+            partials[f'C_{axis}', 'f_aero'] = np.ones(nnodes) / qa
+            partials[f'C_{axis}', 'ref_area'] = -force[k] / (qa * area)
+            partials[f'C_{axis}', 'q_inf'] = -force[k] / (qa * q_inf)
+
+            # M_k = sum(r_k1 * f_k2 - r_k2 * f_k1)
+            d_moment_d_x = np.concatenate((f[:, k2], -f[:, k1]))
+            d_moment_d_f = np.concatenate((-r[:, k2], r[:, k1]))
+            d_moment_d_center = np.array([-force[k2], force[k1]])
+            partials[f'M_{axis}', 'x_aero'] = d_moment_d_x
+            partials[f'M_{axis}', 'f_aero'] = d_moment_d_f
+            partials[f'M_{axis}', 'moment_center'] = d_moment_d_center
+            partials[f'CM_{axis}', 'x_aero'] = d_moment_d_x / (qa * c)
+            partials[f'CM_{axis}', 'f_aero'] = d_moment_d_f / (qa * c)
+            partials[f'CM_{axis}', 'moment_center'] = d_moment_d_center / (qa * c)
+            partials[f'CM_{axis}', 'ref_area'] = -moment[k] / (qa * c * area)
+            partials[f'CM_{axis}', 'q_inf'] = -moment[k] / (qa * c * q_inf)
+            partials[f'CM_{axis}', 'ref_length'] = -moment[k] / (qa * c**2)
+
+        d_lift_d_f = np.concatenate((-np.sin(aoa) * np.ones(nnodes), np.cos(aoa) * np.ones(nnodes)))
+        d_drag_d_f = np.tile([np.cos(aoa) * np.cos(yaw), -np.sin(yaw), np.sin(aoa) * np.cos(yaw)], nnodes)
+        d_lift_d_aoa = -force[0] * np.cos(aoa) - force[2] * np.sin(aoa)
+        d_drag_d_aoa = -force[0] * np.sin(aoa) * np.cos(yaw) + force[2] * np.cos(aoa) * np.cos(yaw)
+        d_drag_d_yaw = -force[0] * np.cos(aoa) * np.sin(yaw) - force[1] * np.cos(yaw) - force[2] * np.sin(aoa) * np.sin(yaw)
+
+        partials['Lift', 'f_aero'] = d_lift_d_f
+        partials['Lift', 'aoa'] = d_lift_d_aoa
+        partials['C_L', 'f_aero'] = d_lift_d_f / qa
+        partials['C_L', 'aoa'] = d_lift_d_aoa / qa
+        partials['C_L', 'ref_area'] = -lift / (qa * area)
+        partials['C_L', 'q_inf'] = -lift / (qa * q_inf)
+
+        partials['Drag', 'f_aero'] = d_drag_d_f
+        partials['Drag', 'aoa'] = d_drag_d_aoa
+        partials['Drag', 'yaw'] = d_drag_d_yaw
+        partials['C_D', 'f_aero'] = d_drag_d_f / qa
+        partials['C_D', 'aoa'] = d_drag_d_aoa / qa
+        partials['C_D', 'yaw'] = d_drag_d_yaw / qa
+        partials['C_D', 'ref_area'] = -drag / (qa * area)
+        partials['C_D', 'q_inf'] = -drag / (qa * q_inf)
+
     def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
         aoa = inputs['aoa']
         yaw  = inputs['yaw']
@@ -105,9 +265,22 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
         fy = inputs['f_aero'][1::3]
         fz = inputs['f_aero'][2::3]
 
-        fx_total = self.comm.allreduce(np.sum(fx))
-        fy_total = self.comm.allreduce(np.sum(fy))
-        fz_total = self.comm.allreduce(np.sum(fz))
+        if mode == 'fwd' and ('x_aero' in d_inputs or 'f_aero' in d_inputs):
+            # the distributed seeds are reduced in the same collective as the totals
+            packed = np.concatenate((self._get_local_totals(inputs),
+                                     self._get_local_seed_products(inputs, d_inputs)))
+            packed = self._allreduce(packed)
+            totals = packed[:6]
+            dm_x_dx, dm_y_dx, dm_z_dx = packed[6:9]
+            dfx_total, dfy_total, dfz_total, dm_x_df, dm_y_df, dm_z_df = packed[9:]
+        elif getattr(self, '_totals', None) is not None:
+            totals = self._totals
+        else:
+            totals = self._allreduce(self._get_local_totals(inputs))
+
+        if not np.iscomplexobj(inputs['f_aero']):
+            totals = totals.real
+        fx_total, fy_total, fz_total, m_x, m_y, m_z = totals
 
         lift = -fx_total * np.sin(aoa) + fz_total * np.cos(aoa)
         drag = ( fx_total * np.cos(aoa) * np.cos(yaw)
@@ -115,10 +288,6 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                + fz_total * np.sin(aoa) * np.cos(yaw)
                )
 
-        m_x = self.comm.allreduce( np.dot(fz,(y-yc)) - np.dot(fy,(z-zc)))
-        m_y = self.comm.allreduce(-np.dot(fz,(x-xc)) + np.dot(fx,(z-zc)))
-        m_z = self.comm.allreduce( np.dot(fy,(x-xc)) - np.dot(fx,(y-yc)))
-
         if mode == 'fwd':
             if 'aoa' in d_inputs:
                 daoa_rad = d_inputs['aoa']
@@ -164,7 +333,7 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                     d_outputs['C_D'] += drag * d_nondim
                 if 'CM_X' in d_outputs:
                     d_outputs['CM_X'] += m_x * d_nondim / c
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_outputs['CM_Y'] += m_y * d_nondim / c
                 if 'CM_Z' in d_outputs:
                     d_outputs['CM_Z'] += m_z * d_nondim / c
@@ -189,7 +358,7 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                 d_nondim = - d_inputs['ref_length'] / (q_inf * area * c**2.0)
                 if 'CM_X' in d_outputs:
                     d_outputs['CM_X'] += m_x * d_nondim
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_outputs['CM_Y'] += m_y * d_nondim
                 if 'CM_Z' in d_outputs:
                     d_outputs['CM_Z'] += m_z * d_nondim
@@ -208,35 +377,26 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                     d_outputs['C_D'] += drag * d_nondim
                 if 'CM_X' in d_outputs:
                     d_outputs['CM_X'] += m_x * d_nondim / c
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_outputs['CM_Y'] += m_y * d_nondim / c
                 if 'CM_Z' in d_outputs:
                     d_outputs['CM_Z'] += m_z * d_nondim / c
 
             if 'x_aero' in d_inputs:
-                dx = d_inputs['x_aero'][0::3]
-                dy = d_inputs['x_aero'][1::3]
-                dz = d_inputs['x_aero'][2::3]
                 if 'M_X' in d_outputs:
-                    d_outputs['M_X'] +=  np.dot(fz,dy) - np.dot(fy,dz)
+                    d_outputs['M_X'] += dm_x_dx
                 if 'M_Y' in d_outputs:
-                    d_outputs['M_Y'] += -np.dot(fz,dx) + np.dot(fx,dz)
+                    d_outputs['M_Y'] += dm_y_dx
                 if 'M_Z' in d_outputs:
-                    d_outputs['M_Z'] +=  np.dot(fy,dx) - np.dot(fx,dy)
+                    d_outputs['M_Z'] += dm_z_dx
                 if 'CM_X' in d_outputs:
-                    d_outputs['CM_X'] += ( np.dot(fz,dy) - np.dot(fy,dz)) / (q_inf * area * c)
+                    d_outputs['CM_X'] += dm_x_dx / (q_inf * area * c)
                 if 'CM_Y' in d_outputs:
-                    d_outputs['CM_Y'] += (-np.dot(fz,dx) + np.dot(fx,dz)) / (q_inf * area * c)
+                    d_outputs['CM_Y'] += dm_y_dx / (q_inf * area * c)
                 if 'CM_Z' in d_outputs:
-                    d_outputs['CM_Z'] += ( np.dot(fy,dx) - np.dot(fx,dy)) / (q_inf * area * c)
+                    d_outputs['CM_Z'] += dm_z_dx / (q_inf * area * c)
 
             if 'f_aero' in d_inputs:
-                dfx = d_inputs['f_aero'][0::3]
-                dfy = d_inputs['f_aero'][1::3]
-                dfz = d_inputs['f_aero'][2::3]
-                dfx_total = np.sum(dfx)
-                dfy_total = np.sum(dfy)
-                dfz_total = np.sum(dfz)
                 if 'F_X' in d_outputs:
                     d_outputs['F_X'] += dfx_total
                 if 'F_Y' in d_outputs:
@@ -265,17 +425,17 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                                         ) / (q_inf * area)
 
                 if 'M_X' in d_outputs:
-                    d_outputs['M_X'] +=  np.dot(dfz,(y-yc)) - np.dot(dfy,(z-zc))
+                    d_outputs['M_X'] += dm_x_df
                 if 'M_Y' in d_outputs:
-                    d_outputs['M_Y'] += -np.dot(dfz,(x-xc)) + np.dot(dfx,(z-zc))
+                    d_outputs['M_Y'] += dm_y_df
                 if 'M_Z' in d_outputs:
-                    d_outputs['M_Z'] +=  np.dot(dfy,(x-xc)) - np.dot(dfx,(y-yc))
+                    d_outputs['M_Z'] += dm_z_df
                 if 'CM_X' in d_outputs:
-                    d_outputs['CM_X'] += ( np.dot(dfz,(y-yc)) - np.dot(dfy,(z-zc))) / (q_inf * area * c)
+                    d_outputs['CM_X'] += dm_x_df / (q_inf * area * c)
                 if 'CM_Y' in d_outputs:
-                    d_outputs['CM_Y'] += (-np.dot(dfz,(x-xc)) + np.dot(dfx,(z-zc))) / (q_inf * area * c)
+                    d_outputs['CM_Y'] += dm_y_df / (q_inf * area * c)
                 if 'CM_Z' in d_outputs:
-                    d_outputs['CM_Z'] += ( np.dot(dfy,(x-xc)) - np.dot(dfx,(y-yc))) / (q_inf * area * c)
+                    d_outputs['CM_Z'] += dm_z_df / (q_inf * area * c)
 
         elif mode == 'rev':
             if 'aoa' in d_inputs:
@@ -315,35 +475,35 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                     d_inputs['ref_area'] += d_outputs['C_D'] * drag * d_nondim
                 if 'CM_X' in d_outputs:
                     d_inputs['ref_area'] += d_outputs['CM_X'] * m_x * d_nondim / c
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_inputs['ref_area'] += d_outputs['CM_Y'] * m_y * d_nondim / c
                 if 'CM_Z' in d_outputs:
                     d_inputs['ref_area'] += d_outputs['CM_Z'] * m_z * d_nondim / c
 
             if 'moment_center' in d_inputs:
                 if 'M_X' in d_outputs:
-                    d_inputs['moment_center'][1] += -fz_total * d_outputs['M_X']
-                    d_inputs['moment_center'][2] +=  fy_total * d_outputs['M_X']
+                    d_inputs['moment_center'][1:2] += -fz_total * d_outputs['M_X']
+                    d_inputs['moment_center'][2:3] +=  fy_total * d_outputs['M_X']
                 if 'M_Y' in d_outputs:
-                    d_inputs['moment_center'][0] +=  fz_total * d_outputs['M_Y']
-                    d_inputs['moment_center'][2] += -fx_total * d_outputs['M_Y']
+                    d_inputs['moment_center'][0:1] +=  fz_total * d_outputs['M_Y']
+                    d_inputs['moment_center'][2:3] += -fx_total * d_outputs['M_Y']
                 if 'M_Z' in d_outputs:
-                    d_inputs['moment_center'][0] += -fy_total * d_outputs['M_Z']
-                    d_inputs['moment_center'][1] +=  fx_total * d_outputs['M_Z']
+                    d_inputs['moment_center'][0:1] += -fy_total * d_outputs['M_Z']
+                    d_inputs['moment_center'][1:2] +=  fx_total * d_outputs['M_Z']
                 if 'CM_X' in d_outputs:
-                    d_inputs['moment_center'][1] += -fz_total * d_outputs['CM_X'] / (q_inf * area * c)
-                    d_inputs['moment_center'][2] +=  fy_total * d_outputs['CM_X'] / (q_inf * area * c)
+                    d_inputs['moment_center'][1:2] += -fz_total * d_outputs['CM_X'] / (q_inf * area * c)
+                    d_inputs['moment_center'][2:3] +=  fy_total * d_outputs['CM_X'] / (q_inf * area * c)
                 if 'CM_Y' in d_outputs:
-                    d_inputs['moment_center'][0] +=  fz_total * d_outputs['CM_Y'] / (q_inf * area * c)
-                    d_inputs['moment_center'][2] += -fx_total * d_outputs['CM_Y'] / (q_inf * area * c)
+                    d_inputs['moment_center'][0:1] +=  fz_total * d_outputs['CM_Y'] / (q_inf * area * c)
+                    d_inputs['moment_center'][2:3] += -fx_total * d_outputs['CM_Y'] / (q_inf * area * c)
                 if 'CM_Z' in d_outputs:
-                    d_inputs['moment_center'][0] += -fy_total * d_outputs['CM_Z'] / (q_inf * area * c)
-                    d_inputs['moment_center'][1] +=  fx_total * d_outputs['CM_Z'] / (q_inf * area * c)
+                    d_inputs['moment_center'][0:1] += -fy_total * d_outputs['CM_Z'] / (q_inf * area * c)
+                    d_inputs['moment_center'][1:2] +=  fx_total * d_outputs['CM_Z'] / (q_inf * area * c)
             if 'ref_length' in d_inputs:
                 d_nondim = - 1.0 / (q_inf * area * c**2.0)
                 if 'CM_X' in d_outputs:
                     d_inputs['ref_length'] += m_x * d_nondim * d_outputs['CM_X']
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_inputs['ref_length'] += m_y * d_nondim * d_outputs['CM_Y']
                 if 'CM_Z' in d_outputs:
                     d_inputs['ref_length'] += m_z * d_nondim * d_outputs['CM_Z']
@@ -362,69 +522,329 @@ class IntegratedSurfaceForces(om.ExplicitComponent):
                     d_inputs['q_inf'] += d_outputs['C_D'] * drag * d_nondim
                 if 'CM_X' in d_outputs:
                     d_inputs['q_inf'] += d_outputs['CM_X'] * m_x * d_nondim / c
-                if 'CM_X' in d_outputs:
+                if 'CM_Y' in d_outputs:
                     d_inputs['q_inf'] += d_outputs['CM_Y'] * m_y * d_nondim / c
                 if 'CM_Z' in d_outputs:
                     d_inputs['q_inf'] += d_outputs['CM_Z'] * m_z * d_nondim / c
 
-            if 'x_aero' in d_inputs:
-                nondim = 1.0 / (q_inf * area * c)
-                dm_x = d_outputs['M_X'] if 'M_X' in d_outputs else 0.0
-                dm_y = d_outputs['M_Y'] if 'M_Y' in d_outputs else 0.0
-                dm_z = d_outputs['M_Z'] if 'M_Z' in d_outputs else 0.0
-                dcm_x = d_outputs['CM_X']*nondim if 'CM_X' in d_outputs else 0.0
-                dcm_y = d_outputs['CM_Y']*nondim if 'CM_Y' in d_outputs else 0.0
-                dcm_z = d_outputs['CM_Z']*nondim if 'CM_Z' in d_outputs else 0.0
-                d_inputs['x_aero'][0::3] += -fz * (dm_y + dcm_y) + fy * (dm_z + dcm_z)
-                d_inputs['x_aero'][1::3] +=  fz * (dm_x + dcm_x) - fx * (dm_z + dcm_z)
-                d_inputs['x_aero'][2::3] += -fy * (dm_x + dcm_x) + fx * (dm_y + dcm_y)
+            if 'x_aero' in d_inputs or 'f_aero' in d_inputs:
+                # collect the seeds of all outputs into total force and moment seeds
+                # so the nodal products are formed once regardless of the number of outputs
+                b_force, b_moment = self._get_total_seeds(aoa[0], yaw[0], q_inf[0] * area[0], c[0], d_outputs)
+                r = inputs['x_aero'].reshape(-1, 3) - inputs['moment_center']
+                f = inputs['f_aero'].reshape(-1, 3)
+                if 'x_aero' in d_inputs:
+                    d_inputs['x_aero'] += np.cross(f, b_moment).flatten()
+                if 'f_aero' in d_inputs:
+                    d_inputs['f_aero'] += (b_force + np.cross(b_moment, r)).flatten()
+
+    def _get_total_seeds(self, aoa, yaw, qa, c, d_outputs):
+        """
+        Reverse mode seeds of the total force and moment vectors from the output seeds
+        """
+        def seed(name):
+            return d_outputs[name][0] if name in d_outputs else 0.0
+
+        d_lift = seed('Lift') + seed('C_L') / qa
+        d_drag = seed('Drag') + seed('C_D') / qa
+        b_force = np.array([seed('F_X') + seed('C_X') / qa,
+                            seed('F_Y') + seed('C_Y') / qa,
+                            seed('F_Z') + seed('C_Z') / qa])
+        b_force += d_lift * np.array([-np.sin(aoa), 0.0, np.cos(aoa)])
+        b_force += d_drag * np.array([np.cos(aoa) * np.cos(yaw),
+                                      -np.sin(yaw),
+                                      np.sin(aoa) * np.cos(yaw)])
+        b_moment = np.array([seed('M_X') + seed('CM_X') / (qa * c),
+                             seed('M_Y') + seed('CM_Y') / (qa * c),
+                             seed('M_Z') + seed('CM_Z') / (qa * c)])
+        return b_force, b_moment
+
+
+def get_node_group_labels(number_of_nodes, group_indices):
+    """
+    Build the node-to-group label array of :class:`IntegratedSurfaceForceBreakdown`
+    from the node indices of each group, for example from a builder's get_tagged_indices.
+
+    Parameters
+    ----------
+    number_of_nodes : int
+        Number of aerodynamic surface nodes on this rank
+    group_indices : list
+        Node indices of each group in the order of the component's groups
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Group index of each node. Nodes that are not in a group are labeled -1
+    """
+    labels = -np.ones(number_of_nodes, dtype=int)
+    for igroup, indices in enumerate(group_indices):
+        if np.any(labels[indices] >= 0):
+            raise ValueError(f'Nodes of group {igroup} are already assigned to another group')
+        labels[indices] = igroup
+    return labels
+
+
+class IntegratedSurfaceForceBreakdown(om.ExplicitComponent):
+    """
+    Integrated forces and moments of several groups of surface nodes, e.g. wing,
+    tail, fuselage, and control surfaces, with a moment center for each group.
+    The outputs of IntegratedSurfaceForces are created for each group with the group name
+    appended, e.g. C_L_wing, and the moment centers are inputs named moment_center_{group}.
+
+    All group totals are computed with one segmented reduction of the local nodes
+    and one Allreduce instead of one masked IntegratedSurfaceForces per group.
+    """
+    output_names = ['C_L', 'C_D', 'C_X', 'C_Y', 'C_Z', 'CM_X', 'CM_Y', 'CM_Z',
+                    'Lift', 'Drag', 'F_X', 'F_Y', 'F_Z', 'M_X', 'M_Y', 'M_Z']
+
+    def initialize(self):
+        self.options.declare('groups', types=list, desc='Names of the node groups')
+        self.options.declare('node_groups',
+                             desc='Group index of each local aerodynamic surface node. '
+                                  'Nodes labeled -1 are not included in any group. '
+                                  'See get_node_group_labels')
 
-            if 'f_aero' in d_inputs:
-                if 'F_X' in d_outputs:
-                    d_inputs['f_aero'][0::3] += d_outputs['F_X']
-                if 'F_Y' in d_outputs:
-                    d_inputs['f_aero'][1::3] += d_outputs['F_Y']
-                if 'F_Z' in d_outputs:
-                    d_inputs['f_aero'][2::3] += d_outputs['F_Z']
-                if 'C_X' in d_outputs:
-                    d_inputs['f_aero'][0::3] += d_outputs['C_X'] / (q_inf * area)
-                if 'C_Y' in d_outputs:
-                    d_inputs['f_aero'][1::3] += d_outputs['C_Y'] / (q_inf * area)
-                if 'C_Z' in d_outputs:
-                    d_inputs['f_aero'][2::3] += d_outputs['C_Z'] / (q_inf * area)
-                if 'Lift' in d_outputs:
-                    d_inputs['f_aero'][0::3] += -np.sin(aoa) * d_outputs['Lift']
-                    d_inputs['f_aero'][2::3] +=  np.cos(aoa) * d_outputs['Lift']
-                if 'Drag' in d_outputs:
-                    d_inputs['f_aero'][0::3] +=  np.cos(aoa) * np.cos(yaw) * d_outputs['Drag']
-                    d_inputs['f_aero'][1::3] += -np.sin(yaw) * d_outputs['Drag']
-                    d_inputs['f_aero'][2::3] +=  np.sin(aoa) * np.cos(yaw) * d_outputs['Drag']
-                if 'C_L' in d_outputs:
-                    d_inputs['f_aero'][0::3] += -np.sin(aoa) * d_outputs['C_L'] / (q_inf * area)
-                    d_inputs['f_aero'][2::3] +=  np.cos(aoa) * d_outputs['C_L'] / (q_inf * area)
-                if 'C_D' in d_outputs:
-                    d_inputs['f_aero'][0::3] +=  np.cos(aoa) * np.cos(yaw) * d_outputs['C_D'] / (q_inf * area)
-                    d_inputs['f_aero'][1::3] += -np.sin(yaw) * d_outputs['C_D'] / (q_inf * area)
-                    d_inputs['f_aero'][2::3] +=  np.sin(aoa) * np.cos(yaw) * d_outputs['C_D'] / (q_inf * area)
+    def setup(self):
+        self.add_input('aoa',desc = 'angle of attack', units='rad',tags=['mphys_input'])
+        self.add_input('yaw',desc = 'yaw angle',units='rad',tags=['mphys_input'])
+        self.add_input('ref_area', val = 1.0,tags=['mphys_input'])
+        self.add_input('ref_length', val = 1.0,tags=['mphys_input'])
+        self.add_input('q_inf', val = 1.0,tags=['mphys_input'])
 
-                if 'M_X' in d_outputs:
-                    d_inputs['f_aero'][1::3] += -(z-zc) * d_outputs['M_X']
-                    d_inputs['f_aero'][2::3] +=  (y-yc) * d_outputs['M_X']
-                if 'M_Y' in d_outputs:
-                    d_inputs['f_aero'][0::3] +=  (z-zc) * d_outputs['M_Y']
-                    d_inputs['f_aero'][2::3] += -(x-xc) * d_outputs['M_Y']
-                if 'M_Z' in d_outputs:
-                    d_inputs['f_aero'][0::3] += -(y-yc) * d_outputs['M_Z']
-                    d_inputs['f_aero'][1::3] +=  (x-xc) * d_outputs['M_Z']
-                if 'CM_X' in d_outputs:
-                    d_inputs['f_aero'][1::3] += -(z-zc) * d_outputs['CM_X'] / (q_inf * area * c)
-                    d_inputs['f_aero'][2::3] +=  (y-yc) * d_outputs['CM_X'] / (q_inf * area * c)
-                if 'CM_Y' in d_outputs:
-                    d_inputs['f_aero'][0::3] +=  (z-zc) * d_outputs['CM_Y'] / (q_inf * area * c)
-                    d_inputs['f_aero'][2::3] += -(x-xc) * d_outputs['CM_Y'] / (q_inf * area * c)
-                if 'CM_Z' in d_outputs:
-                    d_inputs['f_aero'][0::3] += -(y-yc) * d_outputs['CM_Z'] / (q_inf * area * c)
-                    d_inputs['f_aero'][1::3] +=  (x-xc) * d_outputs['CM_Z'] / (q_inf * area * c)
+        self.add_input('x_aero', shape_by_conn=True,
+                                 distributed=True,
+                                 desc = 'surface coordinates',
+                                 tags=['mphys_coupling'])
+        self.add_input('f_aero', shape_by_conn=True,
+                                 distributed=True,
+                                 desc = 'dimensional forces at nodes',
+                                 tags=['mphys_coupling'])
+
+        for group in self.options['groups']:
+            self.add_input(f'moment_center_{group}', shape=3, tags=['mphys_input'])
+            for name in self.output_names:
+                self.add_output(f'{name}_{group}', tags=['mphys_result'])
+
+        # excluded nodes are summed into an extra bin that is dropped
+        ngroups = len(self.options['groups'])
+        labels = np.asarray(self.options['node_groups'], dtype=int)
+        if np.any((labels < -1) | (labels >= ngroups)):
+            raise ValueError(f'{self.msginfo}: node group labels must be -1 or the index of one '
+                             f'of the {ngroups} groups')
+        self._bins = np.where(labels < 0, ngroups, labels)
+        self._totals = None
+
+    def setup_partials(self):
+        nnodes = self._get_var_meta('x_aero', 'size') // 3
+        if len(self._bins) != nnodes:
+            raise ValueError(f'{self.msginfo}: {len(self._bins)} node group labels were given '
+                             f'for {nnodes} local nodes')
+
+    def _segment_sum(self, values):
+        """
+        Sum the nodal values of each group
+        """
+        if np.iscomplexobj(values):
+            return self._segment_sum(values.real) + 1j * self._segment_sum(values.imag)
+        ngroups = len(self.options['groups'])
+        return np.bincount(self._bins, weights=values, minlength=ngroups + 1)[:ngroups]
+
+    def _get_local_sums(self, x, f):
+        """
+        Sums of the forces and of the moments about the origin for each group on this rank,
+        shape (ngroups, 6)
+        """
+        r_cross_f = np.cross(x, f)
+        return np.column_stack([self._segment_sum(f[:, k]) for k in range(3)] +
+                               [self._segment_sum(r_cross_f[:, k]) for k in range(3)])
+
+    def _allreduce(self, values):
+        """
+        Sum a packed array of values over the ranks with a single collective
+        """
+        if self.comm.size > 1:
+            self.comm.Allreduce(MPI.IN_PLACE, values, op=MPI.SUM)
+        return values
+
+    def _get_moment_centers(self, inputs):
+        return np.array([inputs[f'moment_center_{group}'] for group in self.options['groups']])
+
+    def compute(self, inputs, outputs):
+        aoa = inputs['aoa']
+        yaw = inputs['yaw']
+        qa = inputs['q_inf'] * inputs['ref_area']
+        c = inputs['ref_length']
+
+        x = inputs['x_aero'].reshape(-1, 3)
+        f = inputs['f_aero'].reshape(-1, 3)
+
+        # cache the totals for the linear products at this point
+        self._totals = self._allreduce(self._get_local_sums(x, f))
+        force = self._totals[:, :3]
+        moment = self._totals[:, 3:] - np.cross(self._get_moment_centers(inputs), force)
+
+        lift = -force[:, 0] * np.sin(aoa) + force[:, 2] * np.cos(aoa)
+        drag = ( force[:, 0] * np.cos(aoa) * np.cos(yaw)
+               - force[:, 1] * np.sin(yaw)
+               + force[:, 2] * np.sin(aoa) * np.cos(yaw)
+               )
+
+        for igroup, group in enumerate(self.options['groups']):
+            for k, axis in enumerate('XYZ'):
+                outputs[f'F_{axis}_{group}'] = force[igroup, k]
+                outputs[f'C_{axis}_{group}'] = force[igroup, k] / qa
+                outputs[f'M_{axis}_{group}'] = moment[igroup, k]
+                outputs[f'CM_{axis}_{group}'] = moment[igroup, k] / (qa * c)
+            outputs[f'Lift_{group}'] = lift[igroup]
+            outputs[f'Drag_{group}'] = drag[igroup]
+            outputs[f'C_L_{group}'] = lift[igroup] / qa
+            outputs[f'C_D_{group}'] = drag[igroup] / qa
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        groups = self.options['groups']
+        aoa = inputs['aoa']
+        yaw = inputs['yaw']
+        area = inputs['ref_area']
+        q_inf = inputs['q_inf']
+        qa = q_inf * area
+        c = inputs['ref_length']
+        centers = self._get_moment_centers(inputs)
+
+        x = inputs['x_aero'].reshape(-1, 3)
+        f = inputs['f_aero'].reshape(-1, 3)
+
+        if mode == 'fwd' and ('x_aero' in d_inputs or 'f_aero' in d_inputs):
+            # the distributed seeds are reduced in the same collective as the totals
+            dx = d_inputs['x_aero'].reshape(-1, 3) if 'x_aero' in d_inputs else np.zeros_like(x)
+            df = d_inputs['f_aero'].reshape(-1, 3) if 'f_aero' in d_inputs else np.zeros_like(f)
+            local_seed_sums = self._get_local_sums(x, df)
+            local_seed_sums[:, 3:] += self._get_local_sums(dx, f)[:, 3:]
+            packed = self._allreduce(np.hstack((self._get_local_sums(x, f), local_seed_sums)))
+            totals = packed[:, :6]
+            seed_sums = packed[:, 6:]
+        else:
+            totals = self._totals if self._totals is not None else self._allreduce(self._get_local_sums(x, f))
+            seed_sums = np.zeros_like(totals)
+
+        if not np.iscomplexobj(inputs['f_aero']):
+            totals = totals.real
+        force = totals[:, :3]
+        moment = totals[:, 3:] - np.cross(centers, force)
+        fx, fy, fz = force[:, 0], force[:, 1], force[:, 2]
+
+        lift = -fx * np.sin(aoa) + fz * np.cos(aoa)
+        drag = fx * np.cos(aoa) * np.cos(yaw) - fy * np.sin(yaw) + fz * np.sin(aoa) * np.cos(yaw)
+        dlift_daoa = -fx * np.cos(aoa) - fz * np.sin(aoa)
+        ddrag_daoa = -fx * np.sin(aoa) * np.cos(yaw) + fz * np.cos(aoa) * np.cos(yaw)
+        ddrag_dyaw = -fx * np.cos(aoa) * np.sin(yaw) - fy * np.cos(yaw) - fz * np.sin(aoa) * np.sin(yaw)
+
+        if mode == 'fwd':
+            d_force = seed_sums[:, :3]
+            d_moment = seed_sums[:, 3:] - np.cross(centers, d_force)
+            for igroup, group in enumerate(groups):
+                if f'moment_center_{group}' in d_inputs:
+                    d_moment[igroup] -= np.cross(d_inputs[f'moment_center_{group}'], force[igroup])
+
+            daoa = d_inputs['aoa'] if 'aoa' in d_inputs else 0.0
+            dyaw = d_inputs['yaw'] if 'yaw' in d_inputs else 0.0
+            dqa = 0.0
+            if 'q_inf' in d_inputs:
+                dqa += d_inputs['q_inf'] * area
+            if 'ref_area' in d_inputs:
+                dqa += q_inf * d_inputs['ref_area']
+            dc = d_inputs['ref_length'] if 'ref_length' in d_inputs else 0.0
+
+            d_lift = -d_force[:, 0] * np.sin(aoa) + d_force[:, 2] * np.cos(aoa) + dlift_daoa * daoa
+            d_drag = ( d_force[:, 0] * np.cos(aoa) * np.cos(yaw)
+                     - d_force[:, 1] * np.sin(yaw)
+                     + d_force[:, 2] * np.sin(aoa) * np.cos(yaw)
+                     + ddrag_daoa * daoa + ddrag_dyaw * dyaw
+                     )
+            d_force_coef = d_force / qa - force * dqa / qa**2
+            d_moment_coef = d_moment / (qa * c) - moment * (dqa * c + qa * dc) / (qa * c)**2
+
+            for igroup, group in enumerate(groups):
+                for k, axis in enumerate('XYZ'):
+                    if f'F_{axis}_{group}' in d_outputs:
+                        d_outputs[f'F_{axis}_{group}'] += d_force[igroup, k]
+                    if f'C_{axis}_{group}' in d_outputs:
+                        d_outputs[f'C_{axis}_{group}'] += d_force_coef[igroup, k]
+                    if f'M_{axis}_{group}' in d_outputs:
+                        d_outputs[f'M_{axis}_{group}'] += d_moment[igroup, k]
+                    if f'CM_{axis}_{group}' in d_outputs:
+                        d_outputs[f'CM_{axis}_{group}'] += d_moment_coef[igroup, k]
+                if f'Lift_{group}' in d_outputs:
+                    d_outputs[f'Lift_{group}'] += d_lift[igroup]
+                if f'Drag_{group}' in d_outputs:
+                    d_outputs[f'Drag_{group}'] += d_drag[igroup]
+                if f'C_L_{group}' in d_outputs:
+                    d_outputs[f'C_L_{group}'] += d_lift[igroup] / qa - lift[igroup] * dqa / qa**2
+                if f'C_D_{group}' in d_outputs:
+                    d_outputs[f'C_D_{group}'] += d_drag[igroup] / qa - drag[igroup] * dqa / qa**2
+
+        elif mode == 'rev':
+            def seed(name):
+                return d_outputs[name][0] if name in d_outputs else 0.0
+
+            ngroups = len(groups)
+            b_force = np.zeros((ngroups, 3), dtype=totals.dtype)
+            b_force_coef = np.zeros((ngroups, 3), dtype=totals.dtype)
+            b_moment = np.zeros((ngroups, 3), dtype=totals.dtype)
+            b_moment_coef = np.zeros((ngroups, 3), dtype=totals.dtype)
+            b_lift = np.zeros(ngroups, dtype=totals.dtype)
+            b_lift_coef = np.zeros(ngroups, dtype=totals.dtype)
+            b_drag = np.zeros(ngroups, dtype=totals.dtype)
+            b_drag_coef = np.zeros(ngroups, dtype=totals.dtype)
+            for igroup, group in enumerate(groups):
+                for k, axis in enumerate('XYZ'):
+                    b_force[igroup, k] = seed(f'F_{axis}_{group}')
+                    b_force_coef[igroup, k] = seed(f'C_{axis}_{group}')
+                    b_moment[igroup, k] = seed(f'M_{axis}_{group}')
+                    b_moment_coef[igroup, k] = seed(f'CM_{axis}_{group}')
+                b_lift[igroup] = seed(f'Lift_{group}')
+                b_lift_coef[igroup] = seed(f'C_L_{group}')
+                b_drag[igroup] = seed(f'Drag_{group}')
+                b_drag_coef[igroup] = seed(f'C_D_{group}')
+
+            b_lift_total = b_lift + b_lift_coef / qa
+            b_drag_total = b_drag + b_drag_coef / qa
+            b_moment_total = b_moment + b_moment_coef / (qa * c)
+
+            b_force_total = b_force + b_force_coef / qa
+            b_force_total[:, 0] += -np.sin(aoa) * b_lift_total + np.cos(aoa) * np.cos(yaw) * b_drag_total
+            b_force_total[:, 1] += -np.sin(yaw) * b_drag_total
+            b_force_total[:, 2] += np.cos(aoa) * b_lift_total + np.sin(aoa) * np.cos(yaw) * b_drag_total
+            # moment = moment_about_origin - center x force
+            b_force_total += np.cross(centers, b_moment_total)
+
+            if 'aoa' in d_inputs:
+                d_inputs['aoa'] += np.sum(dlift_daoa * b_lift_total + ddrag_daoa * b_drag_total)
+            if 'yaw' in d_inputs:
+                d_inputs['yaw'] += np.sum(ddrag_dyaw * b_drag_total)
+
+            b_qa = -( np.sum(force * b_force_coef)
+                    + np.sum(lift * b_lift_coef)
+                    + np.sum(drag * b_drag_coef)
+                    ) / qa**2 - np.sum(moment * b_moment_coef) / (qa**2 * c)
+            if 'q_inf' in d_inputs:
+                d_inputs['q_inf'] += b_qa * area
+            if 'ref_area' in d_inputs:
+                d_inputs['ref_area'] += b_qa * q_inf
+            if 'ref_length' in d_inputs:
+                d_inputs['ref_length'] += -np.sum(moment * b_moment_coef) / (qa * c**2)
+
+            for igroup, group in enumerate(groups):
+                if f'moment_center_{group}' in d_inputs:
+                    d_inputs[f'moment_center_{group}'] += -np.cross(force[igroup], b_moment_total[igroup])
+
+            # scatter the group seeds back to the nodes; excluded nodes get zeros
+            b_force_nodes = np.vstack((b_force_total, np.zeros((1, 3))))[self._bins]
+            b_moment_nodes = np.vstack((b_moment_total, np.zeros((1, 3))))[self._bins]
+            if 'f_aero' in d_inputs:
+                d_inputs['f_aero'] += (b_force_nodes + np.cross(b_moment_nodes, x)).flatten()
+            if 'x_aero' in d_inputs:
+                d_inputs['x_aero'] += np.cross(f, b_moment_nodes).flatten()
 
 def check_integrated_surface_force_partials():
     nnodes = 3
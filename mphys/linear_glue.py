@@ -0,0 +1,55 @@
+import numpy as np
+import openmdao.api as om
+
+
+def _flat_view(array):
+    """
+    Flat view of a contiguous vector variable for writing in place or use as an MPI buffer
+    """
+    view = array.view()
+    # setting the shape raises instead of copying if the data is not contiguous
+    view.shape = (-1,)
+    return view
+
+
+class LinearGlueComponent(om.ExplicitComponent):
+    """
+    Base class of the MPhys glue components whose outputs are sums of selections of their inputs,
+    such as the geometry displacement and the mask and distributed converters.
+
+    Subclasses register each output-input pair with :meth:`add_linear_map` in setup.
+    The constant partials of these maps are declared once as sparse ones with rows/cols,
+    so OpenMDAO assembles them instead of calling hand-written Jacobian-vector products
+    and the components can be included in coloring and direct solves.
+    """
+
+    def setup(self):
+        self._linear_maps = []
+
+    def add_linear_map(self, of, wrt, rows=None, cols=None):
+        """
+        Register that output `of` contains input `wrt` with a unit coefficient
+
+        Parameters
+        ----------
+        of : str
+            Name of the output
+        wrt : str
+            Name of the input
+        rows : numpy.ndarray or None
+            Flat output indices of the input entries. If None, the map is the identity
+        cols : numpy.ndarray or None
+            Flat input indices that are mapped to the rows. If None, the map is the identity
+        """
+        self._linear_maps.append((of, wrt, rows, cols))
+
+    def setup_partials(self):
+        # the products are used instead if a subclass has to communicate
+        if self.matrix_free:
+            return
+
+        for of, wrt, rows, cols in self._linear_maps:
+            if rows is None:
+                # the size of inputs that are shaped by their connection is known here
+                rows = cols = np.arange(self._get_var_meta(wrt, 'size'))
+            self.declare_partials(of, wrt, rows=rows, cols=cols, val=1.0)
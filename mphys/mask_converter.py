@@ -1,5 +1,6 @@
 import numpy as np
-import openmdao.api as om
+
+from .linear_glue import LinearGlueComponent, _flat_view
 
 
 class MaskedVariableDescription:
@@ -14,7 +15,28 @@ class MaskedVariableDescription:
         self.tags = tags
 
 
-class MaskedConverter(om.ExplicitComponent):
+def get_mask_indices(mask):
+    """
+    Flat integer indices of a boolean mask, or of an array of indices
+
+    Parameters
+    ----------
+    mask : numpy.ndarray
+        Boolean flags indicating which entries are included (True) or masked (False),
+        or the integer indices of the included entries
+
+    Returns
+    -------
+    indices : numpy.ndarray
+        Flat indices of the included entries
+    """
+    mask = np.asarray(mask)
+    if mask.dtype == bool:
+        return np.flatnonzero(mask)
+    return mask.astype(int).ravel()
+
+
+class MaskedConverter(LinearGlueComponent):
     """
     An ExplicitComponent used to filter out a predefined set of indices from a larger input array.
     This is useful in cases, for instance, where it desired to prevent certain fea nodes from participating
@@ -22,6 +44,9 @@ class MaskedConverter(om.ExplicitComponent):
 
     The masking operation breaks down to the python assignment:
     masked_vector = unmasked_vector[mask_indices]
+
+    The masks are converted to integer indices at setup and the constant selection
+    Jacobian is declared sparse by LinearGlueComponent.
     """
 
     def initialize(self):
@@ -40,9 +65,11 @@ class MaskedConverter(om.ExplicitComponent):
         self.options.declare(
             'mask',
             desc='masking array to apply to vectors. Contains boolean flags '
-                 'indicating which indices should be included (True) or masked (False)')
+                 'indicating which indices should be included (True) or masked (False), '
+                 'or the integer indices that should be included')
 
     def setup(self):
+        super().setup()
         distributed = self.options['distributed']
         input = self.options['input']
         output = self.options['output']
@@ -55,44 +82,24 @@ class MaskedConverter(om.ExplicitComponent):
                 raise ValueError("Output length and mask length not equal")
             for i in range(len(output)):
                 self.add_output(output[i].name, shape=output[i].shape, tags=output[i].tags, val=self.options['init_output'], distributed=distributed)
+            self._output_names = [out.name for out in output]
+            self._indices = [get_mask_indices(m) for m in mask]
         else:
             self.add_output(output.name, shape=output.shape, tags=output.tags, val=self.options['init_output'], distributed=distributed)
+            self._output_names = [output.name]
+            self._indices = [get_mask_indices(mask)]
 
-    def compute(self, inputs, outputs):
-        input = self.options['input']
-        mask = self.options['mask']
-        output = self.options['output']
+        for name, indices in zip(self._output_names, self._indices):
+            self.add_linear_map(name, input.name, rows=np.arange(indices.size), cols=indices)
 
-        if isinstance(output, list):
-            for i in range(len(output)):
-                outputs[output[i].name] = inputs[input.name][mask[i]]
-        else:
-            outputs[output.name] = inputs[input.name][mask]
-
-    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+    def compute(self, inputs, outputs):
         input = self.options['input']
-        output = self.options['output']
-        mask = self.options['mask']
-
-        if isinstance(output, list):
-            for i in range(len(output)):
-                if mode == 'fwd':
-                    if input.name in d_inputs and output[i].name in d_outputs:
-                        d_outputs[output[i].name] += d_inputs[input.name][mask[i]]
-
-                if mode == 'rev':
-                    if input.name in d_inputs and output[i].name in d_outputs:
-                        d_inputs[input.name][mask[i]] += d_outputs[output[i].name]
-        else:
-            if mode == 'fwd':
-                if input.name in d_inputs and output.name in d_outputs:
-                    d_outputs[output.name] += d_inputs[input.name][mask]
+        unmasked = inputs[input.name]
+        for name, indices in zip(self._output_names, self._indices):
+            np.take(unmasked, indices, out=_flat_view(outputs[name]))
 
-            if mode == 'rev':
-                if input.name in d_inputs and output.name in d_outputs:
-                    d_inputs[input.name][mask] += d_outputs[output.name]
 
-class UnmaskedConverter(om.ExplicitComponent):
+class UnmaskedConverter(LinearGlueComponent):
     """
     An ExplicitComponent that undoes the procedure of the MaskedConverter component.
     This companent takes an already masked vector, inserts missing indices,
@@ -101,6 +108,9 @@ class UnmaskedConverter(om.ExplicitComponent):
 
     The unmasking operation breaks down to the python assignment:
     unmasked_vector[mask_indices] = masked_vector
+
+    The masks are converted to integer indices at setup and the constant insertion
+    Jacobian is declared sparse by LinearGlueComponent.
     """
 
     def initialize(self):
@@ -119,9 +129,11 @@ class UnmaskedConverter(om.ExplicitComponent):
         self.options.declare(
             'mask',
             desc='masking array to apply to vectors. Contains boolean flags '
-                 'indicating which indices should be included (True) or masked (False)')
+                 'indicating which indices should be included (True) or masked (False), '
+                 'or the integer indices that should be included')
 
     def setup(self):
+        super().setup()
         distributed = self.options['distributed']
         input = self.options['input']
         output = self.options['output']
@@ -131,50 +143,28 @@ class UnmaskedConverter(om.ExplicitComponent):
             if len(input) != len(mask):
                 raise ValueError("Input length and mask length not equal")
 
-            for i in range(len(input)-1):
-                for j in range(i+1, len(input)):
-                    if (np.any(np.logical_and(mask[i], mask[j]))):
-                        raise RuntimeWarning("Overlapping masking arrays, values will conflict.")
-
             for i in range(len(input)):
                 self.add_input(input[i].name, shape=input[i].shape, tags=input[i].tags, distributed=distributed)
+            self._input_names = [inp.name for inp in input]
+            self._indices = [get_mask_indices(m) for m in mask]
+
+            # count how often each entry is set to detect overlapping masks in one pass
+            counts = np.bincount(np.concatenate(self._indices), minlength=int(np.prod(output.shape)))
+            if np.any(counts > 1):
+                raise RuntimeWarning("Overlapping masking arrays, values will conflict.")
         else:
             self.add_input(input.name, shape=input.shape, tags=input.tags, distributed=distributed)
+            self._input_names = [input.name]
+            self._indices = [get_mask_indices(mask)]
 
         self.add_output(output.name, shape=output.shape, tags=output.tags, distributed=distributed)
 
-    def compute(self, inputs, outputs):
-        input = self.options['input']
-        output = self.options['output']
-        mask = self.options['mask']
-        def_vals = self.options['default_values']
-        outputs[output.name][:] = def_vals
+        for name, indices in zip(self._input_names, self._indices):
+            self.add_linear_map(output.name, name, rows=indices, cols=np.arange(indices.size))
 
-        if isinstance(input, list):
-            for i in range(len(input)):
-                outputs[output.name][mask[i]] = inputs[input[i].name]
-        else:
-            outputs[output.name][mask] = inputs[input.name]
-
-    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
-        input = self.options['input']
+    def compute(self, inputs, outputs):
         output = self.options['output']
-        mask = self.options['mask']
-
-        if isinstance(input, list):
-            for i in range(len(input)):
-                if mode == 'fwd':
-                    if input[i].name in d_inputs and output.name in d_outputs:
-                        d_outputs[output.name][mask[i]] += d_inputs[input[i].name]
-
-                if mode == 'rev':
-                    if input[i].name in d_inputs and output.name in d_outputs:
-                        d_inputs[input[i].name] += d_outputs[output.name][mask[i]]
-        else:
-            if mode == 'fwd':
-                if input.name in d_inputs and output.name in d_outputs:
-                    d_outputs[output.name][mask] += d_inputs[input.name]
-
-            if mode == 'rev':
-                if input.name in d_inputs and output.name in d_outputs:
-                    d_inputs[input.name] += d_outputs[output.name][mask]
+        unmasked = _flat_view(outputs[output.name])
+        unmasked[:] = np.broadcast_to(self.options['default_values'], output.shape).ravel()
+        for name, indices in zip(self._input_names, self._indices):
+            np.put(unmasked, indices, inputs[name])
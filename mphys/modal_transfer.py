@@ -0,0 +1,191 @@
+import re
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.mpi import MPI
+
+from .artifact_cache import default_artifact_cache, hash_content
+
+
+def get_mode_shape_filenames(root_name, nmodes):
+    """
+    Names of the Tecplot files of the mode shapes, "{root_name}_mode{n}.dat"
+    """
+    return [f'{root_name}_mode{imode+1}.dat' for imode in range(nmodes)]
+
+
+def read_tecplot_zone(filename):
+    """
+    Read the nodal values of the first zone of a Tecplot ASCII file.
+    The values are converted in one vectorized call instead of line by line
+
+    Parameters
+    ----------
+    filename : str
+        Name of the Tecplot file
+
+    Returns
+    -------
+    values : numpy.ndarray
+        Values of the variables at the nodes, shape (nnodes, nvariables)
+    """
+    with open(filename) as f:
+        text = f.read()
+
+    zone = re.search(r'^\s*zone\b.*$', text, flags=re.IGNORECASE | re.MULTILINE)
+    if zone is None:
+        raise ValueError(f'No zone found in {filename}')
+    nodes = re.search(r'\b[IN]\s*=\s*(\d+)', zone.group(0), flags=re.IGNORECASE)
+    if nodes is None:
+        raise ValueError(f'The number of nodes of the zone in {filename} is not given')
+    nnodes = int(nodes.group(1))
+
+    # the node lines come first, so the number of variables is the length of the first one
+    data = text[zone.end():]
+    nvariables = len(data.lstrip('\n').split('\n', 1)[0].split())
+    values = np.array(data.split()[:nnodes*nvariables], dtype=float)
+    return values.reshape(nnodes, nvariables)
+
+
+def read_tecplot_mode_shapes(filenames):
+    """
+    Read the node coordinates and mode shapes from Tecplot files with the variables
+    X, Y, Z, ID, XMD, YMD, ZMD, one file per mode
+
+    Parameters
+    ----------
+    filenames : list[str]
+        Names of the files of each mode
+
+    Returns
+    -------
+    artifact : dict
+        'coordinates' of shape (nnodes, 3) and 'mode_shapes' of shape (nmodes, nnodes, 3)
+    """
+    values = [read_tecplot_zone(filename) for filename in filenames]
+    return {'coordinates': values[0][:, :3],
+            'mode_shapes': np.array([value[:, 4:7] for value in values])}
+
+
+def load_mode_shapes(root_name, nmodes, artifact_cache=None, comm=None):
+    """
+    Read the mode shapes once and share them through an artifact cache keyed by the contents
+    of the files. With a cache directory, the arrays are written as .npy files and every rank
+    of a compute node maps the same read-only copy. Builders can instead fetch
+    :func:`read_tecplot_mode_shapes` with their `get_cached_artifact`
+
+    Parameters
+    ----------
+    root_name : str
+        Root of the names of the files, see :func:`get_mode_shape_filenames`
+    nmodes : int
+        Number of modes
+    artifact_cache : :class:`~mphys.artifact_cache.ArtifactCache` or None
+        Cache of the mode shapes. If None, the default cache of the process
+    comm : :class:`~mpi4py.MPI.Comm` or None
+        Communicator of the ranks that load the mode shapes
+
+    Returns
+    -------
+    artifact : dict
+        The read-only 'coordinates' and 'mode_shapes' arrays
+    """
+    filenames = get_mode_shape_filenames(root_name, nmodes)
+    cache = artifact_cache if artifact_cache is not None else default_artifact_cache
+    return cache.fetch('mode_shapes', hash_content(*filenames),
+                       lambda: read_tecplot_mode_shapes(filenames), comm)
+
+
+class ModalTransferBase(om.ExplicitComponent):
+    """
+    Base of the transfers between modal coordinates and nodal vectors.
+
+    The mode shapes of the local nodes are stored as one contiguous (nmodes, 3*nnodes) matrix,
+    so the projections are single matrix-vector products. With distributed nodal vectors,
+    each rank holds the mode shapes of its own nodes and the sums over the nodes are
+    completed with one allreduce.
+    """
+    def initialize(self):
+        self.options.declare('mode_shapes',
+                             desc='Mode shapes of the local nodes, shape (nmodes, nnodes, 3) '
+                                  'or (nmodes, 3*nnodes)')
+        self.options.declare('distributed', default=True,
+                             desc='If True, the nodal vector is distributed and the mode shapes '
+                                  'are those of the nodes on this rank')
+
+    def _setup_mode_shapes(self):
+        mode_shapes = np.asarray(self.options['mode_shapes'], dtype=float)
+        self.nmodes = mode_shapes.shape[0]
+        self.mode_shapes = np.ascontiguousarray(mode_shapes.reshape(self.nmodes, -1))
+        self.nnodes = self.mode_shapes.shape[1] // 3
+
+    def _allreduce(self, values):
+        """
+        Sum the modal values of the local nodes over the ranks with a single collective
+        """
+        if self.options['distributed'] and self.comm.size > 1:
+            self.comm.Allreduce(MPI.IN_PLACE, values, op=MPI.SUM)
+        return values
+
+
+class ModalDisplacements(ModalTransferBase):
+    """
+    Nodal displacements from modal coordinates, u_nodal = Phi^T u_modal
+    """
+    def initialize(self):
+        super().initialize()
+        self.options.declare('modal_name', default='u_struct', desc='Name of the modal displacements')
+        self.options.declare('nodal_name', default='u_aero', desc='Name of the nodal displacements')
+
+    def setup(self):
+        self._setup_mode_shapes()
+        self.add_input(self.options['modal_name'], shape=self.nmodes,
+                       tags=['mphys_coupling'], desc='modal displacements')
+        self.add_output(self.options['nodal_name'], shape=3*self.nnodes,
+                        distributed=self.options['distributed'],
+                        tags=['mphys_coupling'], desc='nodal displacements')
+
+    def compute(self, inputs, outputs):
+        outputs[self.options['nodal_name']] = self.mode_shapes.T @ inputs[self.options['modal_name']]
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        modal = self.options['modal_name']
+        nodal = self.options['nodal_name']
+        if nodal not in d_outputs or modal not in d_inputs:
+            return
+        if mode == 'fwd':
+            d_outputs[nodal] += self.mode_shapes.T @ d_inputs[modal]
+        if mode == 'rev':
+            d_inputs[modal] += self._allreduce(self.mode_shapes @ d_outputs[nodal])
+
+
+class ModalForces(ModalTransferBase):
+    """
+    Modal forces from nodal forces, f_modal = Phi f_nodal
+    """
+    def initialize(self):
+        super().initialize()
+        self.options.declare('modal_name', default='f_struct', desc='Name of the modal forces')
+        self.options.declare('nodal_name', default='f_aero', desc='Name of the nodal forces')
+
+    def setup(self):
+        self._setup_mode_shapes()
+        self.add_input(self.options['nodal_name'], shape=3*self.nnodes,
+                       distributed=self.options['distributed'],
+                       tags=['mphys_coupling'], desc='nodal forces')
+        self.add_output(self.options['modal_name'], shape=self.nmodes,
+                        tags=['mphys_coupling'], desc='modal forces')
+
+    def compute(self, inputs, outputs):
+        outputs[self.options['modal_name']] = self._allreduce(
+            self.mode_shapes @ inputs[self.options['nodal_name']])
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        modal = self.options['modal_name']
+        nodal = self.options['nodal_name']
+        if modal not in d_outputs or nodal not in d_inputs:
+            return
+        if mode == 'fwd':
+            d_outputs[modal] += self._allreduce(self.mode_shapes @ d_inputs[nodal])
+        if mode == 'rev':
+            d_inputs[nodal] += self.mode_shapes.T @ d_outputs[modal]
@@ -0,0 +1,229 @@
+import time
+from dataclasses import dataclass, field
+
+from .mphys_group import MphysGroup
+
+# OpenMDAO system methods that are timed and the name of the phase they represent
+_PROFILED_METHODS = {
+    '_solve_nonlinear': 'solve_nonlinear',
+    '_apply_nonlinear': 'apply_nonlinear',
+    '_linearize': 'linearize',
+    '_solve_linear': 'solve_linear',
+    '_apply_linear': 'apply_linear',
+}
+
+
+@dataclass
+class ProfileRecord:
+    """
+    Timing data of one phase of one MPhys system
+    """
+    pathname: str
+    phase: str
+    mode: str
+    calls: int = 0
+    inclusive_time: float = 0.0
+    exclusive_time: float = 0.0
+    nonlinear_iterations: int = 0
+    linear_iterations: int = 0
+
+    @property
+    def label(self):
+        return f'{self.phase}[{self.mode}]'
+
+
+@dataclass
+class _Frame:
+    record: ProfileRecord
+    label: str
+    start: float
+    child_time: float = 0.0
+    stack: tuple = field(default_factory=tuple)
+
+
+class MphysProfiler:
+    """
+    Hierarchical wall time profiler for MPhys models.
+
+    The profiler instruments the scenarios, coupling groups, and every subsystem added
+    with :func:`~mphys.mphys_group.MphysGroup.mphys_add_subsystem` in a model.
+    For each system and phase (solve_nonlinear, apply_nonlinear, linearize, solve_linear,
+    apply_linear), it records the call count, inclusive and exclusive wall time, and the
+    nonlinear/linear solver iteration counts of groups. Linear phases are recorded
+    separately for forward (`fwd`) and adjoint (`rev`) mode.
+
+    Usage::
+
+        prob.setup()
+        prob.final_setup()
+        profiler = MphysProfiler()
+        profiler.attach(prob.model)
+        prob.run_model()
+        prob.compute_totals()
+        profiler.detach()
+        print(profiler.summary_table(prob.comm))
+        profiler.write_folded_stacks(f'profile_{prob.comm.rank}.folded')
+    """
+
+    def __init__(self):
+        self._systems = []
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the recorded data
+        """
+        self._records = {}
+        self._stack_times = {}
+        self._frames = []
+
+    def attach(self, model):
+        """
+        Instrument the MPhys groups and subsystems in the model.
+        Must be called after the problem has been set up.
+
+        Parameters
+        ----------
+        model : :class:`~openmdao.api.Group`
+            The model, or the part of the model, to profile
+        """
+        for system in model.system_iter(include_self=True, recurse=True):
+            if isinstance(system, MphysGroup):
+                self._instrument(system)
+                for subsystem in system.mphys_subsystems:
+                    self._instrument(subsystem)
+
+    def detach(self):
+        """
+        Remove the instrumentation from all systems. The recorded data is kept.
+        """
+        for system in self._systems:
+            for method_name in _PROFILED_METHODS:
+                if method_name in system.__dict__:
+                    delattr(system, method_name)
+        self._systems = []
+
+    def get_records(self):
+        """
+        Returns
+        -------
+        records : list[ProfileRecord]
+            The recorded data sorted by decreasing inclusive time
+        """
+        return sorted(self._records.values(), key=lambda rec: rec.inclusive_time, reverse=True)
+
+    def summary_table(self, comm=None):
+        """
+        Create a table of the recorded data on this rank.
+
+        Parameters
+        ----------
+        comm : :class:`~mpi4py.MPI.Comm` or None
+            If given, the maximum inclusive time of each entry over the ranks is added to the
+            table. The difference to this rank's time estimates how long this rank waits
+            for slower ranks at the next collective operation.
+
+        Returns
+        -------
+        table : str
+            The formatted table
+        """
+        records = self.get_records()
+        max_times = None
+        if comm is not None and comm.size > 1:
+            all_times = comm.allgather({(rec.pathname, rec.label): rec.inclusive_time for rec in records})
+            max_times = {}
+            for rank_times in all_times:
+                for key, value in rank_times.items():
+                    max_times[key] = max(max_times.get(key, 0.0), value)
+
+        rank = 0 if comm is None else comm.rank
+        header = f'{"system":<40} {"phase":<24} {"calls":>7} {"incl [s]":>10} {"excl [s]":>10} {"NL it":>6} {"LN it":>6}'
+        if max_times is not None:
+            header += f' {"max incl [s]":>12} {"wait [s]":>10}'
+        lines = [f'MPhys profile on rank {rank}', header, '-' * len(header)]
+        for rec in records:
+            line = (f'{rec.pathname:<40} {rec.label:<24} {rec.calls:>7d} {rec.inclusive_time:>10.4f} '
+                    f'{rec.exclusive_time:>10.4f} {rec.nonlinear_iterations:>6d} {rec.linear_iterations:>6d}')
+            if max_times is not None:
+                max_time = max_times[(rec.pathname, rec.label)]
+                line += f' {max_time:>12.4f} {max_time - rec.inclusive_time:>10.4f}'
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def write_summary(self, filename, comm=None):
+        """
+        Write the summary table of this rank to a file
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to write
+        comm : :class:`~mpi4py.MPI.Comm` or None
+            See :func:`summary_table`
+        """
+        table = self.summary_table(comm)
+        with open(filename, 'w') as f:
+            f.write(table + '\n')
+
+    def write_folded_stacks(self, filename):
+        """
+        Write the exclusive times of this rank in the folded stack format used by
+        flame graph tools such as flamegraph.pl and speedscope.
+        Times are written in microseconds.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file to write
+        """
+        with open(filename, 'w') as f:
+            for stack, exclusive_time in self._stack_times.items():
+                f.write(f'{";".join(stack)} {int(round(exclusive_time * 1e6))}\n')
+
+    def _instrument(self, system):
+        if system in self._systems:
+            return
+        for method_name, phase in _PROFILED_METHODS.items():
+            method = getattr(system, method_name)
+            setattr(system, method_name, self._wrap(system, method, phase))
+        self._systems.append(system)
+
+    def _wrap(self, system, method, phase):
+        def wrapped_method(*args, **kwargs):
+            mode = args[0] if phase in ('solve_linear', 'apply_linear') and args else 'primal'
+            self._start(system, phase, mode)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._stop(system, phase)
+
+        return wrapped_method
+
+    def _start(self, system, phase, mode):
+        key = (system.pathname, phase, mode)
+        if key not in self._records:
+            self._records[key] = ProfileRecord(system.pathname, phase, mode)
+        record = self._records[key]
+
+        label = f'{system.name}[{record.label}]'
+        parent_stack = self._frames[-1].stack if self._frames else ()
+        self._frames.append(_Frame(record, label, time.perf_counter(), stack=parent_stack + (label,)))
+
+    def _stop(self, system, phase):
+        frame = self._frames.pop()
+        elapsed = time.perf_counter() - frame.start
+        exclusive = elapsed - frame.child_time
+
+        record = frame.record
+        record.calls += 1
+        record.inclusive_time += elapsed
+        record.exclusive_time += exclusive
+        if phase == 'solve_nonlinear' and getattr(system, 'nonlinear_solver', None) is not None:
+            record.nonlinear_iterations += system.nonlinear_solver._iter_count
+        if phase == 'solve_linear' and getattr(system, 'linear_solver', None) is not None:
+            record.linear_iterations += system.linear_solver._iter_count
+
+        self._stack_times[frame.stack] = self._stack_times.get(frame.stack, 0.0) + exclusive
+        if self._frames:
+            self._frames[-1].child_time += elapsed
@@ -42,6 +42,11 @@ class ScenarioAeroStructural(Scenario):
             default="full_coupling",
             desc='Limited flexibility for coupling group type to accomodate flutter about jig shape or DLM where coupling group can be skipped: ["full_coupling", "aerodynamics_only", None]',
         )
+        self.options.declare(
+            "fuse_geo_disp",
+            default=False,
+            desc="Set to `True` if the displacement transfer of the ldxfer builder outputs the deformed aerodynamic surface x_aero = x_aero0 + u_aero directly. The separate GeoDisp subsystem is then not added to the coupling group.",
+        )
         self.options.declare(
             "pre_coupling_order",
             default=["aero", "struct", "ldxfer"],
@@ -93,6 +98,7 @@ class ScenarioAeroStructural(Scenario):
                 struct_builder=self.options["struct_builder"],
                 ldxfer_builder=self.options["ldxfer_builder"],
                 scenario_name=self.name,
+                fuse_geo_disp=self.options["fuse_geo_disp"],
             )
             self.mphys_add_subsystem("coupling", coupling_group)
 
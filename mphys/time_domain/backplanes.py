@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class BackplaneRing:
+    """
+    Ring buffer of the latest solutions of a time derivative variable.
+
+    The solutions are held in one preallocated array. Pushing the solution of a new step
+    overwrites the oldest slot and rotates the index of the newest one, so the older
+    solutions are not copied when the integration advances.
+    """
+
+    def __init__(self, number_of_backplanes, shape, dtype=float):
+        """
+        Parameters
+        ----------
+        number_of_backplanes : int
+            Number of prior solutions that are kept
+        shape : tuple
+            Shape of the variable
+        dtype : numpy.dtype
+            Data type of the solutions
+        """
+        self.size = max(number_of_backplanes, 1)
+        self.data = np.zeros((self.size,) + tuple(np.atleast_1d(shape)), dtype=dtype)
+        self.head = 0
+
+    def fill(self, value):
+        """
+        Set all backplanes to the same value, e.g. the initial conditions
+        """
+        self.data[:] = value
+        self.head = 0
+
+    def push(self, value):
+        """
+        Make a new solution the first backplane and drop the oldest one
+        """
+        self.head = (self.head - 1) % self.size
+        self.data[self.head] = value
+
+    def __getitem__(self, backplane):
+        """
+        Solution `backplane` steps before the newest one, which is backplane 0
+        """
+        return self.data[(self.head + backplane) % self.size]
+
+    def get_ordered(self):
+        """
+        Copy of the solutions from the newest to the oldest
+        """
+        return self.data[(self.head + np.arange(self.size)) % self.size]
+
+    def set_ordered(self, values):
+        """
+        Set the solutions from an array ordered from the newest to the oldest
+        """
+        self.data[:] = values
+        self.head = 0
+
+    def copy(self):
+        ring = BackplaneRing.__new__(BackplaneRing)
+        ring.size = self.size
+        ring.data = self.data.copy()
+        ring.head = self.head
+        return ring
+
+    def set(self, other):
+        """
+        Copy the solutions of another ring of the same size into this one
+        """
+        self.data[:] = other.data
+        self.head = other.head
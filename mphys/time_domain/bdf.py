@@ -0,0 +1,94 @@
+from math import factorial
+
+import numpy as np
+
+
+def get_bdf_coefficients(times):
+    """
+    Variable step backward difference coefficients of the first time derivative.
+
+    The coefficients differentiate the polynomial through the values at the given times,
+    so du/dt(t_n) ~= sum_j alpha_j u(t_{n-j}). The order of the formula is len(times)-1.
+    For a constant step dt and three times, they are the BDF2 coefficients
+    [3/2, -2, 1/2] / dt.
+
+    Parameters
+    ----------
+    times : array_like
+        Time stamps t_n, t_{n-1}, ..., t_{n-q} from the newest to the oldest
+
+    Returns
+    -------
+    alpha : numpy.ndarray
+        Coefficient of the value at each time
+    """
+    times = np.asarray(times, dtype=float)
+    npoints = times.size
+    alpha = np.zeros(npoints)
+    alpha[0] = np.sum(1.0 / (times[0] - times[1:]))
+    for j in range(1, npoints):
+        others = np.delete(np.arange(npoints), j)
+        numerator = np.prod(times[0] - times[others[1:]])
+        alpha[j] = numerator / np.prod(times[j] - times[others])
+    return alpha
+
+
+def get_bdf_error_constant(order):
+    """
+    Magnitude of the error constant of the BDF method of an order, e.g. 2/9 for BDF2.
+    The local truncation error is about error_constant * dt^(order+1) * d^(order+1)u/dt^(order+1)
+    """
+    leading = 1.0 / np.sum(1.0 / np.arange(1, order + 1))
+    return leading / (order + 1)
+
+
+def get_divided_difference(values, times):
+    """
+    Divided difference u[t_0, ..., t_k] of values at k+1 times
+
+    Parameters
+    ----------
+    values : list[numpy.ndarray]
+        Values of the variable at the times
+    times : array_like
+        Time stamps of the values
+
+    Returns
+    -------
+    difference : numpy.ndarray
+        Divided difference of order len(times)-1
+    """
+    differences = [np.asarray(value, dtype=float) for value in values]
+    for order in range(1, len(differences)):
+        differences = [
+            (differences[i] - differences[i + 1]) / (times[i] - times[i + order])
+            for i in range(len(differences) - 1)
+        ]
+    return differences[0]
+
+
+def estimate_local_truncation_error(values, times, order):
+    """
+    Estimate of the local truncation error of a BDF step from the (order+1)-th derivative,
+    which is approximated by the divided difference of the new value and the backplanes
+
+    Parameters
+    ----------
+    values : list[numpy.ndarray]
+        Values of the variable from the newest step to the oldest. At least order+2 values
+    times : array_like
+        Time stamps of the values
+    order : int
+        Order of the BDF method
+
+    Returns
+    -------
+    error : numpy.ndarray
+        Estimated local truncation error of each entry of the newest value
+    """
+    npoints = order + 2
+    dt = times[0] - times[1]
+    derivative = factorial(order + 1) * get_divided_difference(
+        values[:npoints], times[:npoints]
+    )
+    return get_bdf_error_constant(order) * dt ** (order + 1) * derivative
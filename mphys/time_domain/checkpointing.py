@@ -0,0 +1,113 @@
+from math import comb
+
+
+def get_number_of_reversible_steps(checkpoints, repetitions):
+    """
+    Number of steps that binomial checkpointing can reverse with a checkpoint budget when each
+    step is advanced at most `repetitions` times
+
+    Parameters
+    ----------
+    checkpoints : int
+        Number of step states that can be stored in addition to the initial state
+    repetitions : int
+        Number of times each step may be recomputed
+
+    Returns
+    -------
+    steps : int
+        Binomial coefficient (checkpoints + 1 + repetitions) choose (checkpoints + 1),
+        since the initial state is stored as well
+    """
+    if checkpoints < -1 or repetitions < 0:
+        return 0
+    return comb(checkpoints + 1 + repetitions, checkpoints + 1)
+
+
+def _get_first_checkpoint_offset(nsteps, checkpoints):
+    """
+    Number of steps to advance before storing the next checkpoint of a segment. The split of
+    revolve (Griewank and Walther, Algorithm 799), which gives the fewest recomputed steps
+    """
+    repetitions = 0
+    while get_number_of_reversible_steps(checkpoints, repetitions) < nsteps:
+        repetitions += 1
+
+    def beta(extra_checkpoints, extra_repetitions):
+        return get_number_of_reversible_steps(checkpoints + extra_checkpoints,
+                                              repetitions + extra_repetitions)
+
+    if nsteps <= beta(0, -1) + beta(-2, -1):
+        offset = beta(0, -2)
+    elif nsteps >= beta(0, 0) - beta(-3, 0):
+        offset = beta(0, -1)
+    else:
+        offset = nsteps - beta(-1, -1) - beta(-2, -1)
+    return min(max(1, offset), nsteps - 1)
+
+
+def _add_segment_actions(start, end, checkpoints, actions):
+    """
+    Actions that reverse the steps end to start+1 when the state of step `start` is stored.
+    The left part of each split keeps the same budget, so it is handled in the loop and the
+    recursion depth is bounded by the budget
+    """
+    while end - start > 1 and checkpoints > 0:
+        split = start + _get_first_checkpoint_offset(end - start, checkpoints)
+        actions.append(("restore", start))
+        actions.append(("advance", start, split))
+        actions.append(("store", split))
+        _add_segment_actions(split, end, checkpoints - 1, actions)
+        actions.append(("free", split))
+        end = split
+
+    for step in range(end, start, -1):
+        actions.append(("restore", start))
+        if step - 1 > start:
+            actions.append(("advance", start, step - 1))
+        actions.append(("reverse", step))
+
+
+def get_checkpoint_schedule(nsteps, checkpoints=None):
+    """
+    Order of the forward and adjoint operations of a reverse sweep over a time history.
+
+    The actions are tuples:
+
+    - ("restore", step): make the stored state after `step` the current state
+    - ("advance", start, end): run the steps start+1 to end from the current state
+    - ("store", step): store the current state, which is the state after `step`
+    - ("free", step): release the stored state after `step`
+    - ("reverse", step): linearize step `step` from the current state, which is the state after step-1, and
+      propagate the adjoint through it
+
+    The state after step 0, the initial conditions, is always available. Without a checkpoint budget, the
+    state after every step is assumed to be stored so each step is restored and reversed once. With a budget,
+    binomial checkpointing stores at most `checkpoints` states at a time, which is O(log(nsteps)) for a
+    budget that grows logarithmically, at the cost of recomputing parts of the history.
+
+    Parameters
+    ----------
+    nsteps : int
+        Number of time steps
+    checkpoints : int or None
+        Number of step states that can be stored in addition to the initial conditions.
+        If None, every state is available
+
+    Returns
+    -------
+    actions : list[tuple]
+        Actions of the reverse sweep
+    """
+    actions = []
+    if checkpoints is None:
+        for step in range(nsteps, 0, -1):
+            actions.append(("restore", step - 1))
+            actions.append(("reverse", step))
+        return actions
+
+    if checkpoints < 0:
+        raise ValueError(f"The checkpoint budget must not be negative, got {checkpoints}")
+    if nsteps > 0:
+        _add_segment_actions(0, nsteps, checkpoints, actions)
+    return actions
@@ -0,0 +1,432 @@
+import copy
+
+import numpy as np
+from openmdao.core.analysis_error import AnalysisError
+from openmdao.utils.om_warnings import SolverWarning, issue_warning
+from scipy.sparse.linalg import LinearOperator, gmres
+
+from .integrator import Integrator
+
+
+def get_trigonometric_interpolation_weights(times, number_of_instances, period):
+    """
+    Weights of the trigonometric interpolation of equally spaced time instances
+
+    The interpolant of the values u_j at the instance times t_j = j * period / N is
+    u(t) = sum_j w_j(t) u_j. For an even number of instances, the highest harmonic is
+    the cosine that is resolved by the instances.
+
+    Parameters
+    ----------
+    times : array_like
+        Times to evaluate the interpolant at
+    number_of_instances : int
+        Number of time instances N in the period
+    period : float
+        Period of the solution
+
+    Returns
+    -------
+    weights : numpy.ndarray
+        Weight of each instance, shape (len(times), N)
+    """
+    nin = number_of_instances
+    instance_times = np.arange(nin) * period / nin
+    phase = 2.0 * np.pi / period * (np.atleast_1d(times)[:, np.newaxis] - instance_times)
+
+    weights = np.ones_like(phase)
+    for harmonic in range(1, (nin - 1) // 2 + 1):
+        weights += 2.0 * np.cos(harmonic * phase)
+    if nin % 2 == 0:
+        weights += np.cos(nin // 2 * phase)
+    return weights / nin
+
+
+class HarmonicBalanceIntegrator(Integrator):
+    """
+    Periodic solution of a time step problem at N time instances solved all at once.
+
+    The instances are the steps at t_i = i * dt in the period nsteps * dt. The step subsystems
+    compute the time derivatives from their backplanes, so the backplanes of each instance are
+    set to the trigonometric interpolant of all instances at the backplane times
+    t_i - k * backplane_spacing. The interpolant is the spectral representation of the periodic
+    solution, and the derivative formulas of the step subsystems applied to it approach the
+    spectral derivative as the backplane spacing decreases. With a backplane spacing of dt,
+    the backplanes are the preceding instances and the derivatives are periodic BDF ones.
+
+    The instances are coupled through the interpolation, and the nonlinear system
+    u_i - S_i(u) = 0, where S_i is the solution of the step problem of instance i, is solved with
+    Newton's method. The Newton updates are solved with GMRES using Jacobian-vector products of
+    the step problems. With time_parallel_groups, the instances are spread over groups of
+    processors that each solve the step problems of their instances. The Newton and GMRES
+    norms and inner products are computed from the instances on each processor, so
+    distributed time derivative variables are only supported on a single processor.
+
+    The converged instances satisfy u - S(u, x) = 0 for the step inputs x, so their derivatives
+    are du/dx = (I - dS/du)^-1 dS/dx. The forward products solve the Newton system and the
+    reverse products its transpose with GMRES. The converged instances do not depend on the
+    initial guess.
+
+    The inputs "{name}|0" are the initial guess of every instance, and the outputs
+    "{name}|instances" are the converged instances.
+    """
+
+    def initialize(self):
+        super().initialize()
+        self.options.declare(
+            "backplane_spacing",
+            default=None,
+            desc="Time between the backplanes of an instance. If None, dt / 100",
+        )
+        self.options.declare(
+            "newton_tolerance",
+            default=1e-10,
+            desc="Largest entry of the Newton update of the instances at convergence. "
+            "The residuals scale with the backplane spacing, so the update is checked instead",
+        )
+        self.options.declare(
+            "newton_max_iterations",
+            default=20,
+            desc="Maximum number of Newton iterations. An AnalysisError is raised if the "
+            "update is larger than newton_tolerance after them",
+        )
+        self.options.declare(
+            "gmres_tolerance",
+            default=1e-10,
+            desc="Tolerance of the GMRES solves of the Newton updates relative to the first "
+            "Newton residual, and of the derivative solves relative to their right-hand side",
+        )
+
+    def setup(self):
+        nin = self.options["nsteps"]
+        groups = self.options["time_parallel_groups"]
+        self._setup_time_parallel_comms(nin)
+        if self.comm.size > 1:
+            for builder in self._get_builder_list():
+                if any(var.distributed for var in builder.get_time_derivative_variables()):
+                    raise ValueError(
+                        "Harmonic balance does not support distributed time derivative "
+                        "variables on more than one processor"
+                    )
+        self._instances = [i for i in range(nin) if i * groups // nin == self._time_group]
+
+        self.add_step_inputs()
+        self.add_initial_condition_inputs()
+        self._step_problems = {
+            i: self._create_step_problem(self._get_instance_timestep_group())
+            for i in self._instances
+        }
+        self._use_step_problem(self._instances[0])
+        self._setup_backplane_interpolation()
+        self.add_instance_outputs()
+        self._instances_linearized = False
+
+    def _get_instance_timestep_group(self):
+        """
+        Step group of an instance with its own copies of the solvers
+        """
+        group = self._get_timestep_group()
+        for solver in ["nonlinear_solver", "linear_solver"]:
+            if self.options[solver] is not None:
+                group.options[solver] = copy.deepcopy(self.options[solver])
+        return group
+
+    def _setup_backplane_interpolation(self):
+        """
+        Interpolation weights of the backplanes of each instance, shape (N, backplanes, N)
+        """
+        nin = self.options["nsteps"]
+        dt = self.options["dt"]
+        spacing = self.options["backplane_spacing"] or dt / 100.0
+        self._backplane_spacing = spacing
+        self._number_of_time_backplanes = max(
+            [var.number_of_backplanes for var in self._get_time_derivative_variables()],
+            default=0,
+        )
+
+        offsets = spacing * np.arange(1, self._number_of_time_backplanes + 1)
+        self._backplane_times = np.arange(nin)[:, np.newaxis] * dt - offsets
+        self._backplane_weights = np.array(
+            [
+                get_trigonometric_interpolation_weights(times, nin, nin * dt)
+                for times in self._backplane_times
+            ]
+        ).reshape(nin, self._number_of_time_backplanes, nin)
+
+    def add_instance_outputs(self):
+        nin = self.options["nsteps"]
+        for var in self._get_time_derivative_variables():
+            shape = (nin,) + tuple(np.atleast_1d(var.shape))
+            self.add_output(
+                f"{var.name}|instances", shape=shape, distributed=var.distributed
+            )
+
+    def compute(self, inputs, outputs):
+        tolerance = self.options["newton_tolerance"]
+        max_iterations = self.options["newton_max_iterations"]
+        self._set_mphys_inputs(inputs)
+
+        states = self._get_initial_instances(inputs)
+        solutions = self._solve_instances(states)
+        residuals = {name: states[name] - solutions[name] for name in states}
+        first_residual_norm = self._get_norm(residuals)
+        change = None
+        for iteration in range(1, max_iterations + 1):
+            update = self._solve_newton_update(residuals, first_residual_norm)
+            for name in states:
+                states[name] = states[name] - update[name]
+            solutions = self._solve_instances(states)
+
+            change = max([np.max(np.abs(value), initial=0.0) for value in update.values()])
+            if self.comm.rank == 0:
+                print(f"Harmonic balance iteration {iteration} update {change:e}")
+            if change <= tolerance:
+                break
+            residuals = {name: states[name] - solutions[name] for name in states}
+        else:
+            raise AnalysisError(
+                f"{self.msginfo}: the harmonic balance Newton iterations did not converge in "
+                f"{max_iterations} iterations, the last update is {change}"
+            )
+
+        for name, solution in solutions.items():
+            outputs[f"{name}|instances"] = solution
+        self._instances_linearized = False
+
+    def _get_initial_instances(self, inputs):
+        """
+        Initial guess of all instances
+        """
+        nin = self.options["nsteps"]
+        return {
+            var.name: np.repeat(inputs[f"{var.name}|0"][np.newaxis], nin, axis=0)
+            for var in self._get_time_derivative_variables()
+        }
+
+    def _set_instance_information(self, instance):
+        """
+        Time information of an instance and its backplanes
+        """
+        dt = self.options["dt"]
+        time_views = self._step.time_views
+        time_views["step"][...] = instance
+        time_views["time"][...] = instance * dt
+        time_views["dt"][...] = self._backplane_spacing
+        for backplane, view in enumerate(self._step.time_backplane_views):
+            view[...] = self._backplane_times[instance, backplane]
+
+    def _interpolate_backplane(self, instance, backplane, values):
+        return np.tensordot(self._backplane_weights[instance, backplane], values, axes=1)
+
+    def _solve_instances(self, states):
+        """
+        Solve the step problem of each instance with the backplanes interpolated from the states
+        """
+        solutions = {}
+        for i in self._instances:
+            self._use_step_problem(i)
+            self._set_instance_information(i)
+            for name, views in self._step.backplane_views.items():
+                for backplane, view in enumerate(views):
+                    view[...] = self._interpolate_backplane(i, backplane, states[name])
+                # start the step solve from the current instance state
+                self._step.state_views[name][...] = states[name][i]
+            self.problem.run_model()
+            solutions[i] = {
+                name: view.copy() for name, view in self._step.state_views.items()
+            }
+        return self._gather_instances(solutions, states)
+
+    def _gather_instances(self, instance_values, like):
+        """
+        Arrays of all instances from the values of the instances of each group
+        """
+        instance_values = self._gather_slice_states(instance_values)
+        return {
+            name: np.array([instance_values[i][name] for i in range(len(instance_values))])
+            .reshape(like[name].shape)
+            for name in like
+        }
+
+    def _solve_newton_update(self, residuals, reference_norm):
+        """
+        Solve (I - dS/du) du = R with GMRES. The instance problems are linearized about
+        their last solutions. The tolerance is relative to the reference norm, since the
+        later residuals can be close to the round-off level of the step solutions
+        """
+        self._linearize_instances()
+        return self._solve_instance_system(
+            residuals, "fwd", self.options["gmres_tolerance"] * reference_norm
+        )
+
+    def _linearize_instances(self):
+        for i in self._instances:
+            self._step_problems[i].problem.model.run_linearize()
+
+    def _solve_instance_system(self, rhs, mode, atol):
+        """
+        Solve (I - dS/du) x = b in fwd mode, or (I - dS/du)^T x = b in rev mode, with GMRES
+        """
+        names = list(rhs.keys())
+        sizes = [rhs[name].size for name in names]
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+
+        def unpack(vector):
+            return {
+                name: vector[offsets[j] : offsets[j + 1]].reshape(rhs[name].shape)
+                for j, name in enumerate(names)
+            }
+
+        def pack(values):
+            return np.concatenate([values[name].ravel() for name in names])
+
+        if mode == "fwd":
+            apply_step_jacobians = self._apply_step_jacobians
+        else:
+            apply_step_jacobians = self._apply_transposed_step_jacobians
+
+        def matvec(vector):
+            directions = unpack(vector)
+            products = apply_step_jacobians(directions)
+            return pack({name: directions[name] - products[name] for name in names})
+
+        size = offsets[-1]
+        operator = LinearOperator((size, size), matvec=matvec, dtype=float)
+        solution, info = gmres(
+            operator,
+            pack(rhs),
+            rtol=0.0,
+            atol=atol,
+            restart=min(size, 50),
+            maxiter=max(size // 50, 1) * 2,
+        )
+        if info != 0:
+            issue_warning(
+                f"GMRES of the harmonic balance {mode} system did not converge, info {info}",
+                prefix=self.msginfo,
+                category=SolverWarning,
+            )
+        return unpack(solution)
+
+    def _apply_step_jacobians(self, directions):
+        """
+        Products dS/du v of the instance step solutions with directions of all instances
+        """
+        products = {}
+        for i in self._instances:
+            self._use_step_problem(i)
+            seed = {}
+            for name, views in self._step.backplane_views.items():
+                for backplane in range(len(views)):
+                    seed[f"{name}|t-{backplane+1}"] = self._interpolate_backplane(
+                        i, backplane, directions[name]
+                    )
+            of = list(self._step.state_views.keys())
+            jac_vecs = self.problem.compute_jacvec_product(
+                of=of, wrt=list(seed.keys()), mode="fwd", seed=seed
+            )
+            products[i] = {
+                name: jac_vecs[name].reshape(self._step.state_views[name].shape)
+                for name in of
+            }
+        return self._gather_instances(products, directions)
+
+    def _apply_transposed_step_jacobians(self, directions):
+        """
+        Products (dS/du)^T v of the instance step solutions with directions of all instances.
+        The backplane products of each instance are spread over the instances with the
+        interpolation weights
+        """
+        products = {name: np.zeros_like(value) for name, value in directions.items()}
+        for i in self._instances:
+            self._use_step_problem(i)
+            seed = {name: directions[name][i] for name in self._step.state_views}
+            wrt = [
+                f"{name}|t-{backplane+1}"
+                for name, views in self._step.backplane_views.items()
+                for backplane in range(len(views))
+            ]
+            jac_vecs = self.problem.compute_jacvec_product(
+                of=list(seed.keys()), wrt=wrt, mode="rev", seed=seed
+            )
+            for name, views in self._step.backplane_views.items():
+                for backplane in range(len(views)):
+                    jac_vec = jac_vecs[f"{name}|t-{backplane+1}"].reshape(
+                        directions[name].shape[1:]
+                    )
+                    products[name] += np.multiply.outer(
+                        self._backplane_weights[i, backplane], jac_vec
+                    )
+        return self._sum_over_time_groups(products)
+
+    def _sum_over_time_groups(self, values):
+        """
+        Sums of the contributions of the instances of each time parallel group
+        """
+        if self._time_comm is None:
+            return values
+        return {name: self._time_comm.allreduce(value) for name, value in values.items()}
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if not self._instances_linearized:
+            self._linearize_instances()
+            self._instances_linearized = True
+
+        tolerance = self.options["gmres_tolerance"]
+        step_inputs = [
+            var.name
+            for builder in self._get_builder_list()
+            for var in builder.get_timestep_input_variables()
+            if var.name in d_inputs
+        ]
+        like = self._get_initial_instances(inputs)
+
+        if mode == "fwd":
+            # inputs without seeds would only add the round-off of the step solvers
+            seed = {name: d_inputs[name] for name in step_inputs if np.any(d_inputs[name])}
+            rhs = {name: np.zeros_like(value) for name, value in like.items()}
+            if seed:
+                products = {}
+                for i in self._instances:
+                    self._use_step_problem(i)
+                    of = list(self._step.state_views.keys())
+                    jac_vecs = self.problem.compute_jacvec_product(
+                        of=of, wrt=list(seed.keys()), mode="fwd", seed=seed
+                    )
+                    products[i] = {
+                        name: jac_vecs[name].reshape(self._step.state_views[name].shape)
+                        for name in of
+                    }
+                rhs = self._gather_instances(products, like)
+            tangents = self._solve_instance_system(
+                rhs, "fwd", tolerance * self._get_norm(rhs)
+            )
+            for name, tangent in tangents.items():
+                if f"{name}|instances" in d_outputs:
+                    d_outputs[f"{name}|instances"] += tangent
+
+        if mode == "rev":
+            seeds = {}
+            for name, value in like.items():
+                seeds[name] = np.zeros_like(value)
+                if f"{name}|instances" in d_outputs:
+                    seeds[name] += d_outputs[f"{name}|instances"]
+            adjoints = self._solve_instance_system(
+                seeds, "rev", tolerance * self._get_norm(seeds)
+            )
+            if not step_inputs:
+                return
+            sums = {name: np.zeros_like(d_inputs[name]) for name in step_inputs}
+            for i in self._instances:
+                self._use_step_problem(i)
+                seed = {name: adjoints[name][i] for name in self._step.state_views}
+                jac_vecs = self.problem.compute_jacvec_product(
+                    of=list(seed.keys()), wrt=step_inputs, mode="rev", seed=seed
+                )
+                for name in step_inputs:
+                    sums[name] += jac_vecs[name].reshape(sums[name].shape)
+            for name, value in self._sum_over_time_groups(sums).items():
+                d_inputs[name] += value
+
+    def _get_norm(self, values):
+        return np.sqrt(sum([np.sum(value**2) for value in values.values()]))
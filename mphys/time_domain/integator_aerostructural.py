@@ -1,3 +1,4 @@
+from mphys.time_domain.harmonic_balance import HarmonicBalanceIntegrator
 from mphys.time_domain.integrator import Integrator
 
 from .timestep_aerostructural import TimeStepAeroStructural
@@ -25,3 +26,9 @@ class IntegratorAerostructural(Integrator):
             self.options["struct_builder"],
             self.options["ldxfer_builder"],
         ]
+
+
+class HarmonicBalanceAerostructural(HarmonicBalanceIntegrator, IntegratorAerostructural):
+    """
+    Harmonic balance solution of the aerostructural time step problem
+    """
@@ -1,9 +1,68 @@
+from dataclasses import dataclass
+
+import numpy as np
 import openmdao.api as om
+from openmdao.utils.mpi import MPI
+from openmdao.utils.om_warnings import SolverWarning, issue_warning
 
+from ..distributed_converter import get_balanced_sizes
+from .backplanes import BackplaneRing
+from .bdf import estimate_local_truncation_error
+from .checkpointing import get_checkpoint_schedule
+from .step_history import StepHistory
 from .time_domain_builder import TimeDomainBuilder
 
 
+@dataclass
+class StepProblem:
+    """
+    Problem solved at each time step and views of its variables in the problem's output
+    vector. The integrator sets and reads the step variables through the views, so the
+    promoted names are only resolved once
+    """
+    problem: om.Problem
+    state_views: dict
+    backplane_views: dict
+    input_views: dict
+    time_views: dict
+    time_backplane_views: list
+
+
 class Integrator(om.ExplicitComponent):
+    """
+    Time integration of a time step problem built from time domain builders.
+
+    The outputs are the time derivative variables at the final step, "{name}|end".
+    Their reverse mode derivatives with respect to the time step inputs and the initial
+    conditions are computed with an adjoint sweep over the time history. The step states
+    are read from the step history, or, with a checkpoint budget, recomputed from
+    binomial checkpoints so only the budgeted number of states is held at a time.
+
+    With time slices, the time window is integrated with Parareal: a coarse propagator
+    predicts the state at the start of each slice, the slices are integrated with the
+    fine step problem in parallel over groups of processors, and the coarse sweep is
+    corrected with the fine results until the slice states converge. The step history
+    and the final states are those of a last fine sweep from the converged slice states.
+
+    With an error tolerance, the step size is adapted: the local truncation error of each step
+    is estimated from the new solution and the backplanes, steps with too large an error are
+    repeated with a smaller step, and the next step size is chosen from the error estimate.
+    The step subsystems get the time of each backplane, "time|t-{n}", for variable step formulas.
+    The step sizes depend on the inputs, so the derivatives of adaptive integrations are not
+    available.
+
+    Forward mode derivatives are computed with a tangent sweep that carries the derivatives of
+    the states with respect to the entries of the inputs as the columns of a matrix; the initial
+    conditions and the distributed inputs only get columns when their derivatives are requested.
+    Each step is solved again, and when the state has fewer entries than there are columns, the
+    Jacobian of the step solution is assembled once with one reverse solve per state entry and
+    all the columns are updated with matrix products. Larger or distributed states take one
+    Jacobian-vector product per column instead. The tangents hold state size x columns values
+    per backplane, and the derivatives of the final states are kept, so each input is only swept
+    once after a compute. Reverse mode is cheaper for many input entries of large states, e.g.
+    their initial conditions.
+    """
+
     def initialize(self):
         self.options.declare("nsteps", types=int, desc="Number of time steps")
         self.options.declare("dt", desc="Time step size")
@@ -18,9 +77,114 @@ class Integrator(om.ExplicitComponent):
             default=None,
             desc="Linear solver to use in the time step coupling group",
         )
+        self.options.declare(
+            "history_directory",
+            default=None,
+            desc="Directory of the memory mapped step history files. If None, the history is kept in memory",
+        )
+        self.options.declare(
+            "max_queued_steps",
+            default=8,
+            desc="Number of step values that can wait for the background history writer",
+        )
+        self.options.declare(
+            "checkpoints",
+            default=None,
+            types=(int, type(None)),
+            desc="Number of step states stored by binomial checkpointing for the reverse sweep. "
+            "If None, the reverse sweep reads the states from the step history. "
+            "With checkpoints and without a history directory, the step history is not stored",
+        )
+        self.options.declare(
+            "time_slices",
+            default=None,
+            types=(int, type(None)),
+            desc="Number of slices of the time window integrated in parallel with Parareal. "
+            "If None, the steps are integrated in sequence",
+        )
+        self.options.declare(
+            "time_parallel_groups",
+            default=1,
+            types=int,
+            desc="Number of processor groups that the time slices are distributed over. "
+            "The processors of a group solve the step problems of its slices",
+        )
+        self.options.declare(
+            "coarse_nonlinear_solver",
+            default=None,
+            desc="Nonlinear solver of the coarse Parareal propagator. If None, a single "
+            "NonlinearRunOnce pass per coarse step",
+        )
+        self.options.declare(
+            "coarse_linear_solver",
+            default=None,
+            desc="Linear solver of the coarse Parareal propagator. If None, LinearRunOnce",
+        )
+        self.options.declare(
+            "coarse_step_stride",
+            default=1,
+            types=int,
+            lower=1,
+            desc="Number of fine steps spanned by a step of the coarse Parareal propagator. "
+            "The last coarse step of a slice ends at the slice end and may be shorter",
+        )
+        self.options.declare(
+            "parareal_tolerance",
+            default=1e-8,
+            desc="Largest change of the slice states between Parareal iterations at convergence",
+        )
+        self.options.declare(
+            "parareal_max_iterations",
+            default=None,
+            desc="Maximum number of Parareal iterations. If None, the number of slices, "
+            "after which Parareal reproduces the sequential integration. A warning is issued "
+            "if the slice states have not converged in fewer iterations",
+        )
+        self.options.declare(
+            "error_tolerance",
+            default=None,
+            desc="Tolerance of the estimated local truncation error of a step relative to 1 + |u|. "
+            "If None, nsteps steps of size dt are taken. Otherwise, the steps are adapted "
+            "to reach the final time nsteps * dt. The error of the first bdf_order steps can "
+            "not be estimated, so they are taken with dt_min and the step size grows from there",
+        )
+        self.options.declare(
+            "bdf_order",
+            default=2,
+            types=int,
+            desc="Order of the time derivative formulas of the step subsystems, "
+            "used by the error estimate and the step size controller",
+        )
+        self.options.declare(
+            "dt_min",
+            default=None,
+            desc="Smallest adaptive step size. If None, dt / 1000",
+        )
+        self.options.declare(
+            "dt_max",
+            default=None,
+            desc="Largest adaptive step size. If None, the steps are not limited",
+        )
+        self.options.declare(
+            "max_steps",
+            default=None,
+            desc="Largest number of adaptive steps, which sets the size of the step history. "
+            "If None, the number of steps of size dt_min to the final time, which the "
+            "integration can not exceed",
+        )
 
     def setup(self):
+        if (
+            self.options["error_tolerance"] is not None
+            and self.options["time_slices"] is not None
+        ):
+            raise ValueError("Adaptive time steps can not be combined with time slices")
+        self._setup_time_parallel_comms(self.options["time_slices"])
         self._setup_step_problem()
+        self._setup_step_history()
+        self._setup_backplane_rings()
+        self.add_final_state_outputs()
+        self._input_tangents = {}
 
     def _setup_step_problem(self):
         """
@@ -28,9 +192,171 @@ class Integrator(om.ExplicitComponent):
         """
         self.add_step_inputs()
         self.add_initial_condition_inputs()
-        self.problem = om.Problem()
-        self.problem.model = self._get_timestep_group()
-        self.problem.setup()
+        models = {"fine": self._get_timestep_group()}
+        if self.options["time_slices"] is not None:
+            models["coarse"] = self._get_coarse_timestep_group()
+        self._step_problems = {
+            name: self._create_step_problem(model) for name, model in models.items()
+        }
+        self._use_step_problem("fine")
+
+    def _setup_time_parallel_comms(self, number_of_slices):
+        """
+        Split the processors into groups that integrate different time slices.
+        The step problems are solved on the group communicator, and the processors with the
+        same rank in each group exchange the slice states over the time communicator
+        """
+        groups = self.options["time_parallel_groups"]
+        self._time_group = 0
+        self._time_comm = None
+        self._step_comm = self.comm
+        if groups == 1:
+            return
+
+        if number_of_slices is None or number_of_slices < groups:
+            raise ValueError(
+                "time_parallel_groups requires at least as many time slices as groups"
+            )
+        if self.comm.size % groups != 0:
+            raise ValueError(
+                f"The {self.comm.size} processors can not be split into {groups} time parallel groups"
+            )
+        for builder in self._get_builder_list():
+            variables = list(builder.get_time_derivative_variables())
+            variables += builder.get_timestep_input_variables()
+            if any(var.distributed for var in variables):
+                raise ValueError(
+                    "Time parallel groups do not support distributed time step variables"
+                )
+
+        group_size = self.comm.size // groups
+        self._time_group = self.comm.rank // group_size
+        self._step_comm = self.comm.Split(self._time_group, self.comm.rank)
+        self._time_comm = self.comm.Split(self.comm.rank % group_size, self.comm.rank)
+
+    def _create_step_problem(self, model):
+        """
+        Set up a step problem and resolve its time derivative variables, backplanes,
+        step inputs and time information into views
+        """
+        problem = om.Problem(comm=self._step_comm)
+        problem.model = model
+        problem.setup()
+        problem.final_setup()
+
+        state_views = {}
+        backplane_views = {}
+        number_of_time_backplanes = 0
+        for var in self._get_time_derivative_variables():
+            state_views[var.name] = self._get_step_output_view(problem, var.name)
+            backplane_views[var.name] = [
+                self._get_step_output_view(problem, f"{var.name}|t-{backplane+1}")
+                for backplane in range(var.number_of_backplanes)
+            ]
+            number_of_time_backplanes = max(
+                number_of_time_backplanes, var.number_of_backplanes
+            )
+
+        input_views = {}
+        for builder in self._get_builder_list():
+            for var in builder.get_timestep_input_variables():
+                input_views[var.name] = self._get_step_output_view(problem, var.name)
+
+        time_views = {
+            name: self._get_step_output_view(problem, name)
+            for name in ["step", "dt", "time"]
+        }
+        # step groups that do not use variable step formulas may not add the backplane times
+        outputs = {
+            meta["prom_name"]
+            for meta in problem.model.get_io_metadata(iotypes="output", get_remote=True).values()
+        }
+        time_backplane_views = []
+        for backplane in range(number_of_time_backplanes):
+            if f"time|t-{backplane+1}" not in outputs:
+                break
+            time_backplane_views.append(
+                self._get_step_output_view(problem, f"time|t-{backplane+1}")
+            )
+        return StepProblem(
+            problem,
+            state_views,
+            backplane_views,
+            input_views,
+            time_views,
+            time_backplane_views,
+        )
+
+    def _get_step_output_view(self, problem, name):
+        """
+        View of an output of a step problem. Problem.get_val returns a view of the output vector
+        for outputs that are read without unit conversion or indices. This is checked once
+        here, since the integrator writes the step variables through the views
+        """
+        view = problem.get_val(name)
+        value = view.copy()
+        problem.set_val(name, value + 1.0)
+        is_view = np.array_equal(view, value + 1.0)
+        problem.set_val(name, value)
+        if not is_view:
+            raise RuntimeError(
+                f"The value of {name} from the step problem is not a view of its output vector"
+            )
+        return view
+
+    def _use_step_problem(self, name):
+        """
+        Make the "fine" or "coarse" step problem the one that the steps are solved with
+        """
+        self._step = self._step_problems[name]
+        self.problem = self._step.problem
+
+    def _get_max_number_of_steps(self):
+        if self.options["error_tolerance"] is None:
+            return self.options["nsteps"]
+        if self.options["max_steps"] is None:
+            # all steps but the last one are at least dt_min long
+            final_time = self.options["nsteps"] * self.options["dt"]
+            return int(np.ceil(final_time / self._get_dt_min() - 1e-12)) + 1
+        return self.options["max_steps"]
+
+    def _get_dt_min(self):
+        return self.options["dt_min"] or self.options["dt"] / 1000.0
+
+    def _setup_backplane_rings(self):
+        """
+        Preallocated ring buffers of the latest solutions of the time derivative variables
+        """
+        self._backplanes = {
+            var.name: BackplaneRing(var.number_of_backplanes, var.shape)
+            for var in self._get_time_derivative_variables()
+        }
+
+        if self.options["error_tolerance"] is not None:
+            order = self.options["bdf_order"]
+            if not any(ring.size > order for ring in self._backplanes.values()):
+                raise ValueError(
+                    f"Adaptive time steps need a time derivative variable with at least "
+                    f"{order + 1} backplanes to estimate the error of order {order} steps"
+                )
+
+    def _setup_step_history(self):
+        """
+        Storage of the time derivative variables at each step
+        """
+        self.history = None
+        if (
+            self.options["checkpoints"] is not None
+            and self.options["history_directory"] is None
+        ):
+            return
+        self.history = StepHistory(
+            self._get_time_derivative_variables(),
+            self._get_max_number_of_steps(),
+            directory=self.options["history_directory"],
+            rank=self.comm.rank,
+            max_queued_steps=self.options["max_queued_steps"],
+        )
 
     def add_step_inputs(self):
         for builder in self._get_builder_list():
@@ -44,48 +370,659 @@ class Integrator(om.ExplicitComponent):
                     f"{var.name}|0", shape=var.shape, distributed=var.distributed
                 )
 
+    def add_final_state_outputs(self):
+        for var in self._get_time_derivative_variables():
+            self.add_output(
+                f"{var.name}|end", shape=var.shape, distributed=var.distributed
+            )
+
     def compute(self, inputs, outputs):
+        self._input_tangents = {}
         self._set_mphys_inputs(inputs)
+        self._set_initial_backplanes(inputs)
+        self._store_initial_conditions(inputs)
 
-        # start from step 1 to leave initial conditions as 0
-        for step in range(1, self.options["nsteps"] + 1):
-            if self.comm.rank == 0:
-                print(f"Integrator step {step}")
-            self._set_time_step_information(step)
-            self._setup_step_backplanes(step, inputs)
+        if self.options["error_tolerance"] is not None:
+            self._integrate_adaptive()
+        else:
+            self._nsteps = self.options["nsteps"]
+            self._step_times = [
+                step * self.options["dt"] for step in range(self._nsteps + 1)
+            ]
+            if self.options["time_slices"] is not None:
+                self._integrate_parareal()
+            else:
+                # start from step 1 to leave initial conditions as 0
+                for step in range(1, self._nsteps + 1):
+                    if self.comm.rank == 0:
+                        print(f"Integrator step {step}")
+                    self._run_step(step)
+                    self._store_step_output(step)
+        if self.history is not None:
+            self.history.flush()
+
+        for var in self._get_time_derivative_variables():
+            outputs[f"{var.name}|end"] = self._backplanes[var.name][0]
+
+    def _run_step(self, step, backplane_times=None):
+        """
+        Solve a time step from the current backplanes and shift its solution into them
+        """
+        self._set_time_step_information(step, backplane_times)
+        self._setup_step_backplanes(step)
+        self.problem.run_model()
+        self._shift_backplanes()
+
+    def _integrate_adaptive(self):
+        """
+        Integrate to the final time with steps adapted to the error tolerance.
+
+        The error estimate of a step needs the solutions of order+1 prior steps. The first
+        bdf_order steps would use the initial conditions extended to before the first step
+        instead, so they are taken with dt_min without an estimate, and the controller
+        grows the step size from there.
+        """
+        dt = self.options["dt"]
+        final_time = self.options["nsteps"] * dt
+        dt_min = self._get_dt_min()
+        dt_max = self.options["dt_max"] or np.inf
+        max_steps = self._get_max_number_of_steps()
+        order = self.options["bdf_order"]
+
+        self._step_times = [0.0]
+        step = 0
+        while final_time - self._step_times[step] > 1e-12 * final_time:
+            if step == max_steps:
+                raise RuntimeError(
+                    f"The final time was not reached in {max_steps} steps, increase max_steps"
+                )
+
+            startup = step < order
+            if startup:
+                dt = dt_min
+
+            # do not leave a sliver of a step before the final time
+            time = self._step_times[step] + dt
+            if final_time - time < 0.1 * dt:
+                time = final_time
+            dt = time - self._step_times[step]
+
+            self._step_times.append(time)
+            self._set_time_step_information(step + 1)
+            self._setup_step_backplanes(step + 1)
             self.problem.run_model()
+
+            if startup:
+                error = None
+                factor = 2.0
+            else:
+                error = self._estimate_step_error()
+                factor = 0.9 * (max(error, 1e-10) ** (-1.0 / (order + 1)))
+                factor = min(max(factor, 0.2), 2.0)
+                if error > 1.0 and dt > dt_min:
+                    self._step_times.pop()
+                    dt = max(dt * factor, dt_min)
+                    continue
+
+            step += 1
+            if self.comm.rank == 0:
+                print(f"Integrator step {step} time {time} dt {dt} error {error}")
+            self._shift_backplanes()
             self._store_step_output(step)
+            dt = min(max(dt * factor, dt_min), dt_max)
+
+        self._nsteps = step
+
+    def _estimate_step_error(self):
+        """
+        Root mean square of the local truncation error estimates of the step that was just solved,
+        relative to the tolerance times 1 + |u|. Only the variables with enough backplanes are used
+        """
+        order = self.options["bdf_order"]
+        tolerance = self.options["error_tolerance"]
+        step = len(self._step_times) - 1
+        times = [self._get_step_time(step - i) for i in range(order + 2)]
 
-    def _set_time_step_information(self, step):
-        self.problem["dt"] = self.options["dt"]
-        self.problem["step"] = step
-        self.problem["time"] = step * self.options["dt"]
+        squares = 0.0
+        count = 0
+        for name, ring in self._backplanes.items():
+            if ring.size <= order:
+                continue
+            value = self._step.state_views[name]
+            values = [value] + [ring[i] for i in range(order + 1)]
+            error = estimate_local_truncation_error(values, times, order)
+            squares += np.sum((error / (tolerance * (1.0 + np.abs(value)))) ** 2)
+            count += value.size
+
+        if self.comm.size > 1:
+            squares, count = self.comm.allreduce(np.array([squares, count]))
+        return np.sqrt(squares / max(count, 1))
+
+    def _get_step_time(self, step):
+        """
+        Time of a step. The initial conditions are extended to the steps before the first one,
+        which are spaced by the size of the first step
+        """
+        if step < 0:
+            first_dt = self._step_times[1] if len(self._step_times) > 1 else self.options["dt"]
+            return step * first_dt
+        return self._step_times[step]
+
+    def _set_time_step_information(self, step, backplane_times=None):
+        """
+        Set the time views of a step. The backplane times default to the times of the
+        preceding steps, newest first
+        """
+        if backplane_times is None:
+            backplane_times = [
+                self._get_step_time(step - backplane - 1)
+                for backplane in range(max(len(self._step.time_backplane_views), 1))
+            ]
+        time = self._get_step_time(step)
+        time_views = self._step.time_views
+        time_views["dt"][...] = time - backplane_times[0]
+        time_views["step"][...] = step
+        time_views["time"][...] = time
+        for backplane, view in enumerate(self._step.time_backplane_views):
+            view[...] = backplane_times[backplane]
 
     def _set_mphys_inputs(self, inputs):
-        for builder in self._get_builder_list():
-            for var in builder.get_timestep_input_variables():
-                self.problem[f"{var.name}"] = inputs[var.name]
+        for step_problem in self._step_problems.values():
+            for name, view in step_problem.input_views.items():
+                view[...] = inputs[name].reshape(view.shape)
 
-    def _setup_step_backplanes(self, step, inputs):
-        for builder in self._get_builder_list():
-            for var in builder.get_time_derivative_variables():
-                for backplane in range(var.number_of_backplanes):
-                    prior_step = step - backplane
-                    if prior_step > 0:
-                        source = "" if backplane == 0 else f"|t-{backplane}"
-                        self.problem[f"{var.name}|t-{backplane+1}"] = self.problem[
-                            f"{var.name}{source}"
-                        ]
-                    else:
-                        self.problem[f"{var.name}|t-{backplane+1}"] = inputs[
-                            f"{var.name}|0"
-                        ]
+    def _integrate_parareal(self):
+        """
+        Parareal iterations over the time slices:
+
+        U_{i+1}^{k+1} = G(U_i^{k+1}) + F(U_i^k) - G(U_i^k)
+
+        where U_i is the state at the start of slice i, G is the coarse propagator and F the
+        fine one. The fine propagations of iteration k are independent, so each processor group
+        integrates its slices and the results are exchanged. The coarse sweeps are repeated on
+        every group. The propagators only depend on the slice start states, so the states of
+        the first k slices are exact after k iterations and the states of all slices are exact
+        after nslices iterations.
+
+        The fine sweeps store the step history of the slices of each group. Once the slice
+        states have converged, the slices whose start state changed in the last iteration
+        are integrated again, so the history and the final states are the fine solution
+        from the converged states.
+        """
+        nslices = self.options["time_slices"]
+        groups = self.options["time_parallel_groups"]
+        tolerance = self.options["parareal_tolerance"]
+        max_iterations = self.options["parareal_max_iterations"] or nslices
+
+        sizes = get_balanced_sizes(self.options["nsteps"], nslices)
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        my_slices = [i for i in range(nslices) if i * groups // nslices == self._time_group]
+
+        states = [self._get_ordered_state()]
+        coarse = []
+        for i in range(nslices):
+            coarse.append(self._propagate("coarse", states[i], bounds[i], bounds[i + 1]))
+            states.append(coarse[i])
+
+        # fine solutions of the slices of this group and the start states they were integrated from
+        fine = {}
+        fine_starts = {}
+        for iteration in range(1, max_iterations + 1):
+            self._propagate_fine_slices(my_slices, states, bounds, fine, fine_starts)
+            all_fine = self._gather_slice_states(fine)
+
+            new_states = [states[0]]
+            change = 0.0
+            for i in range(nslices):
+                new_coarse = self._propagate(
+                    "coarse", new_states[i], bounds[i], bounds[i + 1]
+                )
+                state = {}
+                for name in new_coarse:
+                    state[name] = new_coarse[name] + all_fine[i][name] - coarse[i][name]
+                    if state[name].size > 0:
+                        change = max(
+                            change, np.max(np.abs(state[name] - states[i + 1][name]))
+                        )
+                new_states.append(state)
+                coarse[i] = new_coarse
+            states = new_states
+
+            # the slice states of distributed variables differ between the ranks of a group
+            if self.comm.size > 1:
+                change = self.comm.allreduce(change, op=MPI.MAX)
+            if self.comm.rank == 0:
+                print(f"Parareal iteration {iteration} change {change:e}")
+            if change <= tolerance or iteration == nslices:
+                break
+        else:
+            issue_warning(
+                f"Parareal did not converge in {max_iterations} iterations, the last change of "
+                f"the slice states is {change:e} and the tolerance is {tolerance:e}",
+                prefix=self.msginfo,
+                category=SolverWarning,
+            )
+
+        self._propagate_fine_slices(my_slices, states, bounds, fine, fine_starts)
+        self._set_ordered_state(self._gather_slice_states(fine)[nslices - 1])
+
+    def _propagate_fine_slices(self, slices, states, bounds, fine, fine_starts):
+        """
+        Integrate the slices of this group whose start state is not the one of their current
+        fine solution, and store their step history
+        """
+        for i in slices:
+            if i in fine_starts and all(
+                np.array_equal(fine_starts[i][name], states[i][name]) for name in states[i]
+            ):
+                continue
+            fine_starts[i] = states[i]
+            fine[i] = self._propagate("fine", states[i], bounds[i], bounds[i + 1], store=True)
+
+    def _propagate(self, problem_name, state, start_step, end_step, store=False):
+        """
+        Integrate from the state after start_step to end_step with the fine or coarse step problem.
+        The solve of each step starts from the state of the preceding step, so the result only
+        depends on the start state and not on the last problem solved with the step problem.
+
+        The coarse steps span coarse_step_stride fine steps. The backplanes at the slice start
+        hold the fine steps before it, so the times of the backplanes are tracked with the
+        solutions and the first coarse step of a slice sees unevenly spaced backplanes
+        """
+        self._use_step_problem(problem_name)
+        self._set_ordered_state(state)
+        stride = self.options["coarse_step_stride"] if problem_name == "coarse" else 1
+        steps = list(range(start_step + stride, end_step, stride))
+        if end_step > start_step:
+            steps.append(end_step)
+        backplane_times = [
+            self._get_step_time(start_step - backplane)
+            for backplane in range(max(len(self._step.time_backplane_views), 1))
+        ]
+        for step in steps:
+            for name, view in self._step.state_views.items():
+                view[...] = self._backplanes[name][0]
+            self._run_step(step, backplane_times)
+            backplane_times = [self._get_step_time(step)] + backplane_times[:-1]
+            if store:
+                self._store_step_output(step)
+        self._use_step_problem("fine")
+        return self._get_ordered_state()
+
+    def _gather_slice_states(self, slice_states):
+        """
+        Slice states of all time parallel groups
+        """
+        if self._time_comm is None:
+            return slice_states
+        gathered = {}
+        for group_states in self._time_comm.allgather(slice_states):
+            gathered.update(group_states)
+        return gathered
+
+    def _get_ordered_state(self):
+        return {name: ring.get_ordered() for name, ring in self._backplanes.items()}
+
+    def _set_ordered_state(self, state):
+        for name, ring in self._backplanes.items():
+            ring.set_ordered(state[name])
+
+    def _set_initial_backplanes(self, inputs):
+        """
+        Backplanes of the first step, which all hold the initial conditions
+        """
+        for name, ring in self._backplanes.items():
+            ring.fill(inputs[f"{name}|0"])
+
+    def _setup_step_backplanes(self, step):
+        for name, views in self._step.backplane_views.items():
+            ring = self._backplanes[name]
+            for backplane, view in enumerate(views):
+                view[...] = ring[backplane]
+
+    def _shift_backplanes(self):
+        """
+        Make the solution of the step that was just solved the first backplane of the next step
+        """
+        for name, ring in self._backplanes.items():
+            ring.push(self._step.state_views[name])
+
+    def _store_initial_conditions(self, inputs):
+        if self.history is None:
+            return
+        self.history.write_time(0, 0.0)
+        for var in self._get_time_derivative_variables():
+            self.history.write(0, var.name, inputs[f"{var.name}|0"])
 
     def _store_step_output(self, step):
-        pass
+        if self.history is None:
+            return
+        self.history.write_time(step, self._get_step_time(step))
+        for name, view in self._step.state_views.items():
+            self.history.write(step, name, view)
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if self.options["error_tolerance"] is not None:
+            raise NotImplementedError(
+                "The adaptive step sizes depend on the inputs, so the linearized sweeps of the "
+                "last step sequence do not give the derivatives of the adaptive integration. "
+                "Use fixed steps without error_tolerance to compute derivatives"
+            )
+        if self._time_comm is not None:
+            raise NotImplementedError(
+                "The linearized sweeps need the states of all time slices on each processor, "
+                "which time parallel groups do not keep"
+            )
+        if mode == "fwd":
+            self._forward_linearized_loop(inputs, d_inputs, d_outputs)
+        if mode == "rev":
+            self._reverse_linearized_loop(inputs, d_inputs, d_outputs)
+
+    def _forward_linearized_loop(self, inputs, d_inputs, d_outputs):
+        """
+        Forward product with the derivatives of the final states. The seeded inputs without
+        tangents since the last compute are swept, and their tangents are kept. The other
+        serial step inputs share the sweep, since they add few columns, but the initial
+        conditions and the distributed inputs only get their many columns when they are seeded
+        """
+        seeds = {}
+        for name in d_inputs:
+            seed = self._get_global_input_value(name, d_inputs[name])
+            if np.any(seed):
+                seeds[name] = seed
+
+        wrt = [name for name in seeds if name not in self._input_tangents]
+        if wrt:
+            wrt += [
+                var.name
+                for builder in self._get_builder_list()
+                for var in builder.get_timestep_input_variables()
+                if var.name in d_inputs
+                and var.name not in wrt
+                and var.name not in self._input_tangents
+                and not self._var_rel2meta[var.name]["distributed"]
+            ]
+            self._input_tangents.update(self._integrate_tangents(inputs, wrt))
+
+        for name, seed in seeds.items():
+            for var_name, tangent in self._input_tangents[name].items():
+                if f"{var_name}|end" in d_outputs:
+                    d_outputs[f"{var_name}|end"] += (tangent @ seed).reshape(
+                        d_outputs[f"{var_name}|end"].shape
+                    )
+
+    def _get_global_input_value(self, name, value):
+        """
+        Flat value of an input with the entries of all processors for distributed inputs
+        """
+        value = np.asarray(value).ravel()
+        if self.comm.size > 1 and self._var_rel2meta[name]["distributed"]:
+            return np.concatenate(self.comm.allgather(value))
+        return value
+
+    def _get_tangent_columns(self, inputs, wrt):
+        """
+        Columns of the tangent matrix that hold the derivatives with respect to each input,
+        and the range of the local entries of the input within them
+        """
+        columns = {}
+        local_columns = {}
+        offset = 0
+        for name in wrt:
+            size = np.asarray(inputs[name]).size
+            local_start = 0
+            global_size = size
+            if self.comm.size > 1 and self._var_rel2meta[name]["distributed"]:
+                sizes = self.comm.allgather(size)
+                local_start = sum(sizes[: self.comm.rank])
+                global_size = sum(sizes)
+            columns[name] = (offset, offset + global_size)
+            local_columns[name] = (offset + local_start, offset + local_start + size)
+            offset += global_size
+        return columns, local_columns, offset
+
+    def _integrate_tangents(self, inputs, wrt):
+        """
+        Tangent sweep:
+
+        du_n/dx = pS_n/px + sum_{j} pS_n/pu_{n-j} du_{n-j}/dx
+
+        where S_n is the solution of step n. The tangents of the input entries are the columns
+        of a matrix per time derivative variable, which is kept in a ring buffer like the
+        states. The backplanes that precede step 1 hold the initial conditions, so their
+        tangents are the identity in the columns of the initial conditions. The steps are
+        solved again to linearize them, starting from the stored solutions when there is a
+        step history.
+
+        The columns are updated together from the Jacobian of each step, dS_n/d(x, u_{n-j}),
+        whose total derivatives cost one reverse solve per state entry. If there are fewer
+        columns than state entries, or the variables are distributed, each column is a forward
+        Jacobian-vector product of the step instead.
+
+        Returns
+        -------
+        tangents : dict
+            Derivatives of the final local state of each variable with respect to each input
+        """
+        variables = self._get_time_derivative_variables()
+        columns, local_columns, ncolumns = self._get_tangent_columns(inputs, wrt)
+
+        step_inputs = [
+            var.name
+            for builder in self._get_builder_list()
+            for var in builder.get_timestep_input_variables()
+            if var.name in columns
+        ]
+        input_seeds = {}
+        for name in step_inputs:
+            start, end = local_columns[name]
+            input_seeds[name] = np.zeros((end - start, ncolumns))
+            input_seeds[name][:, start:end] = np.eye(end - start)
+
+        tangents = {}
+        for var in variables:
+            size = np.asarray(inputs[f"{var.name}|0"]).size
+            tangents[var.name] = BackplaneRing(var.number_of_backplanes, (size, ncolumns))
+            initial = np.zeros((size, ncolumns))
+            if f"{var.name}|0" in columns:
+                start, end = local_columns[f"{var.name}|0"]
+                initial[:, start:end] = np.eye(size)
+            tangents[var.name].fill(initial)
+
+        of = [var.name for var in variables]
+        step_wrt = step_inputs + [
+            f"{var.name}|t-{backplane+1}"
+            for var in variables
+            for backplane in range(var.number_of_backplanes)
+        ]
+
+        state_size = sum(tangents[name][0].shape[0] for name in of)
+        distributed = self.comm.size > 1 and any(
+            self._var_rel2meta[name]["distributed"]
+            for name in list(columns) + [f"{var.name}|0" for var in variables]
+        )
+        use_step_jacobian = state_size < ncolumns and not distributed
+
+        self._set_mphys_inputs(inputs)
+        self._set_initial_backplanes(inputs)
+        for step in range(1, self._nsteps + 1):
+            self._set_time_step_information(step)
+            self._setup_step_backplanes(step)
+            if self.history is not None:
+                for name, view in self._step.state_views.items():
+                    view[...] = self.history.read(step, name)
+            self.problem.run_model()
+
+            new_tangents = {name: np.zeros_like(tangents[name][0]) for name in of}
+            if use_step_jacobian:
+                jacobian = self.problem.compute_totals(
+                    of=of, wrt=step_wrt, return_format="dict"
+                )
+                for name in of:
+                    for input_name in step_inputs:
+                        start, end = local_columns[input_name]
+                        new_tangents[name][:, start:end] += jacobian[name][input_name]
+                    for var_name, views in self._step.backplane_views.items():
+                        for backplane in range(len(views)):
+                            new_tangents[name] += (
+                                jacobian[name][f"{var_name}|t-{backplane+1}"]
+                                @ tangents[var_name][backplane]
+                            )
+            else:
+                self.problem.model.run_linearize()
+                for column in range(ncolumns):
+                    seed = {name: input_seeds[name][:, column] for name in step_inputs}
+                    for name, views in self._step.backplane_views.items():
+                        for backplane in range(len(views)):
+                            seed[f"{name}|t-{backplane+1}"] = tangents[name][backplane][:, column]
+                    jac_vecs = self.problem.compute_jacvec_product(
+                        of=of, wrt=step_wrt, mode="fwd", seed=seed
+                    )
+                    for name in of:
+                        new_tangents[name][:, column] = jac_vecs[name].ravel()
+
+            self._shift_backplanes()
+            for name, ring in tangents.items():
+                ring.push(new_tangents[name])
+
+        return {
+            name: {
+                var_name: ring[0][:, start:end].copy()
+                for var_name, ring in tangents.items()
+            }
+            for name, (start, end) in columns.items()
+        }
+
+    def _reverse_linearized_loop(self, inputs, d_inputs, d_outputs):
+        """
+        Adjoint sweep from the final step to the first.
+
+        psi_n = pf/pu_n + sum_{j} lambda_{n,j}, where lambda_{n,j} is the product of the
+        adjoint of step n+j with the partial of its residual with respect to its backplane t-j.
+        The partials of each step with respect to the step inputs are accumulated in d_inputs,
+        and the backplanes that precede step 1 hold the initial conditions.
+        """
+        variables = self._get_time_derivative_variables()
+        nsteps = self._nsteps
+
+        # lambda[name][j-1] holds the contributions to the state j steps before the current step
+        lambdas = {}
+        for var in variables:
+            seed = np.zeros_like(inputs[f"{var.name}|0"])
+            if f"{var.name}|end" in d_outputs:
+                if nsteps == 0:
+                    if f"{var.name}|0" in d_inputs:
+                        d_inputs[f"{var.name}|0"] += d_outputs[f"{var.name}|end"]
+                    continue
+                seed += d_outputs[f"{var.name}|end"]
+            lambdas[var.name] = [seed] + [
+                np.zeros_like(seed) for _ in range(var.number_of_backplanes)
+            ]
+
+        of = [var.name for var in variables]
+        step_inputs = [
+            var.name
+            for builder in self._get_builder_list()
+            for var in builder.get_timestep_input_variables()
+            if var.name in d_inputs
+        ]
+        wrt = step_inputs + [
+            f"{var.name}|t-{backplane+1}"
+            for var in variables
+            for backplane in range(var.number_of_backplanes)
+        ]
+
+        self._set_mphys_inputs(inputs)
+        self._checkpoints = {0: self._get_initial_state(inputs)}
+        for action in get_checkpoint_schedule(nsteps, self.options["checkpoints"]):
+            if action[0] == "restore":
+                self._restore_state(action[1], inputs)
+            elif action[0] == "advance":
+                for step in range(action[1] + 1, action[2] + 1):
+                    self._run_step(step)
+            elif action[0] == "store":
+                self._checkpoints[action[1]] = self._get_current_state()
+            elif action[0] == "free":
+                del self._checkpoints[action[1]]
+            elif action[0] == "reverse":
+                self._reverse_step(action[1], of, wrt, step_inputs, lambdas, d_inputs)
+        self._checkpoints = {}
+
+    def _reverse_step(self, step, of, wrt, step_inputs, lambdas, d_inputs):
+        """
+        Linearize a step about the current state and propagate the adjoint through it
+        """
+        self._set_time_step_information(step)
+        self._setup_step_backplanes(step)
+        self.problem.run_model()
+
+        seed = {name: lambdas[name][0] for name in of}
+        jac_vecs = self.problem.compute_jacvec_product(
+            of=of, wrt=wrt, mode="rev", seed=seed, linearize=True
+        )
+
+        for name in step_inputs:
+            d_inputs[name] += jac_vecs[name].reshape(d_inputs[name].shape)
+
+        for name, views in self._step.backplane_views.items():
+            contributions = lambdas[name]
+            contributions.pop(0)
+            contributions.append(np.zeros_like(contributions[0]))
+            for backplane in range(len(views)):
+                jac_vec = jac_vecs[f"{name}|t-{backplane+1}"]
+                if step - backplane - 1 > 0:
+                    contributions[backplane] += jac_vec.reshape(
+                        contributions[backplane].shape
+                    )
+                elif f"{name}|0" in d_inputs:
+                    d_inputs[f"{name}|0"] += jac_vec.reshape(d_inputs[f"{name}|0"].shape)
+
+    def _get_initial_state(self, inputs):
+        self._set_initial_backplanes(inputs)
+        return self._get_current_state()
+
+    def _get_current_state(self):
+        return {name: ring.copy() for name, ring in self._backplanes.items()}
+
+    def _restore_state(self, step, inputs):
+        """
+        Make the state after a step current, from a checkpoint or the step history
+        """
+        if step in self._checkpoints:
+            for name, ring in self._checkpoints[step].items():
+                self._backplanes[name].set(ring)
+            return
+
+        # push the stored solutions from the oldest to the newest over the initial conditions
+        self._set_initial_backplanes(inputs)
+        for name, ring in self._backplanes.items():
+            for backplane in range(ring.size - 1, -1, -1):
+                prior_step = step - backplane
+                if prior_step > 0:
+                    ring.push(self.history.read(prior_step, name))
+
+    def _get_time_derivative_variables(self):
+        variables = []
+        for builder in self._get_builder_list():
+            variables.extend(builder.get_time_derivative_variables())
+        return variables
 
     def _get_timestep_group(self):
         pass
 
+    def _get_coarse_timestep_group(self):
+        """
+        Step group of the coarse Parareal propagator. By default, the step group with the
+        coarse solvers, which are single RunOnce passes unless given, so that a coarse sweep
+        is cheaper than the fine one. Subclasses can return a cheaper model, e.g. from
+        reduced builders
+        """
+        group = self._get_timestep_group()
+        defaults = {"nonlinear_solver": om.NonlinearRunOnce, "linear_solver": om.LinearRunOnce}
+        for solver, default in defaults.items():
+            coarse_solver = self.options[f"coarse_{solver}"]
+            group.options[solver] = default() if coarse_solver is None else coarse_solver
+        return group
+
     def _get_builder_list(self) -> list[TimeDomainBuilder]:
         return []
@@ -0,0 +1,189 @@
+import os
+import queue
+import re
+import threading
+
+import numpy as np
+
+from .time_domain_variables import TimeDerivativeVariable
+
+
+class StepHistory:
+    """
+    History of the time derivative variables at every time step.
+
+    Without a directory, the history is held in memory. With a directory, each variable is
+    stored in a memory mapped .npy file per rank with one row per step, so histories that
+    do not fit in memory can be kept for adjoint sweeps and post-processing.
+    The file writes are done by a background thread so the time integration does not wait on
+    the file system. Steps that are still queued are read back from the queue.
+    The time stamp of each step is stored with the values, since the steps do not need to
+    have the same size.
+    """
+
+    def __init__(
+        self,
+        variables: list[TimeDerivativeVariable],
+        nsteps: int,
+        directory=None,
+        rank=0,
+        max_queued_steps=8,
+        dtype=float,
+    ):
+        """
+        Parameters
+        ----------
+        variables : list[TimeDerivativeVariable]
+            Variables to store at each step
+        nsteps : int
+            Maximum number of time steps. Step 0 holds the initial conditions
+        directory : str or None
+            Directory of the memory mapped files. If None, the history is kept in memory
+        rank : int
+            Rank of this process, used to keep the files of distributed variables apart
+        max_queued_steps : int
+            Number of step values that can wait to be written before write blocks
+        dtype : numpy.dtype
+            Data type of the stored values
+        """
+        self.nsteps = nsteps
+        self.directory = directory
+        self._data = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._error = None
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        if directory is None:
+            self._times = np.full(nsteps + 1, np.nan)
+        else:
+            self._times = np.lib.format.open_memmap(
+                self._get_filename("step_times", rank), mode="w+", dtype=float, shape=(nsteps + 1,)
+            )
+            self._times[:] = np.nan
+
+        for var in variables:
+            shape = (nsteps + 1,) + tuple(int(n) for n in np.atleast_1d(var.shape))
+            if directory is None:
+                self._data[var.name] = np.zeros(shape, dtype=dtype)
+            else:
+                self._data[var.name] = np.lib.format.open_memmap(
+                    self._get_filename(var.name, rank), mode="w+", dtype=dtype, shape=shape
+                )
+
+        self._queue = None
+        if directory is not None:
+            self._queue = queue.Queue(maxsize=max_queued_steps)
+            self._writer = threading.Thread(target=self._write_queued_values, daemon=True)
+            self._writer.start()
+
+    def _get_filename(self, name, rank):
+        safe_name = re.sub(r"[^\w\-]", "_", name)
+        return os.path.join(self.directory, f"{safe_name}_rank{rank}.npy")
+
+    def _write_queued_values(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                step, name, value = item
+                try:
+                    self._data[name][step] = value
+                except Exception as error:
+                    self._error = error
+                with self._lock:
+                    if self._pending.get((step, name)) is value:
+                        del self._pending[(step, name)]
+            finally:
+                self._queue.task_done()
+
+    def _check_writer(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise RuntimeError("Writing the step history failed") from error
+
+    @property
+    def variable_names(self):
+        return list(self._data.keys())
+
+    def write(self, step, name, value):
+        """
+        Store the value of a variable at a step. The value is copied, so the caller can reuse it
+
+        Parameters
+        ----------
+        step : int
+            Time step index
+        name : str
+            Name of the variable
+        value : numpy.ndarray
+            Value of the variable at the step
+        """
+        if self._queue is None:
+            self._data[name][step] = value
+            return
+
+        self._check_writer()
+        value = np.array(value, dtype=self._data[name].dtype).reshape(self._data[name].shape[1:])
+        with self._lock:
+            self._pending[(step, name)] = value
+        self._queue.put((step, name, value))
+
+    def write_time(self, step, time):
+        """
+        Store the time stamp of a step
+        """
+        self._times[step] = time
+
+    def read_time(self, step):
+        """
+        Time stamp of a step, nan if it has not been written
+        """
+        return float(self._times[step])
+
+    def read(self, step, name):
+        """
+        Value of a variable at a step
+
+        Parameters
+        ----------
+        step : int
+            Time step index
+        name : str
+            Name of the variable
+
+        Returns
+        -------
+        value : numpy.ndarray
+            Copy of the stored value
+        """
+        with self._lock:
+            value = self._pending.get((step, name))
+        if value is not None:
+            return value.copy()
+        return np.array(self._data[name][step])
+
+    def flush(self):
+        """
+        Wait until all queued values are written and flush the files to disk
+        """
+        if self._queue is not None:
+            self._queue.join()
+            self._check_writer()
+            for data in self._data.values():
+                data.flush()
+            self._times.flush()
+
+    def close(self):
+        """
+        Write the queued values and stop the background writer
+        """
+        if self._queue is not None:
+            self.flush()
+            self._queue.put(None)
+            self._writer.join()
+            self._queue = None
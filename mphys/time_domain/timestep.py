@@ -65,11 +65,26 @@ class TimeStep(MphysGroup):
             ivc.add_output(var.name, shape=var.shape)
         self.add_subsystem("timestep_inputs", ivc, promotes=["*"])
 
-    def _add_ivc_with_time_information(self):
+    def _add_ivc_with_time_information(self, builders: list[TimeDomainBuilder]):
+        """
+        The step, its size and time, and the times of the backplanes, "time|t-{n}",
+        so subsystems can use variable step time derivative formulas
+        """
         ivc = om.IndepVarComp()
         ivc.add_output("step")
         ivc.add_output("dt")
         ivc.add_output("time")
+
+        number_of_backplanes = 0
+        for builder in builders:
+            for var in builder.get_time_derivative_variables(
+                self.options["scenario_name"]
+            ):
+                number_of_backplanes = max(
+                    number_of_backplanes, var.number_of_backplanes
+                )
+        for n in range(number_of_backplanes):
+            ivc.add_output(f"time|t-{n+1}")
         self.add_subsystem("time_information", ivc, promotes=["*"])
 
     def _add_ivc_with_state_backplanes(self, builders: list[TimeDomainBuilder]):
@@ -35,7 +35,7 @@ class TimeStepAeroStructural(TimeStep):
 
         self._add_ivc_with_mphys_inputs(builders, self.options["user_input_variables"])
         self._add_ivc_with_state_backplanes(builders)
-        self._add_ivc_with_time_information()
+        self._add_ivc_with_time_information(builders)
 
         self._mphys_add_pre_coupling_subsystem_from_builder("aero", aero_builder)
         self._mphys_add_pre_coupling_subsystem_from_builder("struct", struct_builder)
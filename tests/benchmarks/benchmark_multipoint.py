@@ -0,0 +1,232 @@
+"""
+Benchmarks of the MPhys core with the synthetic disciplines of the unit tests.
+
+Times the setup, configure, final_setup, run_model, and compute_totals phases of
+aerostructural Multipoint and MultipointParallel models for a range of scenario counts and
+interface sizes. The results are written to a json file which can be compared to a stored
+baseline to catch performance regressions.
+
+Examples::
+
+    python benchmark_multipoint.py --output results.json
+    python benchmark_multipoint.py --full --output results.json --baseline baseline.json
+    mpirun -np 4 python benchmark_multipoint.py --parallel --distributed --output results_np4.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import openmdao
+import openmdao.api as om
+from mpi4py import MPI
+
+from mphys import Multipoint, MultipointParallel
+from mphys.scenario_aerostructural import ScenarioAeroStructural
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'unit_tests'))
+from fake_aero import AeroBuilder
+from fake_struct import StructBuilder
+from fake_ldxfer import LDXferBuilder
+
+PHASES = ['setup', 'configure', 'final_setup', 'run_model', 'compute_totals']
+
+
+def get_builders(interface_dofs, distributed, compute_cost):
+    num_nodes = max(interface_dofs // 3, 1)
+    aero_builder = AeroBuilder(num_nodes=num_nodes, distributed=distributed, compute_cost=compute_cost)
+    struct_builder = StructBuilder(num_nodes=num_nodes, distributed=distributed, compute_cost=compute_cost)
+    ldxfer_builder = LDXferBuilder(aero_builder, struct_builder, distributed=distributed,
+                                   compute_cost=compute_cost)
+    return aero_builder, struct_builder, ldxfer_builder
+
+
+class SerialModel(om.Group):
+    def initialize(self):
+        self.options.declare('num_scenarios')
+        self.options.declare('builders')
+
+    def setup(self):
+        aero_builder, struct_builder, ldxfer_builder = self.options['builders']
+        for builder in self.options['builders']:
+            builder.initialize(self.comm)
+
+        mp = self.add_subsystem('mp', Multipoint())
+        mp.add_subsystem('aero_mesh', aero_builder.get_mesh_coordinate_subsystem())
+        mp.add_subsystem('struct_mesh', struct_builder.get_mesh_coordinate_subsystem())
+        for i in range(self.options['num_scenarios']):
+            name = f'scenario{i}'
+            scenario = ScenarioAeroStructural(aero_builder=aero_builder,
+                                              struct_builder=struct_builder,
+                                              ldxfer_builder=ldxfer_builder)
+            mp.mphys_add_scenario(name, scenario,
+                                  om.NonlinearBlockGS(maxiter=5, iprint=-1, use_aitken=True),
+                                  om.LinearBlockGS(maxiter=5, iprint=-1))
+            mp.mphys_connect_scenario_coordinate_source('aero_mesh', name, 'aero')
+            mp.mphys_connect_scenario_coordinate_source('struct_mesh', name, 'struct')
+
+
+class ParallelModel(om.Group):
+    def initialize(self):
+        self.options.declare('num_scenarios')
+        self.options.declare('builders')
+
+    def setup(self):
+        aero_builder, struct_builder, ldxfer_builder = self.options['builders']
+
+        mp = self.add_subsystem('mp', MultipointParallel())
+        for i in range(self.options['num_scenarios']):
+            scenario = ScenarioAeroStructural(aero_builder=aero_builder,
+                                              struct_builder=struct_builder,
+                                              ldxfer_builder=ldxfer_builder,
+                                              in_MultipointParallel=True)
+            mp.mphys_add_scenario(f'scenario{i}', scenario,
+                                  om.NonlinearBlockGS(maxiter=5, iprint=-1, use_aitken=True),
+                                  om.LinearBlockGS(maxiter=5, iprint=-1))
+
+
+def _timed(comm, function, *args, **kwargs):
+    comm.Barrier()
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    comm.Barrier()
+    return time.perf_counter() - start
+
+
+def run_case(comm, parallel, num_scenarios, interface_dofs, distributed, compute_cost):
+    builders = get_builders(interface_dofs, distributed, compute_cost)
+    model_class = ParallelModel if parallel else SerialModel
+    prob = om.Problem(model_class(num_scenarios=num_scenarios, builders=builders), comm=comm, reports=False)
+
+    # configure runs recursively inside setup, so time it separately
+    configure_time = [0.0]
+    configure = prob.model._configure
+
+    def timed_configure(*args, **kwargs):
+        start = time.perf_counter()
+        result = configure(*args, **kwargs)
+        configure_time[0] += time.perf_counter() - start
+        return result
+
+    prob.model._configure = timed_configure
+
+    timings = {}
+    timings['setup'] = _timed(comm, prob.setup, mode='rev')
+    timings['configure'] = configure_time[0]
+    timings['setup'] -= configure_time[0]
+    timings['final_setup'] = _timed(comm, prob.final_setup)
+    timings['run_model'] = _timed(comm, prob.run_model)
+
+    of = [f'mp.scenario{i}.func_aero' for i in range(num_scenarios)]
+    of += [f'mp.scenario{i}.func_struct' for i in range(num_scenarios)]
+    if parallel:
+        wrt = [f'mp.scenario{i}.aero_mesh.x_aero0' for i in range(num_scenarios)]
+    else:
+        wrt = ['mp.aero_mesh.x_aero0']
+    timings['compute_totals'] = _timed(comm, prob.compute_totals, of=of, wrt=wrt)
+
+    timings = {phase: comm.allreduce(value, op=MPI.MAX) for phase, value in timings.items()}
+    return timings
+
+
+def get_case_key(case):
+    return (case['multipoint'], case['num_scenarios'], case['interface_dofs'], case['distributed'],
+            case['compute_cost'], case['nprocs'])
+
+
+def compare_to_baseline(results, baseline, tolerance, min_time):
+    """
+    Returns a list of messages for the case phases that are slower than the baseline
+    by more than the relative tolerance and the absolute minimum time
+    """
+    baseline_cases = {get_case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        reference = baseline_cases.get(get_case_key(case))
+        if reference is None:
+            continue
+        for phase in PHASES:
+            current = case['timings'][phase]
+            previous = reference['timings'][phase]
+            if current > previous * (1.0 + tolerance) and current - previous > min_time:
+                regressions.append(f'{get_case_key(case)} {phase}: {current:.4f} s, baseline {previous:.4f} s')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[1, 10],
+                        help='Numbers of scenarios to benchmark')
+    parser.add_argument('--dofs', type=float, nargs='+', default=[1e3, 1e5],
+                        help='Numbers of interface degrees of freedom to benchmark')
+    parser.add_argument('--full', action='store_true',
+                        help='Run the full sweep of 1-100 scenarios and 1e3-1e7 interface dofs')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Use MultipointParallel instead of Multipoint')
+    parser.add_argument('--distributed', action='store_true',
+                        help='Distribute the synthetic disciplines over the ranks of each scenario')
+    parser.add_argument('--compute-cost', type=float, default=0.0,
+                        help='Seconds each synthetic solver component waits per compute')
+    parser.add_argument('--output', default=None, help='json file to write the results to')
+    parser.add_argument('--baseline', default=None, help='json file of results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Relative slow down compared to the baseline that is reported as a regression')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='Absolute slow down in seconds below which differences are ignored')
+    args = parser.parse_args()
+
+    if args.full:
+        args.scenarios = [1, 10, 100]
+        args.dofs = [1e3, 1e5, 1e7]
+
+    comm = MPI.COMM_WORLD
+    results = {
+        'metadata': {
+            'python': platform.python_version(),
+            'openmdao': openmdao.__version__,
+            'machine': platform.node(),
+            'nprocs': comm.size,
+        },
+        'cases': [],
+    }
+
+    multipoint = 'MultipointParallel' if args.parallel else 'Multipoint'
+    for num_scenarios in args.scenarios:
+        for dofs in args.dofs:
+            interface_dofs = int(dofs)
+            timings = run_case(comm, args.parallel, num_scenarios, interface_dofs,
+                               args.distributed, args.compute_cost)
+            case = {
+                'multipoint': multipoint,
+                'num_scenarios': num_scenarios,
+                'interface_dofs': interface_dofs,
+                'distributed': args.distributed,
+                'compute_cost': args.compute_cost,
+                'nprocs': comm.size,
+                'timings': timings,
+            }
+            results['cases'].append(case)
+            if comm.rank == 0:
+                print(f'{multipoint:<18} scenarios={num_scenarios:<4d} dofs={interface_dofs:<9d} ' +
+                      ' '.join(f'{phase}={timings[phase]:.4f}' for phase in PHASES), flush=True)
+
+    if comm.rank == 0 and args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_time)
+        if regressions:
+            if comm.rank == 0:
+                print('Performance regressions compared to the baseline:')
+                for regression in regressions:
+                    print(f'  {regression}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,10 @@
+"""
+Synthetic aerodynamic discipline. The defaults are a 3 node serial discipline for the unit tests.
+The number of nodes, distributed layout, and compute cost are configurable through
+the AeroBuilder so the same components can be used for benchmarks.
+"""
+import time
+
 import numpy as np
 import openmdao.api as om
 from mphys import Builder
@@ -5,58 +12,153 @@ from mphys import Builder
 aero_num_nodes = 3
 
 class AeroMeshComp(om.IndepVarComp):
+    def initialize(self):
+        self.options.declare('num_nodes', default=aero_num_nodes)
+        self.options.declare('distributed', default=False)
+
     def setup(self):
-        self.add_output('x_aero0', val=np.ones(aero_num_nodes*3), tags=['mphys_coordinates'])
+        size = 3 * self.options['num_nodes']
+        self.add_output('x_aero0', val=np.ones(size), distributed=self.options['distributed'],
+                        tags=['mphys_coordinates'])
 
 
 class AeroPreCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
+
     def setup(self):
-        self.add_input('x_aero', shape_by_conn=True, tags=['mphys_coordinates'])
+        # derivatives of serial outputs wrt distributed inputs are only supported
+        # through Jacobian-vector products
+        self.matrix_free = self.options['distributed']
+        self.add_input('x_aero', shape_by_conn=True, distributed=self.options['distributed'],
+                       tags=['mphys_coordinates'])
         self.add_output('prestate_aero', tags=['mphys_coupling'])
 
+    def setup_partials(self):
+        if not self.matrix_free:
+            self.declare_partials('prestate_aero', 'x_aero', val=1.0)
+
     def compute(self, inputs, outputs):
-        outputs['prestate_aero'] = np.sum(inputs['x_aero'])
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
+        local_sum = np.sum(inputs['x_aero'])
+        outputs['prestate_aero'] = self.comm.allreduce(local_sum) if self.options['distributed'] else local_sum
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if 'x_aero' not in d_inputs:
+            return
+        if mode == 'fwd':
+            d_outputs['prestate_aero'] += self.comm.allreduce(np.sum(d_inputs['x_aero']))
+        if mode == 'rev':
+            # the seeds of serial outputs are split over the ranks in reverse mode
+            d_inputs['x_aero'] += self.comm.allreduce(d_outputs['prestate_aero'])
 
 
 class AeroCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('num_nodes', default=aero_num_nodes)
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
+
     def setup(self):
-        self.add_input('x_aero', shape_by_conn=True, tags=['mphys_coordinates'])
+        size = 3 * self.options['num_nodes']
+        self.add_input('x_aero', shape_by_conn=True, distributed=self.options['distributed'],
+                       tags=['mphys_coordinates'])
         self.add_input('prestate_aero', tags=['mphys_coupling'])
-        self.add_output('f_aero', shape=aero_num_nodes*3, tags=['mphys_coupling'])
+        self.add_output('f_aero', shape=size, distributed=self.options['distributed'],
+                        tags=['mphys_coupling'])
+
+    def setup_partials(self):
+        size = 3 * self.options['num_nodes']
+        diagonal = np.arange(size)
+        self.declare_partials('f_aero', 'x_aero', rows=diagonal, cols=diagonal, val=1.0)
+        self.declare_partials('f_aero', 'prestate_aero', rows=diagonal, cols=np.zeros(size, dtype=int), val=1.0)
 
     def compute(self, inputs, outputs):
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
         outputs['f_aero'] = inputs['x_aero'] + inputs['prestate_aero']
 
 
 class AeroPostCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('num_nodes', default=aero_num_nodes)
+        self.options.declare('distributed', default=False)
+
     def setup(self):
+        distributed = self.options['distributed']
+        self.matrix_free = distributed
         self.add_input('prestate_aero', tags=['mphys_coupling'])
-        self.add_input('x_aero', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('f_aero', shape_by_conn=True, tags=['mphys_coupling'])
+        self.add_input('x_aero', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('f_aero', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
         self.add_output('func_aero', val=1.0, tags=['mphys_result'])
 
+    def setup_partials(self):
+        size = 3 * self.options['num_nodes']
+        self.global_size = self.comm.allreduce(size) if self.options['distributed'] else size
+        if not self.matrix_free:
+            self.declare_partials('func_aero', ['x_aero', 'f_aero'], val=1.0)
+            self.declare_partials('func_aero', 'prestate_aero', val=float(self.global_size))
+
     def compute(self, inputs, outputs):
-        outputs['func_aero'] = np.sum(inputs['f_aero'] + inputs['prestate_aero'] + inputs['x_aero'])
+        local_sum = np.sum(inputs['f_aero'] + inputs['prestate_aero'] + inputs['x_aero'])
+        outputs['func_aero'] = self.comm.allreduce(local_sum) if self.options['distributed'] else local_sum
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if mode == 'fwd':
+            local_sum = sum(np.sum(d_inputs[name]) for name in ['x_aero', 'f_aero'] if name in d_inputs)
+            d_outputs['func_aero'] += self.comm.allreduce(local_sum)
+            if 'prestate_aero' in d_inputs:
+                d_outputs['func_aero'] += self.global_size * d_inputs['prestate_aero']
+        if mode == 'rev':
+            seed = self.comm.allreduce(d_outputs['func_aero'])
+            for name in ['x_aero', 'f_aero']:
+                if name in d_inputs:
+                    d_inputs[name] += seed
+            if 'prestate_aero' in d_inputs:
+                d_inputs['prestate_aero'] += self.global_size * d_outputs['func_aero']
+
 
 class AeroBuilder(Builder):
+    def __init__(self, num_nodes=aero_num_nodes, distributed=False, compute_cost=0.0):
+        """
+        Parameters
+        ----------
+        num_nodes : int
+            Global number of aerodynamic surface nodes
+        distributed : bool
+            If True, the nodes are split evenly over the ranks of the communicator
+            given to initialize and the variables are distributed
+        compute_cost : float
+            Seconds the coupling components wait in each compute to emulate a solver
+        """
+        self.num_nodes = num_nodes
+        self.distributed = distributed
+        self.compute_cost = compute_cost
+        self.local_num_nodes = num_nodes
+
+    def initialize(self, comm):
+        if self.distributed:
+            self.local_num_nodes = self.num_nodes // comm.size + (1 if comm.rank < self.num_nodes % comm.size else 0)
 
     def get_number_of_nodes(self):
-        return aero_num_nodes
+        return self.local_num_nodes
 
     def get_ndof(self):
         return 3
 
     def get_mesh_coordinate_subsystem(self, scenario_name=None):
-        return AeroMeshComp()
+        return AeroMeshComp(num_nodes=self.local_num_nodes, distributed=self.distributed)
 
     def get_pre_coupling_subsystem(self, scenario_name=None):
-        return AeroPreCouplingComp()
+        return AeroPreCouplingComp(distributed=self.distributed, compute_cost=self.compute_cost)
 
     def get_coupling_group_subsystem(self, scenario_name=None):
-        return AeroCouplingComp()
+        return AeroCouplingComp(num_nodes=self.local_num_nodes, distributed=self.distributed, compute_cost=self.compute_cost)
 
     def get_post_coupling_subsystem(self, scenario_name=None):
-        return AeroPostCouplingComp()
+        return AeroPostCouplingComp(num_nodes=self.local_num_nodes, distributed=self.distributed)
 
 
 if __name__ == '__main__':
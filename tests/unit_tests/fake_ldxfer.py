@@ -1,44 +1,128 @@
+"""
+Synthetic load and displacement transfer. Each aerodynamic node is attached to
+structural node (aero node index) % (number of structural nodes) on the same rank,
+which reduces to a copy when the disciplines have the same number of nodes.
+The displacement transfer can also output the deformed aerodynamic surface directly
+for coupling groups without a separate GeoDisp.
+"""
+import time
+
+import numpy as np
 import openmdao.api as om
 from mphys import Builder
 
+
+def get_transfer_indices(aero_num_nodes, struct_num_nodes, struct_ndof):
+    """
+    Returns the aerodynamic vector indices and the structural vector indices they are attached to
+    """
+    aero_node = np.arange(aero_num_nodes)
+    struct_node = aero_node % struct_num_nodes
+    aero_indices = (3 * aero_node[:, np.newaxis] + np.arange(3)).flatten()
+    struct_indices = (struct_ndof * struct_node[:, np.newaxis] + np.arange(3)).flatten()
+    return aero_indices, struct_indices
+
+
 class DispXferComp(om.ExplicitComponent):
     def initialize(self):
         self.options.declare('aero_num_nodes', default=3)
+        self.options.declare('struct_num_nodes', default=3)
+        self.options.declare('struct_ndof', default=3)
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
+        self.options.declare('output_x_aero', default=False,
+                             desc='If True, output the deformed surface x_aero instead of u_aero')
 
     def setup(self):
+        distributed = self.options['distributed']
         aero_num_nodes = self.options['aero_num_nodes']
-        self.add_input('x_struct0', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('x_aero0', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('u_struct', shape_by_conn=True, tags=['mphys_coupling'])
-        self.add_output('u_aero', shape=aero_num_nodes*3, tags=['mphys_coupling'])
+        self.output_name = 'x_aero' if self.options['output_x_aero'] else 'u_aero'
+        self.add_input('x_struct0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('x_aero0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('u_struct', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
+        self.add_output(self.output_name, shape=aero_num_nodes*3, distributed=distributed, tags=['mphys_coupling'])
+
+        self.aero_indices, self.struct_indices = get_transfer_indices(aero_num_nodes,
+                                                                      self.options['struct_num_nodes'],
+                                                                      self.options['struct_ndof'])
+
+    def setup_partials(self):
+        self.declare_partials(self.output_name, 'u_struct', rows=self.aero_indices, cols=self.struct_indices, val=1.0)
+        if self.options['output_x_aero']:
+            diagonal = np.arange(self.options['aero_num_nodes'] * 3)
+            self.declare_partials('x_aero', 'x_aero0', rows=diagonal, cols=diagonal, val=1.0)
 
     def compute(self, inputs, outputs):
-        outputs['u_aero'] = inputs['u_struct']
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
+        outputs[self.output_name][self.aero_indices] = inputs['u_struct'][self.struct_indices]
+        if self.options['output_x_aero']:
+            outputs['x_aero'] += inputs['x_aero0']
 
 
 class LoadXferComp(om.ExplicitComponent):
     def initialize(self):
+        self.options.declare('aero_num_nodes', default=3)
         self.options.declare('struct_num_nodes', default=3)
+        self.options.declare('struct_ndof', default=3)
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
 
     def setup(self):
+        distributed = self.options['distributed']
         struct_num_nodes = self.options['struct_num_nodes']
-        self.add_input('x_struct0', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('x_aero0', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('u_struct', shape_by_conn=True, tags=['mphys_coupling'])
-        self.add_input('f_aero', shape_by_conn=True, tags=['mphys_coupling'])
-        self.add_output('f_struct', shape=struct_num_nodes*3, tags=['mphys_coupling'])
+        struct_ndof = self.options['struct_ndof']
+        self.add_input('x_struct0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('x_aero0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('u_struct', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
+        self.add_input('f_aero', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
+        self.add_output('f_struct', shape=struct_num_nodes*struct_ndof, distributed=distributed,
+                        tags=['mphys_coupling'])
+
+        self.aero_indices, self.struct_indices = get_transfer_indices(self.options['aero_num_nodes'],
+                                                                      struct_num_nodes, struct_ndof)
+
+    def setup_partials(self):
+        self.declare_partials('f_struct', 'f_aero', rows=self.struct_indices, cols=self.aero_indices, val=1.0)
 
     def compute(self, inputs, outputs):
-        outputs['f_struct'] = inputs['f_aero']
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
+        outputs['f_struct'][:] = 0.0
+        np.add.at(outputs['f_struct'], self.struct_indices, inputs['f_aero'][self.aero_indices])
 
 
 class LDXferBuilder(Builder):
-    def __init__(self, aero_builder: Builder, struct_builder: Builder):
+    def __init__(self, aero_builder: Builder, struct_builder: Builder, distributed=False, compute_cost=0.0,
+                 output_x_aero=False):
+        """
+        Parameters
+        ----------
+        aero_builder : Builder
+            Builder of the synthetic aerodynamic discipline
+        struct_builder : Builder
+            Builder of the synthetic structural discipline
+        distributed : bool
+            If True, the transfer variables are distributed
+        compute_cost : float
+            Seconds the transfer components wait in each compute to emulate a transfer scheme
+        output_x_aero : bool
+            If True, the displacement transfer outputs the deformed surface x_aero for
+            coupling groups with a fused GeoDisp
+        """
         self.aero_builder = aero_builder
         self.struct_builder = struct_builder
+        self.distributed = distributed
+        self.compute_cost = compute_cost
+        self.output_x_aero = output_x_aero
 
     def get_coupling_group_subsystem(self, scenario_name=None):
         aero_num_nodes = self.aero_builder.get_number_of_nodes()
         struct_num_nodes = self.struct_builder.get_number_of_nodes()
-        return (DispXferComp(aero_num_nodes=aero_num_nodes),
-                LoadXferComp(struct_num_nodes=struct_num_nodes))
+        struct_ndof = self.struct_builder.get_ndof()
+        return (DispXferComp(aero_num_nodes=aero_num_nodes, struct_num_nodes=struct_num_nodes,
+                             struct_ndof=struct_ndof, distributed=self.distributed,
+                             compute_cost=self.compute_cost, output_x_aero=self.output_x_aero),
+                LoadXferComp(aero_num_nodes=aero_num_nodes, struct_num_nodes=struct_num_nodes,
+                             struct_ndof=struct_ndof, distributed=self.distributed,
+                             compute_cost=self.compute_cost))
@@ -1,3 +1,10 @@
+"""
+Synthetic structural discipline. The defaults are a 3 node serial discipline for the unit tests.
+The number of nodes, degrees of freedom per node, distributed layout, and compute cost
+are configurable through the StructBuilder so the same components can be used for benchmarks.
+"""
+import time
+
 import numpy as np
 import openmdao.api as om
 
@@ -6,57 +13,163 @@ from mphys import Builder
 struct_num_nodes = 3
 
 class StructMeshComp(om.IndepVarComp):
+    def initialize(self):
+        self.options.declare('num_nodes', default=struct_num_nodes)
+        self.options.declare('distributed', default=False)
+
     def setup(self):
-        self.add_output('x_struct0', val=np.ones(struct_num_nodes*3), tags=['mphys_coordinates'])
+        self.add_output('x_struct0', val=np.ones(self.options['num_nodes']*3),
+                        distributed=self.options['distributed'], tags=['mphys_coordinates'])
 
 
 class StructPreCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
+
     def setup(self):
-        self.add_input('x_struct0', shape_by_conn=True, tags=['mphys_coordinates'])
+        # derivatives of serial outputs wrt distributed inputs are only supported
+        # through Jacobian-vector products
+        self.matrix_free = self.options['distributed']
+        self.add_input('x_struct0', shape_by_conn=True, distributed=self.options['distributed'],
+                       tags=['mphys_coordinates'])
         self.add_output('prestate_struct', tags=['mphys_coupling'])
 
+    def setup_partials(self):
+        if not self.matrix_free:
+            self.declare_partials('prestate_struct', 'x_struct0', val=1.0)
+
     def compute(self, inputs, outputs):
-        outputs['prestate_struct'] = np.sum(inputs['x_struct0'])
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
+        local_sum = np.sum(inputs['x_struct0'])
+        outputs['prestate_struct'] = self.comm.allreduce(local_sum) if self.options['distributed'] else local_sum
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if 'x_struct0' not in d_inputs:
+            return
+        if mode == 'fwd':
+            d_outputs['prestate_struct'] += self.comm.allreduce(np.sum(d_inputs['x_struct0']))
+        if mode == 'rev':
+            # the seeds of serial outputs are split over the ranks in reverse mode
+            d_inputs['x_struct0'] += self.comm.allreduce(d_outputs['prestate_struct'])
 
 
 class StructCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('num_nodes', default=struct_num_nodes)
+        self.options.declare('ndof', default=3)
+        self.options.declare('distributed', default=False)
+        self.options.declare('compute_cost', default=0.0, desc='Seconds to wait in each compute')
+
     def setup(self):
-        self.add_input('x_struct0', shape_by_conn=True, tags=['mphys_coordinates'])
+        distributed = self.options['distributed']
+        size = self.options['num_nodes'] * self.options['ndof']
+        self.add_input('x_struct0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
         self.add_input('prestate_struct', tags=['mphys_coupling'])
-        self.add_input('f_struct', shape_by_conn=True, tags=['mphys_coupling'])
-        self.add_output('u_struct', shape=struct_num_nodes*3, tags=['mphys_coupling'])
+        self.add_input('f_struct', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
+        self.add_output('u_struct', shape=size, distributed=distributed, tags=['mphys_coupling'])
+
+    def setup_partials(self):
+        size = self.options['num_nodes'] * self.options['ndof']
+        rows = np.arange(size)
+        # the displacement dofs beyond the 3 coordinates per node are driven by the last coordinate
+        cols = 3 * (rows // self.options['ndof']) + np.minimum(rows % self.options['ndof'], 2)
+        self.declare_partials('u_struct', 'x_struct0', rows=rows, cols=cols, val=1.0)
+        self.declare_partials('u_struct', 'prestate_struct', rows=rows, cols=np.zeros(size, dtype=int), val=1.0)
 
     def compute(self, inputs, outputs):
-        outputs['u_struct'] = inputs['x_struct0'] + inputs['prestate_struct']
+        if self.options['compute_cost'] > 0.0:
+            time.sleep(self.options['compute_cost'])
+        x = inputs['x_struct0'].reshape(-1, 3)
+        ndof = self.options['ndof']
+        u = outputs['u_struct'].reshape(-1, ndof)
+        u[:, :min(ndof, 3)] = x[:, :min(ndof, 3)]
+        u[:, 3:] = x[:, 2:3]
+        u += inputs['prestate_struct']
 
 
 class StructPostCouplingComp(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('num_nodes', default=struct_num_nodes)
+        self.options.declare('ndof', default=3)
+        self.options.declare('distributed', default=False)
+
     def setup(self):
+        distributed = self.options['distributed']
+        self.matrix_free = distributed
         self.add_input('prestate_struct', tags=['mphys_coupling'])
-        self.add_input('x_struct0', shape_by_conn=True, tags=['mphys_coordinates'])
-        self.add_input('u_struct', shape_by_conn=True, tags=['mphys_coupling'])
+        self.add_input('x_struct0', shape_by_conn=True, distributed=distributed, tags=['mphys_coordinates'])
+        self.add_input('u_struct', shape_by_conn=True, distributed=distributed, tags=['mphys_coupling'])
         self.add_output('func_struct', val=1.0, tags=['mphys_result'])
 
+    def setup_partials(self):
+        size = self.options['num_nodes'] * self.options['ndof']
+        self.global_size = self.comm.allreduce(size) if self.options['distributed'] else size
+        if not self.matrix_free:
+            self.declare_partials('func_struct', ['x_struct0', 'u_struct'], val=1.0)
+            self.declare_partials('func_struct', 'prestate_struct', val=float(self.global_size))
+
     def compute(self, inputs, outputs):
-        outputs['func_struct'] = np.sum(
-            inputs['u_struct'] + inputs['prestate_struct'] + inputs['x_struct0'])
+        local_sum = np.sum(inputs['u_struct'] + inputs['prestate_struct']) + np.sum(inputs['x_struct0'])
+        outputs['func_struct'] = self.comm.allreduce(local_sum) if self.options['distributed'] else local_sum
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if mode == 'fwd':
+            local_sum = sum(np.sum(d_inputs[name]) for name in ['x_struct0', 'u_struct'] if name in d_inputs)
+            d_outputs['func_struct'] += self.comm.allreduce(local_sum)
+            if 'prestate_struct' in d_inputs:
+                d_outputs['func_struct'] += self.global_size * d_inputs['prestate_struct']
+        if mode == 'rev':
+            seed = self.comm.allreduce(d_outputs['func_struct'])
+            for name in ['x_struct0', 'u_struct']:
+                if name in d_inputs:
+                    d_inputs[name] += seed
+            if 'prestate_struct' in d_inputs:
+                d_inputs['prestate_struct'] += self.global_size * d_outputs['func_struct']
 
 
 class StructBuilder(Builder):
+    def __init__(self, num_nodes=struct_num_nodes, ndof=3, distributed=False, compute_cost=0.0):
+        """
+        Parameters
+        ----------
+        num_nodes : int
+            Global number of structural nodes
+        ndof : int
+            Degrees of freedom per node, at least 3
+        distributed : bool
+            If True, the nodes are split evenly over the ranks of the communicator
+            given to initialize and the variables are distributed
+        compute_cost : float
+            Seconds the coupling components wait in each compute to emulate a solver
+        """
+        self.num_nodes = num_nodes
+        self.ndof = ndof
+        self.distributed = distributed
+        self.compute_cost = compute_cost
+        self.local_num_nodes = num_nodes
+
+    def initialize(self, comm):
+        if self.distributed:
+            self.local_num_nodes = self.num_nodes // comm.size + (1 if comm.rank < self.num_nodes % comm.size else 0)
+
     def get_number_of_nodes(self):
-        return struct_num_nodes
+        return self.local_num_nodes
 
     def get_ndof(self):
-        return 3
+        return self.ndof
 
     def get_mesh_coordinate_subsystem(self, scenario_name=None):
-        return StructMeshComp()
+        return StructMeshComp(num_nodes=self.local_num_nodes, distributed=self.distributed)
 
     def get_pre_coupling_subsystem(self, scenario_name=None):
-        return StructPreCouplingComp()
+        return StructPreCouplingComp(distributed=self.distributed, compute_cost=self.compute_cost)
 
     def get_coupling_group_subsystem(self, scenario_name=None):
-        return StructCouplingComp()
+        return StructCouplingComp(num_nodes=self.local_num_nodes, ndof=self.ndof,
+                                  distributed=self.distributed, compute_cost=self.compute_cost)
 
     def get_post_coupling_subsystem(self, scenario_name=None):
-        return StructPostCouplingComp()
+        return StructPostCouplingComp(num_nodes=self.local_num_nodes, ndof=self.ndof,
+                                      distributed=self.distributed)
@@ -0,0 +1,207 @@
+"""
+Synthetic time domain discipline for the unit tests of the time integrators: modal oscillators
+
+m u'' + c u' + k u = amplitude * sin(freq * time) - coupling * u
+
+whose force is computed by a separate component of the coupling group, so the step problems
+have a coupling iteration. The time derivatives are variable step BDF2 formulas of the times
+of the step and its backplanes.
+"""
+import numpy as np
+import openmdao.api as om
+
+from mphys.coupling_group import CouplingGroup
+from mphys.time_domain.bdf import get_bdf_coefficients
+from mphys.time_domain.integrator import Integrator
+from mphys.time_domain.harmonic_balance import HarmonicBalanceIntegrator
+from mphys.time_domain.time_domain_builder import TimeDomainBuilder
+from mphys.time_domain.time_domain_variables import TimeDerivativeVariable, TimeDomainInput
+from mphys.time_domain.timestep import TimeStep
+
+number_of_backplanes = 4
+
+
+class OscillatorForce(om.ExplicitComponent):
+    def initialize(self):
+        self.options.declare('nmodes', default=2)
+        self.options.declare('coupling', default=0.1)
+
+    def setup(self):
+        nmodes = self.options['nmodes']
+        self.add_input('amplitude', tags=['mphys_input'])
+        self.add_input('freq', tags=['mphys_input'])
+        self.add_input('time', tags=['mphys_input'])
+        self.add_input('u', shape=nmodes, tags=['mphys_coupling'])
+        self.add_output('f', shape=nmodes, tags=['mphys_coupling'])
+
+    def setup_partials(self):
+        diagonal = np.arange(self.options['nmodes'])
+        self.declare_partials('f', ['amplitude', 'freq'])
+        self.declare_partials('f', 'u', rows=diagonal, cols=diagonal, val=-self.options['coupling'])
+
+    def compute(self, inputs, outputs):
+        outputs['f'] = inputs['amplitude'] * np.sin(inputs['freq'] * inputs['time']) - self.options['coupling'] * inputs['u']
+
+    def compute_partials(self, inputs, partials):
+        phase = inputs['freq'] * inputs['time']
+        partials['f', 'amplitude'] = np.sin(phase)
+        partials['f', 'freq'] = inputs['amplitude'] * inputs['time'] * np.cos(phase)
+
+
+class OscillatorStep(om.ImplicitComponent):
+    def initialize(self):
+        self.options.declare('nmodes', default=2)
+
+    def setup(self):
+        nmodes = self.options['nmodes']
+        self.add_input('time', tags=['mphys_input'])
+        for backplane in range(1, number_of_backplanes + 1):
+            self.add_input(f'time|t-{backplane}', tags=['mphys_input'])
+            self.add_input(f'u|t-{backplane}', shape=nmodes, tags=['mphys_time_derivative'])
+        for name in ['m', 'c', 'k']:
+            self.add_input(name, shape=nmodes, tags=['mphys_input'])
+        self.add_input('f', shape=nmodes, tags=['mphys_coupling'])
+        self.add_output('u', shape=nmodes, tags=['mphys_coupling'])
+
+    def setup_partials(self):
+        diagonal = np.arange(self.options['nmodes'])
+        wrt = ['u', 'm', 'c', 'k'] + [f'u|t-{backplane}' for backplane in range(1, number_of_backplanes + 1)]
+        self.declare_partials('u', wrt, rows=diagonal, cols=diagonal)
+        self.declare_partials('u', 'f', rows=diagonal, cols=diagonal, val=-1.0)
+
+    def _set_bdf_coefficients(self, inputs):
+        # the acceleration is the BDF2 derivative of the BDF2 velocities of steps n, n-1 and n-2
+        times = np.concatenate([inputs['time']] +
+                               [inputs[f'time|t-{backplane}'] for backplane in range(1, number_of_backplanes + 1)])
+        self.alpha = np.zeros(number_of_backplanes + 1)
+        self.alpha[:3] = get_bdf_coefficients(times[:3])
+        self.beta = np.zeros(number_of_backplanes + 1)
+        for i in range(3):
+            self.beta[i:i + 3] += self.alpha[i] * get_bdf_coefficients(times[i:i + 3])
+
+    def _get_values(self, inputs, outputs):
+        return [outputs['u']] + [inputs[f'u|t-{backplane}'] for backplane in range(1, number_of_backplanes + 1)]
+
+    def apply_nonlinear(self, inputs, outputs, residuals):
+        self._set_bdf_coefficients(inputs)
+        values = self._get_values(inputs, outputs)
+        accel = sum(beta * value for beta, value in zip(self.beta, values))
+        vel = sum(alpha * value for alpha, value in zip(self.alpha, values))
+        residuals['u'] = inputs['m'] * accel + inputs['c'] * vel + inputs['k'] * outputs['u'] - inputs['f']
+
+    def solve_nonlinear(self, inputs, outputs):
+        self._set_bdf_coefficients(inputs)
+        values = self._get_values(inputs, outputs)
+        m, c, k = inputs['m'], inputs['c'], inputs['k']
+        rhs = inputs['f'] - sum(self.beta[j] * m * values[j] + self.alpha[j] * c * values[j]
+                                for j in range(1, number_of_backplanes + 1))
+        outputs['u'] = rhs / (self.beta[0] * m + self.alpha[0] * c + k)
+
+    def linearize(self, inputs, outputs, partials):
+        self._set_bdf_coefficients(inputs)
+        values = self._get_values(inputs, outputs)
+        m, c, k = inputs['m'], inputs['c'], inputs['k']
+        self.diagonal = self.beta[0] * m + self.alpha[0] * c + k
+
+        partials['u', 'u'] = self.diagonal
+        partials['u', 'm'] = sum(beta * value for beta, value in zip(self.beta, values))
+        partials['u', 'c'] = sum(alpha * value for alpha, value in zip(self.alpha, values))
+        partials['u', 'k'] = outputs['u']
+        for backplane in range(1, number_of_backplanes + 1):
+            partials['u', f'u|t-{backplane}'] = self.beta[backplane] * m + self.alpha[backplane] * c
+
+    def solve_linear(self, d_outputs, d_residuals, mode):
+        if mode == 'fwd':
+            d_outputs['u'] = d_residuals['u'] / self.diagonal
+        if mode == 'rev':
+            d_residuals['u'] = d_outputs['u'] / self.diagonal
+
+
+class OscillatorCoupling(CouplingGroup):
+    def initialize(self):
+        self.options.declare('nmodes', default=2)
+        self.options.declare('coupling', default=0.1)
+
+    def setup(self):
+        nmodes = self.options['nmodes']
+        self.mphys_add_subsystem('force', OscillatorForce(nmodes=nmodes, coupling=self.options['coupling']))
+        self.mphys_add_subsystem('step', OscillatorStep(nmodes=nmodes))
+        self.nonlinear_solver = om.NonlinearBlockGS(maxiter=100, atol=1e-14, rtol=1e-14, iprint=-1)
+        self.linear_solver = om.LinearBlockGS(maxiter=100, atol=1e-14, rtol=1e-14, iprint=-1)
+
+
+class OscillatorBuilder(TimeDomainBuilder):
+    def __init__(self, nmodes=2, coupling=0.1):
+        self.nmodes = nmodes
+        self.coupling = coupling
+
+    def get_coupling_group_subsystem(self, scenario_name=None):
+        return OscillatorCoupling(nmodes=self.nmodes, coupling=self.coupling)
+
+    def get_time_derivative_variables(self, scenario_name=None):
+        return [TimeDerivativeVariable('u', number_of_backplanes, (self.nmodes,))]
+
+    def get_timestep_input_variables(self, scenario_name=None):
+        return [TimeDomainInput('amplitude', (1,)),
+                TimeDomainInput('freq', (1,)),
+                TimeDomainInput('m', (self.nmodes,)),
+                TimeDomainInput('c', (self.nmodes,)),
+                TimeDomainInput('k', (self.nmodes,))]
+
+
+class TimeStepOscillator(TimeStep):
+    def initialize(self):
+        super().initialize()
+        self.options.declare('builder', recordable=False)
+
+    def _mphys_timestep_setup(self):
+        builders = [self.options['builder']]
+        self._add_ivc_with_mphys_inputs(builders, self.options['user_input_variables'])
+        self._add_ivc_with_state_backplanes(builders)
+        self._add_ivc_with_time_information(builders)
+        self.mphys_add_subsystem('coupling', self.options['builder'].get_coupling_group_subsystem(self.name))
+
+
+class IntegratorOscillator(Integrator):
+    def initialize(self):
+        self.options.declare('builder', recordable=False)
+        super().initialize()
+
+    def _get_timestep_group(self):
+        return TimeStepOscillator(builder=self.options['builder'],
+                                  nonlinear_solver=self.options['nonlinear_solver'],
+                                  linear_solver=self.options['linear_solver'])
+
+    def _get_builder_list(self):
+        return [self.options['builder']]
+
+
+class HarmonicBalanceOscillator(HarmonicBalanceIntegrator, IntegratorOscillator):
+    pass
+
+
+class OscillatorModel(om.Group):
+    """
+    Integration of the oscillators from the input values of the options
+    """
+    def initialize(self):
+        self.options.declare('integrator_class', default=IntegratorOscillator)
+        self.options.declare('integrator_options', default={})
+        self.options.declare('coupling', default=0.1)
+        self.options.declare('amplitude', default=1.0)
+        self.options.declare('freq', default=0.5)
+        self.options.declare('m', default=[1.0, 1.0])
+        self.options.declare('c', default=[0.3, 0.4])
+        self.options.declare('k', default=[1.0, 1.5])
+        self.options.declare('u0', default=[1.0, 2.0])
+
+    def setup(self):
+        dvs = self.add_subsystem('dvs', om.IndepVarComp(), promotes=['*'])
+        for name in ['amplitude', 'freq', 'm', 'c', 'k']:
+            dvs.add_output(name, self.options[name])
+        dvs.add_output('u|0', self.options['u0'])
+
+        builder = OscillatorBuilder(nmodes=len(self.options['m']), coupling=self.options['coupling'])
+        self.add_subsystem('integrator',
+                           self.options['integrator_class'](builder=builder, **self.options['integrator_options']),
+                           promotes=['*'])
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from mpi4py import MPI
+
+from mphys import ArtifactCache, Builder, hash_content
+
+
+class CachingBuilder(Builder):
+    def __init__(self, mesh_file, artifact_cache):
+        self.mesh_file = mesh_file
+        self.artifact_cache = artifact_cache
+        self.number_of_reads = 0
+
+    def initialize(self, comm):
+        key = hash_content(self.mesh_file)
+        mesh = self.get_cached_artifact('mesh', key, self._read_mesh, comm)
+        self.x0 = mesh['x0']
+
+    def _read_mesh(self):
+        self.number_of_reads += 1
+        return {'x0': np.loadtxt(self.mesh_file).flatten()}
+
+
+class TestArtifactCache(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.mesh_file = os.path.join(self.tmpdir.name, 'mesh.dat')
+        np.savetxt(self.mesh_file, np.arange(12, dtype=float).reshape(4, 3))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hash_content_uses_file_contents(self):
+        key = hash_content(self.mesh_file, 3)
+        self.assertEqual(key, hash_content(self.mesh_file, 3))
+        self.assertNotEqual(key, hash_content(self.mesh_file, 4))
+
+        np.savetxt(self.mesh_file, np.zeros((4, 3)))
+        self.assertNotEqual(key, hash_content(self.mesh_file, 3))
+
+    def test_in_memory_cache_computes_once(self):
+        builder = CachingBuilder(self.mesh_file, ArtifactCache())
+        for _ in range(3):
+            builder.initialize(MPI.COMM_WORLD)
+        self.assertEqual(builder.number_of_reads, 1)
+        self.assertFalse(builder.x0.flags.writeable)
+        np.testing.assert_array_equal(builder.x0, np.arange(12, dtype=float))
+
+    def test_memory_mapped_cache_is_shared_between_caches(self):
+        cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        os.makedirs(cache_dir)
+
+        builder1 = CachingBuilder(self.mesh_file, ArtifactCache(cache_dir))
+        builder1.initialize(MPI.COMM_WORLD)
+        builder2 = CachingBuilder(self.mesh_file, ArtifactCache(cache_dir))
+        builder2.initialize(MPI.COMM_WORLD)
+
+        self.assertEqual(builder1.number_of_reads, 1)
+        self.assertEqual(builder2.number_of_reads, 0)
+        self.assertIsInstance(builder2.x0, np.memmap)
+        self.assertFalse(builder2.x0.flags.writeable)
+        np.testing.assert_array_equal(builder2.x0, np.arange(12, dtype=float))
+
+    def test_failed_compute_is_not_cached(self):
+        def fail():
+            raise ValueError('mesh file is corrupt')
+
+        cache = ArtifactCache(os.path.join(self.tmpdir.name, 'cache'))
+        os.makedirs(cache.directory)
+        with self.assertRaises(ValueError):
+            cache.fetch('mesh', 'key', fail, MPI.COMM_WORLD)
+        self.assertEqual(os.listdir(cache.directory), [])
+
+        artifact = cache.fetch('mesh', 'key', lambda: {'x0': np.ones(3)}, MPI.COMM_WORLD)
+        np.testing.assert_array_equal(artifact['x0'], np.ones(3))
+
+    def test_changed_file_is_recomputed(self):
+        builder = CachingBuilder(self.mesh_file, ArtifactCache())
+        builder.initialize(MPI.COMM_WORLD)
+        np.savetxt(self.mesh_file, np.ones((4, 3)))
+        builder.initialize(MPI.COMM_WORLD)
+        self.assertEqual(builder.number_of_reads, 2)
+        np.testing.assert_array_equal(builder.x0, np.ones(12))
+
+
+if __name__ == '__main__':
+    unittest.main()
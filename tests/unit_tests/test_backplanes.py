@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from mphys.time_domain.backplanes import BackplaneRing
+
+
+class TestBackplaneRing(unittest.TestCase):
+    N_PROCS = 1
+
+    def test_fill(self):
+        ring = BackplaneRing(3, (2,))
+        ring.fill([1.0, 2.0])
+        for backplane in range(3):
+            np.testing.assert_array_equal(ring[backplane], [1.0, 2.0])
+
+    def test_push_shifts_backplanes(self):
+        ring = BackplaneRing(3, (2,))
+        ring.fill([0.0, 0.0])
+        for step in range(1, 6):
+            ring.push([step, -step])
+            # backplane j is the solution of j steps before the newest one, or the initial value
+            for backplane in range(3):
+                value = max(step - backplane, 0)
+                np.testing.assert_array_equal(ring[backplane], [value, -value])
+            np.testing.assert_array_equal(ring.get_ordered()[:, 0],
+                                          [max(step - backplane, 0) for backplane in range(3)])
+
+    def test_push_does_not_move_older_solutions(self):
+        ring = BackplaneRing(3, (2,))
+        ring.push([1.0, 1.0])
+        data = ring.data
+        ring.push([2.0, 2.0])
+        self.assertIs(ring.data, data)
+        np.testing.assert_array_equal(ring[1], [1.0, 1.0])
+
+    def test_pushed_value_is_copied(self):
+        ring = BackplaneRing(2, (2,))
+        value = np.array([1.0, 2.0])
+        ring.push(value)
+        value[:] = 0.0
+        np.testing.assert_array_equal(ring[0], [1.0, 2.0])
+
+    def test_set_ordered(self):
+        ring = BackplaneRing(3, (1,))
+        for step in range(4):
+            ring.push([step])
+        ordered = ring.get_ordered()
+
+        other = BackplaneRing(3, (1,))
+        other.set_ordered(ordered)
+        np.testing.assert_array_equal(other.get_ordered(), ordered)
+        for backplane in range(3):
+            np.testing.assert_array_equal(other[backplane], ring[backplane])
+
+    def test_copy_and_set(self):
+        ring = BackplaneRing(3, (1,))
+        for step in range(5):
+            ring.push([step])
+        copy = ring.copy()
+        ring.push([5])
+        np.testing.assert_array_equal(copy.get_ordered()[:, 0], [4, 3, 2])
+
+        ring.set(copy)
+        np.testing.assert_array_equal(ring.get_ordered()[:, 0], [4, 3, 2])
+        copy.push([6])
+        np.testing.assert_array_equal(ring.get_ordered()[:, 0], [4, 3, 2])
+
+    def test_no_backplanes(self):
+        # variables without backplanes still keep their newest solution
+        ring = BackplaneRing(0, (2,))
+        self.assertEqual(ring.size, 1)
+        ring.push([1.0, 2.0])
+        np.testing.assert_array_equal(ring[0], [1.0, 2.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from math import factorial
+
+import numpy as np
+
+from mphys.time_domain.bdf import (estimate_local_truncation_error, get_bdf_coefficients,
+                                   get_bdf_error_constant, get_divided_difference)
+
+
+class TestBdf(unittest.TestCase):
+    N_PROCS = 1
+
+    def test_constant_step_coefficients(self):
+        dt = 0.1
+        np.testing.assert_allclose(get_bdf_coefficients([0.0, -dt]), [1.0 / dt, -1.0 / dt])
+        np.testing.assert_allclose(get_bdf_coefficients([0.0, -dt, -2.0 * dt]),
+                                   np.array([1.5, -2.0, 0.5]) / dt)
+
+    def test_variable_step_coefficients_are_exact_for_polynomials(self):
+        times = np.array([1.0, 0.7, 0.55, 0.1])
+        alpha = get_bdf_coefficients(times)
+        for degree in range(len(times)):
+            derivative = degree * times[0] ** (degree - 1) if degree > 0 else 0.0
+            self.assertAlmostEqual(np.dot(alpha, times ** degree), derivative, places=10)
+
+    def test_error_constants(self):
+        self.assertAlmostEqual(get_bdf_error_constant(1), 1.0 / 2.0)
+        self.assertAlmostEqual(get_bdf_error_constant(2), 2.0 / 9.0)
+        self.assertAlmostEqual(get_bdf_error_constant(3), 3.0 / 22.0)
+
+    def test_divided_difference(self):
+        # the divided difference of order k of a polynomial of degree k is its leading coefficient
+        times = np.array([0.3, -0.2, 0.5, 1.1])
+        values = [2.0 * t ** 3 - t + 4.0 for t in times]
+        self.assertAlmostEqual(get_divided_difference(values, times), 2.0)
+        self.assertAlmostEqual(get_divided_difference(values[:3], times[:3]), 2.0 * np.sum(times[:3]))
+
+    def test_local_truncation_error(self):
+        # the estimate is the error of the BDF value of u = t^(order+1) for constant steps
+        dt = 0.1
+        for order in [1, 2, 3]:
+            times = -dt * np.arange(order + 2)
+            values = [np.array([t ** (order + 1)]) for t in times]
+            estimate = estimate_local_truncation_error(values, times, order)
+
+            # solve the BDF formula for the newest value with the exact derivative at t = 0
+            alpha = get_bdf_coefficients(times[:order + 1])
+            exact_derivative = 0.0
+            bdf_value = (exact_derivative - np.dot(alpha[1:], [v[0] for v in values[1:order + 1]])) / alpha[0]
+            np.testing.assert_allclose(np.abs(estimate), np.abs(bdf_value - values[0]), rtol=1e-10)
+            np.testing.assert_allclose(np.abs(estimate),
+                                       get_bdf_error_constant(order) * dt ** (order + 1) * factorial(order + 1),
+                                       rtol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
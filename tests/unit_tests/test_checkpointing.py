@@ -0,0 +1,108 @@
+import unittest
+from math import comb
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_near_equal
+
+from mphys.time_domain.checkpointing import get_checkpoint_schedule, get_number_of_reversible_steps
+from fake_time_domain import OscillatorModel
+
+
+def run_schedule(nsteps, checkpoints):
+    """
+    Follow the actions of a schedule. Returns the reversed steps and the number of advanced steps
+    """
+    stored = {0}
+    current = None
+    reversed_steps = []
+    advanced_steps = 0
+    for action in get_checkpoint_schedule(nsteps, checkpoints):
+        if action[0] == 'restore':
+            assert action[1] in stored or checkpoints is None
+            current = action[1]
+        elif action[0] == 'advance':
+            assert action[1] == current
+            advanced_steps += action[2] - action[1]
+            current = action[2]
+        elif action[0] == 'store':
+            assert action[1] == current
+            stored.add(action[1])
+            assert len(stored) - 1 <= checkpoints
+        elif action[0] == 'free':
+            stored.remove(action[1])
+        elif action[0] == 'reverse':
+            assert action[1] == current + 1
+            reversed_steps.append(action[1])
+            current = None
+    return reversed_steps, advanced_steps
+
+
+def get_fewest_advanced_steps(nsteps, checkpoints):
+    """
+    Fewest recomputed steps of a reverse sweep with a checkpoint budget (Griewank and Walther)
+    """
+    repetitions = 0
+    while get_number_of_reversible_steps(checkpoints, repetitions) < nsteps:
+        repetitions += 1
+    if repetitions == 0:
+        return 0
+    return repetitions * nsteps - comb(checkpoints + 1 + repetitions, checkpoints + 2)
+
+
+class TestCheckpointSchedule(unittest.TestCase):
+    N_PROCS = 1
+
+    def test_number_of_reversible_steps(self):
+        # with only the initial state, the first step is recomputed for each other step
+        for repetitions in range(5):
+            self.assertEqual(get_number_of_reversible_steps(0, repetitions), repetitions + 1)
+        self.assertEqual(get_number_of_reversible_steps(2, 3), comb(6, 3))
+
+    def test_every_step_is_reversed_once(self):
+        for checkpoints in [None, 0, 1, 2, 3, 5]:
+            for nsteps in range(0, 40):
+                reversed_steps, _ = run_schedule(nsteps, checkpoints)
+                self.assertEqual(reversed_steps, list(range(nsteps, 0, -1)))
+
+    def test_schedule_length(self):
+        self.assertEqual(run_schedule(20, None)[1], 0)
+        self.assertEqual(run_schedule(20, 0)[1], 20 * 19 // 2)
+        self.assertEqual(run_schedule(20, 19)[1], 19)
+        for checkpoints in range(1, 5):
+            for nsteps in range(1, 80):
+                self.assertEqual(run_schedule(nsteps, checkpoints)[1],
+                                 get_fewest_advanced_steps(nsteps, checkpoints))
+
+    def test_negative_budget_raises(self):
+        with self.assertRaises(ValueError):
+            get_checkpoint_schedule(4, -1)
+
+
+class TestCheckpointedAdjoint(unittest.TestCase):
+    N_PROCS = 1
+
+    def get_problem(self, checkpoints):
+        prob = om.Problem(OscillatorModel(integrator_options={'nsteps': 12, 'dt': 0.5, 'checkpoints': checkpoints}),
+                          reports=False)
+        prob.setup(mode='rev')
+        prob.run_model()
+        return prob
+
+    def test_adjoint_matches_fd(self):
+        wrt = ['amplitude', 'freq', 'm', 'c', 'k', 'u|0']
+        reference = self.get_problem(None)
+        for checkpoints in [0, 2, 3]:
+            prob = self.get_problem(checkpoints)
+            self.assertIsNone(prob.model.integrator.history)
+            assert_near_equal(prob['u|end'], reference['u|end'], 1e-14)
+
+            totals = prob.compute_totals(of=['u|end'], wrt=wrt)
+            fd = prob.check_totals(of=['u|end'], wrt=wrt, method='fd', form='central', step=1e-7,
+                                   out_stream=None)
+            for key, total in totals.items():
+                np.testing.assert_allclose(total, fd[key]['J_fd'], atol=1e-7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,10 @@ import numpy as np
 import openmdao.api as om
 
 from mphys import DistributedConverter, DistributedVariableDescription
+from mphys.distributed_converter import get_balanced_sizes
 
 from common_methods import CommonMethods
-from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.assert_utils import assert_check_partials
 
 
 class TestDistributedConverter(unittest.TestCase):
@@ -52,29 +53,71 @@ class TestDistributedConverter(unittest.TestCase):
         self.common.test_run_model(self, write_n2=False)
 
     def test_check_partials(self):
-        partials = self.prob.check_partials(compact_print=True, method='cs')
-        tol = 1e-9
-        for in_var in ['in1', 'in2']:
-            err = partials['converter'][(f'{in_var}_serial', in_var)]
-            # If fd check magnitude is exactly zero, use abs tol
-            if err['magnitude'].fd == 0.0:
-                check_error = err['abs error']
-            else:
-                check_error = err['rel error']
-            assert_near_equal(check_error.reverse, 0.0, tolerance=tol)
-            assert_near_equal(check_error.forward, 0.0, tolerance=tol)
-            assert_near_equal(check_error.forward_reverse, 0.0, tolerance=tol)
-        for out_var in ['out1', 'out2']:
-            err = partials['converter'][(out_var, f'{out_var}_serial')]
-            # If fd check magnitude is exactly zero, use abs tol
-            if err['magnitude'].fd == 0.0:
-                check_error = err['abs error']
-            else:
-                check_error = err['rel error']
-            assert_near_equal(check_error.reverse, 0.0, tolerance=tol)
-            assert_near_equal(check_error.forward, 0.0, tolerance=tol)
-            assert_near_equal(check_error.forward_reverse, 0.0, tolerance=tol)
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-9, rtol=1e-9)
 
 
+class TestDistributedConverterBalanced(unittest.TestCase):
+    N_PROCS = 2
+
+    def setUp(self):
+        self.common = CommonMethods()
+        self.prob = om.Problem()
+        comm = MPI.COMM_WORLD
+
+        # the inputs have different partitions, so the fused gather interleaves their parts
+        vars_in = [DistributedVariableDescription('in1', shape=(12), tags=['mphys_coupling']),
+                   DistributedVariableDescription('in2', shape=(5), tags=['mphys_coupling'])]
+        vars_out = [
+            DistributedVariableDescription('out1', shape=(12), tags=['mphys_coupling']),
+            DistributedVariableDescription('out2', shape=(5), tags=['mphys_result'],
+                                           sizes=[5] + [0] * (comm.size - 1)),
+        ]
+
+        inputs = self.prob.model.add_subsystem('inputs', om.IndepVarComp())
+        in1_sizes = get_balanced_sizes(12, comm.size, block_size=3)
+        in1_start = np.sum(in1_sizes[:comm.rank])
+        inputs.add_output('in1', val=np.arange(in1_start, in1_start + in1_sizes[comm.rank], dtype=float),
+                          distributed=True)
+        in2_sizes = get_balanced_sizes(5, comm.size)
+        in2_start = np.sum(in2_sizes[:comm.rank])
+        inputs.add_output('in2', val=-np.arange(in2_start, in2_start + in2_sizes[comm.rank], dtype=float),
+                          distributed=True)
+        inputs.add_output('out1', val=np.arange(12, dtype=float), distributed=False)
+        inputs.add_output('out2', val=np.arange(5, dtype=float), distributed=False)
+
+        self.prob.model.add_subsystem('converter', DistributedConverter(
+            distributed_inputs=vars_in, distributed_outputs=vars_out, partition='balanced', block_size=3))
+
+        for var in ['in1', 'in2']:
+            self.prob.model.connect(f'inputs.{var}', f'converter.{var}')
+        for var in ['out1', 'out2']:
+            self.prob.model.connect(f'inputs.{var}', f'converter.{var}_serial')
+
+        self.prob.setup(force_alloc_complex=True)
+
+    def test_values(self):
+        comm = MPI.COMM_WORLD
+        self.prob.run_model()
+        np.testing.assert_equal(self.prob.get_val('converter.in1_serial'), np.arange(12))
+        np.testing.assert_equal(self.prob.get_val('converter.in2_serial'), -np.arange(5))
+
+        sizes = get_balanced_sizes(12, comm.size, block_size=3)
+        start = np.sum(sizes[:comm.rank])
+        np.testing.assert_equal(self.prob.get_val('converter.out1', get_remote=False),
+                                np.arange(start, start + sizes[comm.rank]))
+        expected = np.arange(5) if comm.rank == 0 else np.zeros(0)
+        np.testing.assert_equal(self.prob.get_val('converter.out2', get_remote=False), expected)
+
+    def test_check_partials(self):
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-9, rtol=1e-9)
+
+    def test_balanced_sizes(self):
+        np.testing.assert_equal(get_balanced_sizes(12, 3, block_size=3), [6, 3, 3])
+        np.testing.assert_equal(get_balanced_sizes(5, 2), [3, 2])
+        with self.assertRaises(ValueError):
+            get_balanced_sizes(10, 2, block_size=3)
+
 if __name__ == '__main__':
     unittest.main()
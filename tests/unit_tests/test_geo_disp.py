@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_check_partials
+
+from mphys.geo_disp import GeoDisp
+
+
+class TestGeoDisp(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        nnodes = 4
+        self.prob = om.Problem()
+        ivc = self.prob.model.add_subsystem('ivc', om.IndepVarComp(), promotes=['*'])
+        ivc.add_output('x_aero0', val=np.arange(3 * nnodes, dtype=float), distributed=True)
+        ivc.add_output('u_aero', val=np.linspace(0.0, 1.0, 3 * nnodes), distributed=True)
+        self.prob.model.add_subsystem('geo_disp', GeoDisp(number_of_nodes=nnodes), promotes=['*'])
+        self.prob.setup(force_alloc_complex=True)
+        self.prob.run_model()
+
+    def test_values(self):
+        np.testing.assert_allclose(self.prob['x_aero'], self.prob['x_aero0'] + self.prob['u_aero'])
+
+    def test_partials_are_assembled(self):
+        self.assertFalse(self.prob.model.geo_disp.matrix_free)
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-12, rtol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
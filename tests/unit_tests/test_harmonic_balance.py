@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+import openmdao.api as om
+
+from mphys.time_domain.harmonic_balance import get_trigonometric_interpolation_weights
+from fake_time_domain import HarmonicBalanceOscillator, IntegratorOscillator, OscillatorModel
+
+number_of_instances = 8
+
+# damped enough for the transient of the time march to decay within its periods
+damping = [1.0, 1.2]
+
+
+def get_problem(integrator_class=HarmonicBalanceOscillator, mode='rev', **integrator_options):
+    prob = om.Problem(OscillatorModel(integrator_class=integrator_class, integrator_options=integrator_options,
+                                      c=damping),
+                      reports=False)
+    prob.setup(mode=mode)
+    prob.run_model()
+    return prob
+
+
+class TestTrigonometricInterpolation(unittest.TestCase):
+    N_PROCS = 1
+
+    def test_interpolates_resolved_harmonics(self):
+        period = 2.0
+        for nin in [5, 8]:
+            instance_times = np.arange(nin) * period / nin
+            times = np.linspace(-0.3, 2.5, 11)
+            weights = get_trigonometric_interpolation_weights(times, nin, period)
+            np.testing.assert_allclose(weights @ np.ones(nin), 1.0)
+            for harmonic in range(1, (nin - 1) // 2 + 1):
+                phase = 2.0 * np.pi * harmonic / period
+                np.testing.assert_allclose(weights @ np.sin(phase * instance_times), np.sin(phase * times),
+                                           atol=1e-12)
+
+
+class TestHarmonicBalance(unittest.TestCase):
+    N_PROCS = 1
+
+    @classmethod
+    def setUpClass(cls):
+        cls.period = 2.0 * np.pi / 0.5
+        cls.prob = get_problem(nsteps=number_of_instances, dt=cls.period / number_of_instances)
+
+    def test_matches_time_march(self):
+        # the last of 4 periods of a 3200 step time march, sampled at the instance times
+        steps_per_instance = 100
+        steps_per_period = number_of_instances * steps_per_instance
+        nsteps = 4 * steps_per_period
+        march = get_problem(IntegratorOscillator, nsteps=nsteps, dt=self.period / steps_per_period)
+        history = march.model.integrator.history
+        periodic = np.array([history.read(nsteps - steps_per_period + i * steps_per_instance, 'u')
+                             for i in range(number_of_instances)])
+        np.testing.assert_allclose(self.prob['u|instances'], periodic, atol=1e-5)
+
+    def test_derivatives_match_fd(self):
+        wrt = ['amplitude', 'freq', 'm', 'c', 'k', 'u|0']
+        totals = self.prob.compute_totals(of=['u|instances'], wrt=wrt)
+        fd = self.prob.check_totals(of=['u|instances'], wrt=wrt, method='fd', form='central', step=1e-4,
+                                    out_stream=None)
+        for key, total in totals.items():
+            np.testing.assert_allclose(total, fd[key]['J_fd'], atol=1e-5)
+
+        # the converged instances do not depend on the initial guess
+        np.testing.assert_allclose(totals['u|instances', 'u|0'], 0.0, atol=1e-10)
+
+        fwd = get_problem(mode='fwd', nsteps=number_of_instances, dt=self.period / number_of_instances)
+        for key, total in fwd.compute_totals(of=['u|instances'], wrt=wrt).items():
+            np.testing.assert_allclose(total, totals[key], atol=1e-8)
+
+    def test_unconverged_raises(self):
+        with self.assertRaises(om.AnalysisError):
+            get_problem(nsteps=number_of_instances, dt=self.period / number_of_instances, newton_max_iterations=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_check_partials
+
+from mphys.integrated_forces import (IntegratedSurfaceForces, IntegratedSurfaceForceBreakdown,
+                                     get_node_group_labels)
+
+
+class TestIntegratedSurfaceForces(unittest.TestCase):
+    N_PROCS = 1
+    matrix_free = True
+
+    def setUp(self):
+        np.random.seed(0)
+        nnodes = 4
+        self.prob = om.Problem()
+        ivc = om.IndepVarComp()
+        ivc.add_output('aoa', val=5.0, units='deg')
+        ivc.add_output('yaw', val=2.0, units='deg')
+        ivc.add_output('ref_area', val=0.2)
+        ivc.add_output('moment_center', shape=3, val=np.random.rand(3))
+        ivc.add_output('ref_length', val=3.0)
+        ivc.add_output('q_inf', val=10.0)
+        ivc.add_output('x_aero', shape=3*nnodes, val=np.random.rand(3*nnodes), distributed=True)
+        ivc.add_output('f_aero', shape=3*nnodes, val=np.random.rand(3*nnodes), distributed=True)
+        self.prob.model.add_subsystem('ivc', ivc, promotes_outputs=['*'])
+        self.prob.model.add_subsystem('forces', IntegratedSurfaceForces(matrix_free=self.matrix_free),
+                                      promotes_inputs=['*'])
+        self.prob.setup(force_alloc_complex=True)
+        self.prob.run_model()
+
+    def _count_allreduce_calls(self):
+        forces = self.prob.model.forces
+        allreduce = forces._allreduce
+        self.allreduce_calls = 0
+
+        def counted_allreduce(values):
+            self.allreduce_calls += 1
+            return allreduce(values)
+
+        forces._allreduce = counted_allreduce
+
+    def test_values(self):
+        f = self.prob['f_aero'].reshape(-1, 3)
+        x = self.prob['x_aero'].reshape(-1, 3)
+        moment = np.sum(np.cross(x - self.prob['moment_center'], f), axis=0)
+        np.testing.assert_allclose(self.prob['forces.F_X'], np.sum(f[:, 0]))
+        np.testing.assert_allclose(self.prob['forces.F_Z'], np.sum(f[:, 2]))
+        np.testing.assert_allclose(self.prob['forces.M_X'], moment[0])
+        np.testing.assert_allclose(self.prob['forces.M_Y'], moment[1])
+        np.testing.assert_allclose(self.prob['forces.M_Z'], moment[2])
+
+    def test_check_partials(self):
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-12, rtol=1e-12)
+
+    def test_rev_products_use_cached_totals(self):
+        self._count_allreduce_calls()
+        self.prob.compute_totals(of=['forces.C_L', 'forces.CM_Y'], wrt=['aoa', 'x_aero', 'f_aero'])
+        self.assertEqual(self.allreduce_calls, 0)
+
+    def test_fwd_products_reduce_once_per_seed(self):
+        self._count_allreduce_calls()
+        forces = self.prob.model.forces
+        forces.run_apply_linear('fwd')
+        self.assertEqual(self.allreduce_calls, 1)
+
+
+class TestIntegratedSurfaceForcesAssembled(TestIntegratedSurfaceForces):
+    matrix_free = False
+
+    def test_fwd_products_reduce_once_per_seed(self):
+        self.assertFalse(self.prob.model.forces.matrix_free)
+
+    def test_totals_match_products(self):
+        of = ['forces.C_L', 'forces.C_D', 'forces.CM_X', 'forces.CM_Y', 'forces.M_Z', 'forces.F_Y']
+        wrt = ['aoa', 'yaw', 'ref_area', 'q_inf', 'ref_length', 'moment_center', 'x_aero', 'f_aero']
+        totals = self.prob.compute_totals(of=of, wrt=wrt)
+
+        self.matrix_free = True
+        self.setUp()
+        reference = self.prob.compute_totals(of=of, wrt=wrt)
+        for key, value in totals.items():
+            np.testing.assert_allclose(value, reference[key], rtol=1e-12, atol=1e-12)
+
+
+class TestIntegratedSurfaceForceBreakdown(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        np.random.seed(1)
+        nnodes = 7
+        self.labels = get_node_group_labels(nnodes, [[0, 2, 3], [1, 5]])
+        self.prob = om.Problem()
+        ivc = om.IndepVarComp()
+        ivc.add_output('aoa', val=5.0, units='deg')
+        ivc.add_output('yaw', val=2.0, units='deg')
+        ivc.add_output('ref_area', val=0.2)
+        ivc.add_output('ref_length', val=3.0)
+        ivc.add_output('q_inf', val=10.0)
+        ivc.add_output('moment_center_wing', shape=3, val=np.random.rand(3))
+        ivc.add_output('moment_center_tail', shape=3, val=np.random.rand(3))
+        ivc.add_output('x_aero', shape=3*nnodes, val=np.random.rand(3*nnodes), distributed=True)
+        ivc.add_output('f_aero', shape=3*nnodes, val=np.random.rand(3*nnodes), distributed=True)
+        self.prob.model.add_subsystem('ivc', ivc, promotes_outputs=['*'])
+        self.prob.model.add_subsystem('forces', IntegratedSurfaceForceBreakdown(groups=['wing', 'tail'],
+                                                                                node_groups=self.labels),
+                                      promotes_inputs=['*'])
+        self.prob.setup(force_alloc_complex=True)
+        self.prob.run_model()
+
+    def test_labels(self):
+        np.testing.assert_equal(self.labels, [0, 1, 0, 0, -1, 1, -1])
+        with self.assertRaises(ValueError):
+            get_node_group_labels(3, [[0, 1], [1, 2]])
+
+    def _setup_breakdown(self, labels, nnodes=7):
+        prob = om.Problem()
+        ivc = om.IndepVarComp()
+        ivc.add_output('x_aero', shape=3*nnodes, distributed=True)
+        ivc.add_output('f_aero', shape=3*nnodes, distributed=True)
+        prob.model.add_subsystem('ivc', ivc, promotes_outputs=['*'])
+        prob.model.add_subsystem('forces', IntegratedSurfaceForceBreakdown(groups=['wing', 'tail'],
+                                                                           node_groups=labels),
+                                 promotes_inputs=['*'])
+        prob.setup()
+        prob.final_setup()
+
+    def test_invalid_labels_raise(self):
+        for labels in [[0, 1, 2, 0, -1, 1, -1], [0, 1, 0, 0, -2, 1, -1], [0, 1, 0]]:
+            with self.assertRaises(ValueError):
+                self._setup_breakdown(labels)
+
+    def test_values_match_masked_integration(self):
+        for igroup, group in enumerate(['wing', 'tail']):
+            mask = np.repeat(self.labels == igroup, 3)
+            prob = om.Problem()
+            ivc = om.IndepVarComp()
+            for name in ['aoa', 'yaw', 'ref_area', 'ref_length', 'q_inf']:
+                ivc.add_output(name, val=self.prob.get_val(name, units='rad' if name in ['aoa', 'yaw'] else None),
+                               units='rad' if name in ['aoa', 'yaw'] else None)
+            ivc.add_output('moment_center', val=self.prob[f'moment_center_{group}'])
+            ivc.add_output('x_aero', val=self.prob['x_aero'][mask], distributed=True)
+            ivc.add_output('f_aero', val=self.prob['f_aero'][mask], distributed=True)
+            prob.model.add_subsystem('ivc', ivc, promotes_outputs=['*'])
+            prob.model.add_subsystem('forces', IntegratedSurfaceForces(), promotes_inputs=['*'])
+            prob.setup()
+            prob.run_model()
+            for name in IntegratedSurfaceForceBreakdown.output_names:
+                np.testing.assert_allclose(self.prob[f'forces.{name}_{group}'], prob[f'forces.{name}'],
+                                           rtol=1e-12, atol=1e-14)
+
+    def test_check_partials(self):
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-12, rtol=1e-12)
+
+    def test_fwd_products_reduce_once_per_seed(self):
+        forces = self.prob.model.forces
+        allreduce = forces._allreduce
+        calls = []
+
+        def counted_allreduce(values):
+            calls.append(values.shape)
+            return allreduce(values)
+
+        forces._allreduce = counted_allreduce
+        forces.run_apply_linear('fwd')
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
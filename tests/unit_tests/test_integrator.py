@@ -0,0 +1,176 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.om_warnings import SolverWarning
+
+from fake_time_domain import OscillatorModel
+
+
+def get_problem(**integrator_options):
+    prob = om.Problem(OscillatorModel(integrator_options=integrator_options), reports=False)
+    prob.setup(mode='rev')
+    prob.run_model()
+    return prob
+
+
+class TestIntegratorStepViews(unittest.TestCase):
+    N_PROCS = 1
+
+    def test_views_write_to_step_problem(self):
+        prob = get_problem(nsteps=2, dt=0.5)
+        step = prob.model.integrator._step
+        views = dict(step.state_views)
+        views.update(step.input_views)
+        views.update(step.time_views)
+        for name, backplane_views in step.backplane_views.items():
+            views.update({f'{name}|t-{backplane+1}': view for backplane, view in enumerate(backplane_views)})
+        views.update({f'time|t-{backplane+1}': view for backplane, view in enumerate(step.time_backplane_views)})
+        self.assertEqual(len(views), 17)
+
+        for number, (name, view) in enumerate(views.items()):
+            view[...] = number
+            np.testing.assert_array_equal(step.problem.get_val(name), np.full(view.shape, number))
+
+    def test_step_inputs_are_set(self):
+        prob = get_problem(nsteps=2, dt=0.5)
+        prob.set_val('k', [2.0, 3.0])
+        prob.run_model()
+        np.testing.assert_array_equal(prob.model.integrator.problem.get_val('k'), [2.0, 3.0])
+
+
+class TestIntegratorTangents(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        self.wrt = ['amplitude', 'freq', 'm', 'c', 'k', 'u|0']
+        self.prob = om.Problem(OscillatorModel(integrator_options={'nsteps': 10, 'dt': 0.5}), reports=False)
+        self.prob.setup(mode='fwd')
+        self.prob.run_model()
+
+    def test_forward_derivatives_match_fd(self):
+        # the 8 columns of the step inputs are updated from the step Jacobians of the 2 modes,
+        # and the 2 columns of the initial conditions with Jacobian-vector products
+        totals = self.prob.compute_totals(of=['u|end'], wrt=self.wrt)
+        fd = self.prob.check_totals(of=['u|end'], wrt=self.wrt, method='fd', form='central', step=1e-7,
+                                    out_stream=None)
+        for key, total in totals.items():
+            np.testing.assert_allclose(total, fd[key]['J_fd'], atol=1e-7)
+
+        reverse = get_problem(nsteps=10, dt=0.5)
+        for key, total in reverse.compute_totals(of=['u|end'], wrt=self.wrt).items():
+            np.testing.assert_allclose(totals[key], total, atol=1e-12)
+
+    def test_initial_conditions_are_swept_when_requested(self):
+        integrator = self.prob.model.integrator
+        self.prob.compute_totals(of=['u|end'], wrt=['k'])
+        self.assertEqual(set(integrator._input_tangents), {'amplitude', 'freq', 'm', 'c', 'k'})
+        self.assertEqual(integrator._input_tangents['k']['u'].shape, (2, 2))
+
+        self.prob.compute_totals(of=['u|end'], wrt=['u|0'])
+        self.assertIn('u|0', integrator._input_tangents)
+
+        # the tangents are integrated again after the next compute
+        self.prob.run_model()
+        self.assertEqual(integrator._input_tangents, {})
+
+
+class TestIntegratorParareal(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        self.nsteps = 20
+        self.reference = get_problem(nsteps=self.nsteps, dt=0.5)
+
+    def check_history(self, prob, rtol=1e-12):
+        history = prob.model.integrator.history
+        reference = self.reference.model.integrator.history
+        for step in range(self.nsteps + 1):
+            np.testing.assert_allclose(history.read(step, 'u'), reference.read(step, 'u'), rtol=rtol)
+
+    def test_default_coarse_propagator(self):
+        prob = get_problem(nsteps=self.nsteps, dt=0.5, time_slices=4)
+        # Parareal is exact after one iteration per slice
+        np.testing.assert_allclose(prob['u|end'], self.reference['u|end'], rtol=1e-12)
+        self.check_history(prob)
+
+        # the propagators do not depend on the state left by the previous run
+        end = prob['u|end'].copy()
+        prob.run_model()
+        np.testing.assert_array_equal(prob['u|end'], end)
+
+    def test_coarse_step_stride(self):
+        prob = get_problem(nsteps=self.nsteps, dt=0.5, time_slices=4, coarse_step_stride=3)
+        np.testing.assert_allclose(prob['u|end'], self.reference['u|end'], rtol=1e-12)
+        self.check_history(prob)
+
+        # the 5 steps of a slice are spanned by a coarse step of 3 and one of 2 fine steps
+        integrator = prob.model.integrator
+        coarse = integrator._step_problems['coarse']
+        with mock.patch.object(coarse.problem, 'run_model', wraps=coarse.problem.run_model) as run_model:
+            integrator._propagate('coarse', integrator._get_ordered_state(), 5, 10)
+        self.assertEqual(run_model.call_count, 2)
+        self.assertEqual(coarse.time_views['time'], 5.0)
+        self.assertEqual(coarse.time_views['dt'], 1.0)
+        # the backplanes before the first coarse step are the fine steps before the slice
+        np.testing.assert_array_equal([view.item() for view in coarse.time_backplane_views],
+                                      [4.0, 2.5, 2.0, 1.5])
+
+    def test_unconverged_warns(self):
+        with self.assertWarns(SolverWarning):
+            prob = get_problem(nsteps=self.nsteps, dt=0.5, time_slices=5, parareal_max_iterations=2)
+        self.assertGreater(np.max(np.abs(prob['u|end'] - self.reference['u|end'])), 1e-8)
+
+        # the history and the final states are the fine solution from the last slice states
+        history = prob.model.integrator.history
+        np.testing.assert_array_equal(history.read(self.nsteps, 'u'), prob['u|end'])
+        for step in range(self.nsteps // 5 + 1):
+            np.testing.assert_allclose(history.read(step, 'u'),
+                                       self.reference.model.integrator.history.read(step, 'u'), rtol=1e-12)
+
+
+class TestIntegratorAdaptive(unittest.TestCase):
+    N_PROCS = 1
+
+    @classmethod
+    def setUpClass(cls):
+        cls.options = {'nsteps': 20, 'dt': 0.5}
+        cls.reference = get_problem(nsteps=1000, dt=0.01)
+
+    def test_error_decreases_with_tolerance(self):
+        errors = []
+        for tolerance in [1e-3, 1e-5]:
+            prob = get_problem(error_tolerance=tolerance, **self.options)
+            integrator = prob.model.integrator
+            self.assertAlmostEqual(integrator._step_times[-1], 10.0, places=12)
+            self.assertEqual(integrator.history.read_time(integrator._nsteps), integrator._step_times[-1])
+            errors.append(np.max(np.abs(prob['u|end'] - self.reference['u|end'])))
+        self.assertLess(errors[1], 0.1 * errors[0])
+        self.assertLess(errors[1], 5e-3)
+
+    def test_startup_steps(self):
+        # the errors of the first bdf_order steps can not be estimated, so they are dt_min long
+        prob = get_problem(error_tolerance=1e-4, dt_min=0.01, **self.options)
+        dts = np.diff(prob.model.integrator._step_times)
+        np.testing.assert_allclose(dts[:2], 0.01)
+        np.testing.assert_allclose(dts[2], 0.02)
+
+    def test_default_max_steps(self):
+        prob = get_problem(error_tolerance=1e-5, **self.options)
+        integrator = prob.model.integrator
+        self.assertEqual(integrator._get_max_number_of_steps(), 20001)
+        self.assertGreater(integrator._nsteps, self.options['nsteps'])
+
+    def test_max_steps_raises(self):
+        with self.assertRaises(RuntimeError):
+            get_problem(error_tolerance=1e-5, max_steps=50, **self.options)
+
+    def test_derivatives_raise(self):
+        prob = get_problem(error_tolerance=1e-3, **self.options)
+        with self.assertRaises(NotImplementedError):
+            prob.compute_totals(of=['u|end'], wrt=['k'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,7 @@ import openmdao.api as om
 from mphys import MaskedConverter, UnmaskedConverter, MaskedVariableDescription
 
 from common_methods import CommonMethods
-from openmdao.utils.assert_utils import assert_near_equal
+from openmdao.utils.assert_utils import assert_check_partials
 
 
 class TestMaskConverterSingle(unittest.TestCase):
@@ -46,18 +46,8 @@ class TestMaskConverterSingle(unittest.TestCase):
         self.common.test_run_model(self, write_n2=False)
 
     def test_check_partials(self):
-        partials = self.prob.check_partials(compact_print=True, method='cs')
-        tol = 1e-9
-
-        rel_error = partials['masker'][('masked_output', 'unmasked_input')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
-
-        rel_error = partials['unmasker'][('unmasked_output', 'masked_input')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-9, rtol=1e-9)
 
 class TestMaskConverterMulti(unittest.TestCase):
     N_PROCS = 1  #TODO should be 2 or more but there is a bug in OM currently
@@ -109,26 +99,65 @@ class TestMaskConverterMulti(unittest.TestCase):
         self.common.test_run_model(self, write_n2=False)
 
     def test_check_partials(self):
-        partials = self.prob.check_partials(compact_print=True, method='cs')
-        tol = 1e-9
-
-        rel_error = partials['masker'][('masked_output_1', 'unmasked_input')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
-        rel_error = partials['masker'][('masked_output_2', 'unmasked_input')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
-
-        rel_error = partials['unmasker'][('unmasked_output', 'masked_input_1')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
-        rel_error = partials['unmasker'][('unmasked_output', 'masked_input_2')]['rel error']
-        assert_near_equal(rel_error.reverse, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward, 0.0, tolerance=tol)
-        assert_near_equal(rel_error.forward_reverse, 0.0, tolerance=tol)
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-9, rtol=1e-9)
+
+class TestMaskConverterIndices(unittest.TestCase):
+    N_PROCS = 1
+
+    def _get_problem(self, mask, unmask_inputs):
+        prob = om.Problem()
+        inputs = prob.model.add_subsystem('inputs', om.IndepVarComp())
+        inputs.add_output('unmasked_input', val=np.arange(10, dtype=float))
+        mask_input = MaskedVariableDescription('unmasked_input', shape=10)
+        mask_output = MaskedVariableDescription('masked_output', shape=4)
+        prob.model.add_subsystem('masker', MaskedConverter(input=mask_input, output=mask_output, mask=mask))
+
+        unmask_output = MaskedVariableDescription('unmasked_output', shape=10)
+        prob.model.add_subsystem('unmasker', UnmaskedConverter(input=unmask_inputs, output=unmask_output,
+                                                               mask=mask, default_values=-1.0))
+        prob.model.connect('inputs.unmasked_input', 'masker.unmasked_input')
+        return prob
+
+    def test_integer_indices(self):
+        indices = np.array([7, 1, 2, 9])
+        prob = self._get_problem(indices, MaskedVariableDescription('masked_input', shape=4))
+        prob.model.connect('masker.masked_output', 'unmasker.masked_input')
+        prob.setup()
+        prob.run_model()
+        np.testing.assert_equal(prob['masker.masked_output'], indices)
+        expected = -np.ones(10)
+        expected[indices] = indices
+        np.testing.assert_equal(prob['unmasker.unmasked_output'], expected)
+
+    def test_multidimensional_default_values(self):
+        mask = np.zeros((4, 3), dtype=bool)
+        mask[1:3, :] = True
+        default_values = np.arange(12, dtype=float).reshape(4, 3)
+        prob = om.Problem()
+        inputs = prob.model.add_subsystem('inputs', om.IndepVarComp())
+        inputs.add_output('masked_input', val=-np.ones(6))
+        prob.model.add_subsystem('unmasker', UnmaskedConverter(input=MaskedVariableDescription('masked_input', shape=6),
+                                                               output=MaskedVariableDescription('unmasked_output', shape=(4, 3)),
+                                                               mask=mask, default_values=default_values))
+        prob.model.connect('inputs.masked_input', 'unmasker.masked_input')
+        prob.setup()
+        prob.run_model()
+        expected = default_values.copy()
+        expected[mask] = -1.0
+        np.testing.assert_equal(prob['unmasker.unmasked_output'], expected)
+
+    def test_overlapping_masks(self):
+        mask = [np.zeros(10, dtype=bool), np.zeros(10, dtype=bool)]
+        mask[0][0:6] = True
+        mask[1][5:10] = True
+        unmask_inputs = [MaskedVariableDescription('masked_input_1', shape=6),
+                         MaskedVariableDescription('masked_input_2', shape=5)]
+        prob = om.Problem()
+        prob.model.add_subsystem('unmasker', UnmaskedConverter(input=unmask_inputs, mask=mask,
+                                                               output=MaskedVariableDescription('unmasked_output', shape=10)))
+        with self.assertRaises(RuntimeWarning):
+            prob.setup()
 
 if __name__ == '__main__':
     unittest.main()
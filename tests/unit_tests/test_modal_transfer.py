@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import openmdao.api as om
+from openmdao.utils.assert_utils import assert_check_partials
+
+from mphys import ArtifactCache
+from mphys.modal_transfer import (ModalDisplacements, ModalForces, get_mode_shape_filenames,
+                                  load_mode_shapes, read_tecplot_mode_shapes)
+
+
+class TestModalTransfer(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        np.random.seed(0)
+        nmodes = 3
+        nnodes = 5
+        self.mode_shapes = np.random.rand(nmodes, nnodes, 3)
+        self.prob = om.Problem()
+        ivc = om.IndepVarComp()
+        ivc.add_output('u_struct', val=np.random.rand(nmodes))
+        ivc.add_output('f_aero', val=np.random.rand(3*nnodes), distributed=True)
+        self.prob.model.add_subsystem('ivc', ivc, promotes_outputs=['*'])
+        self.prob.model.add_subsystem('disps', ModalDisplacements(mode_shapes=self.mode_shapes),
+                                      promotes=['*'])
+        self.prob.model.add_subsystem('forces', ModalForces(mode_shapes=self.mode_shapes),
+                                      promotes=['*'])
+        self.prob.setup(force_alloc_complex=True)
+        self.prob.run_model()
+
+    def test_values_match_loops(self):
+        nmodes, nnodes, _ = self.mode_shapes.shape
+        u_aero = np.zeros(3*nnodes)
+        f_struct = np.zeros(nmodes)
+        for imode in range(nmodes):
+            for inode in range(nnodes):
+                for k in range(3):
+                    u_aero[3*inode+k] += self.mode_shapes[imode, inode, k] * self.prob['u_struct'][imode]
+                    f_struct[imode] += self.mode_shapes[imode, inode, k] * self.prob['f_aero'][3*inode+k]
+        np.testing.assert_allclose(self.prob['u_aero'], u_aero, rtol=1e-14)
+        np.testing.assert_allclose(self.prob['f_struct'], f_struct, rtol=1e-14)
+
+    def test_mode_shapes_are_contiguous_matrix(self):
+        mode_shapes = self.prob.model.forces.mode_shapes
+        self.assertEqual(mode_shapes.shape, (3, 15))
+        self.assertTrue(mode_shapes.flags['C_CONTIGUOUS'])
+
+    def test_check_partials(self):
+        partials = self.prob.check_partials(compact_print=True, method='cs', out_stream=None)
+        assert_check_partials(partials, atol=1e-12, rtol=1e-12)
+
+
+class TestModeShapeLoader(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        np.random.seed(1)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root_name = os.path.join(self.tmpdir.name, 'body')
+        self.coordinates = np.random.rand(6, 3)
+        self.mode_shapes = np.random.rand(2, 6, 3)
+        for imode, filename in enumerate(get_mode_shape_filenames(self.root_name, 2)):
+            with open(filename, 'w') as f:
+                f.write('TITLE = "Mode Shape"\n')
+                f.write('VARIABLES = "X" "Y" "Z" "ID" "XMD" "YMD" "ZMD"\n')
+                f.write('ZONE T="Body", I=6, J=1, F=FEPOINT\n')
+                for inode in range(6):
+                    values = [*self.coordinates[inode], inode+1, *self.mode_shapes[imode, inode]]
+                    f.write(' '.join(f'{value:.16e}' for value in values) + '\n')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_read_tecplot_mode_shapes(self):
+        artifact = read_tecplot_mode_shapes(get_mode_shape_filenames(self.root_name, 2))
+        np.testing.assert_allclose(artifact['coordinates'], self.coordinates, rtol=1e-15)
+        np.testing.assert_allclose(artifact['mode_shapes'], self.mode_shapes, rtol=1e-15)
+
+    def test_load_mode_shapes_maps_cached_files(self):
+        cache = ArtifactCache(os.path.join(self.tmpdir.name, 'cache'))
+        artifact = load_mode_shapes(self.root_name, 2, artifact_cache=cache)
+        self.assertIsInstance(artifact['mode_shapes'], np.memmap)
+        self.assertFalse(artifact['mode_shapes'].flags.writeable)
+        np.testing.assert_allclose(artifact['mode_shapes'], self.mode_shapes, rtol=1e-15)
+        self.assertIs(load_mode_shapes(self.root_name, 2, artifact_cache=cache), artifact)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import openmdao.api as om
+from mpi4py import MPI
+
+from mphys import Multipoint
+from mphys.profiler import MphysProfiler
+from mphys.scenario_aerostructural import ScenarioAeroStructural
+
+from fake_aero import AeroBuilder
+from fake_struct import StructBuilder
+from fake_ldxfer import LDXferBuilder
+
+
+class TestMphysProfiler(unittest.TestCase):
+    def setUp(self):
+        self.prob = om.Problem()
+
+        aero_builder = AeroBuilder()
+        struct_builder = StructBuilder()
+        ldxfer_builder = LDXferBuilder(aero_builder, struct_builder)
+        for builder in [aero_builder, struct_builder, ldxfer_builder]:
+            builder.initialize(MPI.COMM_WORLD)
+
+        model = self.prob.model.add_subsystem('multipoint', Multipoint())
+        model.add_subsystem('aero_mesh', aero_builder.get_mesh_coordinate_subsystem())
+        model.add_subsystem('struct_mesh', struct_builder.get_mesh_coordinate_subsystem())
+        model.mphys_add_scenario('cruise', ScenarioAeroStructural(aero_builder=aero_builder,
+                                                                  struct_builder=struct_builder,
+                                                                  ldxfer_builder=ldxfer_builder))
+        model.mphys_connect_scenario_coordinate_source('aero_mesh', 'cruise', 'aero')
+        model.mphys_connect_scenario_coordinate_source('struct_mesh', 'cruise', 'struct')
+        self.prob.setup()
+        self.prob.final_setup()
+
+        self.profiler = MphysProfiler()
+        self.profiler.attach(self.prob.model)
+
+    def _get_record(self, pathname, label):
+        for record in self.profiler.get_records():
+            if record.pathname == pathname and record.label == label:
+                return record
+        return None
+
+    def test_primal_records(self):
+        self.prob.run_model()
+
+        scenario = self._get_record('multipoint.cruise', 'solve_nonlinear[primal]')
+        coupling = self._get_record('multipoint.cruise.coupling', 'solve_nonlinear[primal]')
+        aero = self._get_record('multipoint.cruise.coupling.aero', 'solve_nonlinear[primal]')
+
+        self.assertEqual(scenario.calls, 1)
+        self.assertEqual(coupling.calls, 1)
+        self.assertGreater(coupling.nonlinear_iterations, 0)
+        self.assertEqual(aero.calls, coupling.nonlinear_iterations)
+        self.assertGreaterEqual(scenario.inclusive_time, coupling.inclusive_time)
+        self.assertLessEqual(scenario.exclusive_time, scenario.inclusive_time)
+
+    def test_adjoint_records(self):
+        self.prob.run_model()
+        self.prob.compute_totals(of=['multipoint.cruise.func_aero'], wrt=['multipoint.aero_mesh.x_aero0'])
+
+        scenario = self._get_record('multipoint.cruise', 'solve_linear[rev]')
+        self.assertEqual(scenario.calls, 1)
+        self.assertIsNone(self._get_record('multipoint.cruise', 'solve_linear[fwd]'))
+
+    def test_detach_stops_recording(self):
+        self.profiler.detach()
+        self.prob.run_model()
+        self.assertEqual(self.profiler.get_records(), [])
+
+    def test_outputs(self):
+        self.prob.run_model()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'profile.folded')
+            self.profiler.write_folded_stacks(filename)
+            with open(filename) as f:
+                lines = f.readlines()
+        self.assertTrue(any(line.startswith('cruise[solve_nonlinear[primal]];coupling[solve_nonlinear[primal]];aero')
+                            for line in lines))
+
+        table = self.profiler.summary_table()
+        self.assertIn('multipoint.cruise.coupling', table)
+
+
+if __name__ == '__main__':
+    unittest.main()
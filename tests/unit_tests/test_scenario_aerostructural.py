@@ -65,6 +65,56 @@ class TestScenarioAeroStructural(unittest.TestCase):
         self.common.test_no_autoivcs(self)
 
 
+class TestScenarioAeroStructuralFusedGeoDisp(unittest.TestCase):
+    def get_problem(self, fuse_geo_disp, output_x_aero=None):
+        prob = om.Problem()
+
+        if output_x_aero is None:
+            output_x_aero = fuse_geo_disp
+        aero_builder = AeroBuilder()
+        struct_builder = StructBuilder()
+        ldxfer_builder = LDXferBuilder(aero_builder, struct_builder, output_x_aero=output_x_aero)
+
+        aero_builder.initialize(MPI.COMM_WORLD)
+        struct_builder.initialize(MPI.COMM_WORLD)
+        ldxfer_builder.initialize(MPI.COMM_WORLD)
+
+        prob.model.add_subsystem('aero_mesh', aero_builder.get_mesh_coordinate_subsystem())
+        prob.model.add_subsystem('struct_mesh', struct_builder.get_mesh_coordinate_subsystem())
+        prob.model.add_subsystem('scenario', ScenarioAeroStructural(aero_builder=aero_builder,
+                                                                    struct_builder=struct_builder,
+                                                                    ldxfer_builder=ldxfer_builder,
+                                                                    fuse_geo_disp=fuse_geo_disp))
+        prob.model.connect('aero_mesh.x_aero0', 'scenario.x_aero0')
+        prob.model.connect('struct_mesh.x_struct0', 'scenario.x_struct0')
+        prob.setup()
+        return prob
+
+    def setUp(self):
+        self.common = CommonMethods()
+        self.prob = self.get_problem(fuse_geo_disp=True)
+
+    def test_coupling_subsystem_order(self):
+        expected_order = ['disp_xfer', 'aero', 'load_xfer', 'struct']
+        self.common.test_subsystem_order(self, self.prob.model.scenario.coupling, expected_order)
+
+    def test_no_autoivcs(self):
+        self.common.test_no_autoivcs(self)
+
+    def test_matches_separate_geo_disp(self):
+        reference = self.get_problem(fuse_geo_disp=False)
+        for prob in [self.prob, reference]:
+            prob.model.scenario.coupling.nonlinear_solver.options['iprint'] = -1
+            prob.run_model()
+        for name in ['scenario.func_aero', 'scenario.func_struct', 'scenario.coupling.x_aero']:
+            np.testing.assert_allclose(self.prob.get_val(name), reference.get_val(name))
+
+    def test_mismatched_ldxfer_builder_raises(self):
+        for fuse_geo_disp in [True, False]:
+            with self.assertRaisesRegex(ValueError, f'fuse_geo_disp is {fuse_geo_disp}'):
+                self.get_problem(fuse_geo_disp, output_x_aero=not fuse_geo_disp)
+
+
 class TestScenarioAeroStructuralParallel(unittest.TestCase):
     def setUp(self):
         self.common = CommonMethods()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from mphys.time_domain.step_history import StepHistory
+from mphys.time_domain.time_domain_variables import TimeDerivativeVariable
+
+
+class BlockingArray:
+    """
+    Stored history array whose writes wait for an event, to hold values in the write queue
+    """
+    def __init__(self, array, event):
+        self.array = array
+        self.event = event
+        self.shape = array.shape
+        self.dtype = array.dtype
+
+    def __setitem__(self, key, value):
+        self.event.wait()
+        self.array[key] = value
+
+    def __getitem__(self, key):
+        return self.array[key]
+
+    def flush(self):
+        self.array.flush()
+
+
+class TestStepHistory(unittest.TestCase):
+    N_PROCS = 1
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, 'history')
+        self.variables = [TimeDerivativeVariable('u_struct', 2, (2,)),
+                          TimeDerivativeVariable('x|aero', 1, (3, 2))]
+        self.nsteps = 5
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def get_value(self, step, var):
+        return step + np.arange(np.prod(var.shape), dtype=float).reshape(var.shape)
+
+    def write_steps(self, history):
+        for step in range(self.nsteps + 1):
+            history.write_time(step, 0.5 * step)
+            for var in self.variables:
+                history.write(step, var.name, self.get_value(step, var))
+
+    def check_steps(self, history):
+        for step in range(self.nsteps + 1):
+            self.assertEqual(history.read_time(step), 0.5 * step)
+            for var in self.variables:
+                np.testing.assert_array_equal(history.read(step, var.name), self.get_value(step, var))
+
+    def test_in_memory(self):
+        history = StepHistory(self.variables, self.nsteps)
+        self.assertTrue(np.isnan(history.read_time(1)))
+        self.write_steps(history)
+        self.check_steps(history)
+
+        # the stored values are copies
+        value = history.read(2, 'u_struct')
+        value[:] = -1.0
+        np.testing.assert_array_equal(history.read(2, 'u_struct'), [2.0, 3.0])
+        self.assertFalse(os.path.exists(self.directory))
+
+    def test_directory(self):
+        history = StepHistory(self.variables, self.nsteps, directory=self.directory)
+        self.write_steps(history)
+        self.check_steps(history)
+        history.close()
+        self.check_steps(history)
+
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['step_times_rank0.npy', 'u_struct_rank0.npy', 'x_aero_rank0.npy'])
+        for var in self.variables:
+            filename = 'x_aero' if var.name == 'x|aero' else var.name
+            stored = np.load(os.path.join(self.directory, f'{filename}_rank0.npy'))
+            self.assertEqual(stored.shape, (self.nsteps + 1,) + var.shape)
+            for step in range(self.nsteps + 1):
+                np.testing.assert_array_equal(stored[step], self.get_value(step, var))
+        np.testing.assert_array_equal(np.load(os.path.join(self.directory, 'step_times_rank0.npy')),
+                                      0.5 * np.arange(self.nsteps + 1))
+
+    def test_rank_files(self):
+        histories = [StepHistory(self.variables[:1], self.nsteps, directory=self.directory, rank=rank)
+                     for rank in range(2)]
+        for rank, history in enumerate(histories):
+            history.write(1, 'u_struct', [rank, rank])
+            history.close()
+
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ['step_times_rank0.npy', 'step_times_rank1.npy',
+                          'u_struct_rank0.npy', 'u_struct_rank1.npy'])
+        for rank, history in enumerate(histories):
+            np.testing.assert_array_equal(history.read(1, 'u_struct'), [rank, rank])
+            stored = np.load(os.path.join(self.directory, f'u_struct_rank{rank}.npy'))
+            np.testing.assert_array_equal(stored[1], [rank, rank])
+
+    def test_queued_steps(self):
+        max_queued_steps = 2
+        history = StepHistory(self.variables[:1], self.nsteps, directory=self.directory,
+                              max_queued_steps=max_queued_steps)
+        var = self.variables[0]
+        event = threading.Event()
+        history._data[var.name] = BlockingArray(history._data[var.name], event)
+
+        # the writer waits in the write of step 1 while steps 2 and 3 fill the queue
+        for step in range(1, max_queued_steps + 2):
+            history.write(step, var.name, self.get_value(step, var))
+
+        # the value of the caller can be reused once write returns
+        value = self.get_value(max_queued_steps + 2, var)
+        writer = threading.Thread(target=history.write, args=(max_queued_steps + 2, var.name, value))
+        writer.start()
+        writer.join(timeout=0.2)
+        self.assertTrue(writer.is_alive())
+
+        # the queued steps are read back from the queue
+        for step in range(1, max_queued_steps + 2):
+            np.testing.assert_array_equal(history.read(step, var.name), self.get_value(step, var))
+
+        event.set()
+        writer.join()
+        value[:] = -1.0
+        history.flush()
+        self.assertEqual(history._pending, {})
+
+        stored = np.load(os.path.join(self.directory, 'u_struct_rank0.npy'))
+        for step in range(1, max_queued_steps + 3):
+            np.testing.assert_array_equal(history.read(step, var.name), self.get_value(step, var))
+            np.testing.assert_array_equal(stored[step], self.get_value(step, var))
+        history.close()
+
+    def test_writer_error_is_raised(self):
+        history = StepHistory(self.variables[:1], self.nsteps, directory=self.directory)
+        history.write(self.nsteps + 1, 'u_struct', [1.0, 2.0])
+        with self.assertRaises(RuntimeError):
+            history.flush()
+        history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()